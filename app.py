@@ -1,29 +1,49 @@
-from flask import Flask, render_template, request, jsonify, Response
+from flask import (
+    Flask,
+    render_template,
+    request,
+    jsonify,
+    Response,
+    make_response,
+    send_file,
+)
 from werkzeug.utils import secure_filename
 import os
-import xlrd
-import tempfile
 import logging
-import glob
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import subprocess
 import requests
 import time
 import signal
 import atexit
+import argparse
 from threading import Event
 from collections import defaultdict
 import uuid
 import threading
+import multiprocessing
 import platform
-import hashlib
-import pickle
-from datetime import datetime
 import socket
 from nlp.search_integration import SearchIntegration
-import re
-import fnmatch
+from engine import (
+    EXECUTOR_MODES,
+    ScanExecutor,
+    CellIndex,
+    SearchCacheStore,
+    ResultStore,
+    SkipListStore,
+    ManifestStore,
+    FolderWatcher,
+    MetricsRegistry,
+    PROFILE_MODES,
+    ProfileStore,
+    SearchProfiler,
+    SearchEngine,
+    ShadowStore,
+    detect_reader,
+    process_excel_file,
+    workbook_suffixes,
+)
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -32,23 +52,78 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 
 # Configuration
+# Directory holding the skip list, caches and index (defaults to the app folder)
+DATA_DIR = os.environ.get(
+    "EXCELSEEKER_DATA_DIR", os.path.dirname(os.path.abspath(__file__))
+)
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max file size
 app.config["UPLOAD_FOLDER"] = os.path.join(
     os.path.dirname(os.path.abspath(__file__)), "temp"
 )
-ALLOWED_EXTENSIONS = {"xls"}
-MAX_WORKERS = 4  # Number of parallel file processing threads
-SKIP_LIST_FILE = os.path.join(
-    os.path.dirname(os.path.abspath(__file__)), "skip_list.json"
-)
-CACHE_FILE = os.path.join(
-    os.path.dirname(os.path.abspath(__file__)), "search_cache.pkl"
-)
+# Number of parallel file processing workers (defaults to the CPU core count)
+MAX_WORKERS = int(os.environ.get("EXCELSEEKER_MAX_WORKERS", 0)) or os.cpu_count() or 4
+# Default pool type for folder scans: "thread" or "process"
+SCAN_EXECUTOR = os.environ.get("EXCELSEEKER_EXECUTOR", "thread")
+SKIP_LIST_FILE = os.path.join(DATA_DIR, "skip_list.json")
+CACHE_FILE = os.path.join(DATA_DIR, "search_cache.db")
 CACHE_MAX_AGE = 7 * 24 * 60 * 60  # 7 days in seconds
+# Total size of cached search results before least recently used ones are evicted
+CACHE_MAX_BYTES = int(os.environ.get("EXCELSEEKER_CACHE_MAX_MB", 512)) * 1024 * 1024
+RESULT_BATCH_SIZE = 500  # Max results per streamed "results" event
+RESULT_SET_MAX_AGE = 30 * 60  # Finished result sets are kept for 30 minutes
+RESULT_SET_MAX_COUNT = 20  # Most recent result sets kept for paging
+RESULT_PAGE_MAX_SIZE = 1000
+BATCH_MAX_QUERIES = 100  # Max queries in one /search_batch request
+INDEX_FILE = os.path.join(DATA_DIR, "search_index.db")
+# Answer folder searches from the cell index instead of rescanning workbooks
+USE_INDEX = os.environ.get("EXCELSEEKER_USE_INDEX", "false").lower() == "true"
+MANIFEST_FILE = os.path.join(DATA_DIR, "file_manifest.db")
+# Extracted cells of scanned workbooks, so each one is only parsed once
+SHADOW_DIR = os.path.join(DATA_DIR, "shadow")
+SHADOW_MAX_BYTES = int(os.environ.get("EXCELSEEKER_SHADOW_MAX_MB", 1024)) * 1024 * 1024
+# Trust unchanged directory mtimes and skip re-stat'ing their files. Only safe
+# when workbooks are replaced rather than rewritten in place.
+TRUST_DIR_MTIME = (
+    os.environ.get("EXCELSEEKER_TRUST_DIR_MTIME", "false").lower() == "true"
+)
+# Folders kept indexed in the background (separated like PATH); more can be
+# given with --watch
+WATCH_FOLDERS = [
+    folder
+    for folder in os.environ.get("EXCELSEEKER_WATCH_FOLDERS", "").split(os.pathsep)
+    if folder
+]
+WATCH_DEBOUNCE = 2.0  # Seconds a workbook must be quiet before it is re-indexed
+WATCH_MAX_PENDING = 10000  # Queued changes before a folder is resynced in full
+WATCH_POLL_INTERVAL = 30.0  # Seconds between crawls when inotify is unavailable
+# Profiles of searches run with ?profile=sample or ?profile=cprofile
+PROFILE_DIR = os.path.join(DATA_DIR, "profiles")
+PROFILE_MAX_COUNT = 20  # Most recent profiles kept for download
 
 # Global variables
 folder_service_process = None
 search_integration = SearchIntegration()
+scan_executor = ScanExecutor(MAX_WORKERS)
+cell_index = CellIndex(INDEX_FILE)
+search_cache = SearchCacheStore(CACHE_FILE, CACHE_MAX_BYTES, CACHE_MAX_AGE)
+result_store = ResultStore(RESULT_SET_MAX_COUNT, RESULT_SET_MAX_AGE)
+skip_list_store = SkipListStore(SKIP_LIST_FILE)
+manifest_store = ManifestStore(MANIFEST_FILE, restat_files=not TRUST_DIR_MTIME)
+metrics_registry = MetricsRegistry()
+profile_store = ProfileStore(PROFILE_DIR, PROFILE_MAX_COUNT)
+shadow_store = ShadowStore(SHADOW_DIR, SHADOW_MAX_BYTES) if SHADOW_MAX_BYTES else None
+search_engine = SearchEngine(
+    scan_executor,
+    cell_index,
+    search_cache,
+    skip_list_store,
+    manifest_store,
+    query_processor=search_integration,
+    default_executor=SCAN_EXECUTOR,
+    metrics=metrics_registry,
+    shadow_store=shadow_store,
+)
+folder_watcher = None
 
 # Track active searches
 active_searches = {}
@@ -59,147 +134,7 @@ os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
 
 def allowed_file(filename):
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
-
-
-def format_cell_address(row, col):
-    """Convert row and column numbers to Excel cell reference."""
-    col_str = ""
-    while col:
-        col, remainder = divmod(col - 1, 26)
-        col_str = chr(65 + remainder) + col_str
-    return f"{col_str}{row}"
-
-
-def load_skip_list():
-    """Load the list of files to skip from JSON file."""
-    try:
-        if os.path.exists(SKIP_LIST_FILE):
-            if (
-                os.path.getsize(SKIP_LIST_FILE) > 0
-            ):  # Only try to load if file is not empty
-                try:
-                    with open(SKIP_LIST_FILE, "r") as f:
-                        data = json.load(f)
-                        # Handle both old format (list of strings) and new format (dict)
-                        if isinstance(data, list):
-                            return {path: "Unknown reason" for path in data}
-                        return data
-                except json.JSONDecodeError:
-                    logger.error("Skip list file is corrupted. Creating new one.")
-                    save_skip_list({})  # Reset the file if corrupted
-                    return {}
-            else:
-                logger.info("Skip list file is empty")
-                return {}
-        else:
-            logger.info("Skip list file does not exist. Creating new one.")
-            save_skip_list({})  # Create the file if it doesn't exist
-            return {}
-    except Exception as e:
-        logger.error(f"Error loading skip list: {e}")
-        return {}
-
-
-def save_skip_list(skip_list):
-    """Save the skip list to JSON file."""
-    try:
-        # Ensure all values are JSON serializable
-        serializable_skip_list = {}
-        for path, info in skip_list.items():
-            if isinstance(info, str):
-                # Convert old format to new format
-                info = {
-                    "reason": info,
-                    "timestamp": datetime.now().isoformat(),
-                    "file_exists": os.path.exists(path),
-                    "file_size": (
-                        os.path.getsize(path) if os.path.exists(path) else None
-                    ),
-                    "is_readable": (
-                        os.access(path, os.R_OK) if os.path.exists(path) else False
-                    ),
-                }
-            serializable_skip_list[str(path)] = info
-
-        with open(SKIP_LIST_FILE, "w") as f:
-            json.dump(serializable_skip_list, f, indent=2)
-    except Exception as e:
-        logger.error(f"Error saving skip list: {e}")
-
-
-def add_to_skip_list(file_path, reason="Unknown error"):
-    """Add a file to the skip list with a reason."""
-    try:
-        skip_list = load_skip_list()
-        abs_path = str(os.path.abspath(file_path))
-        error_info = {
-            "reason": str(reason),
-            "timestamp": datetime.now().isoformat(),
-            "file_exists": os.path.exists(abs_path),
-            "file_size": (
-                os.path.getsize(abs_path) if os.path.exists(abs_path) else None
-            ),
-            "is_readable": (
-                os.access(abs_path, os.R_OK) if os.path.exists(abs_path) else False
-            ),
-        }
-        skip_list[abs_path] = error_info
-        save_skip_list(skip_list)
-    except Exception as e:
-        logger.error(f"Error adding to skip list: {e}")
-
-
-def process_excel_file(file_path, search_text, search_mode="exact"):
-    """Process an Excel file and search for text."""
-    try:
-        workbook = xlrd.open_workbook(file_path)
-        results = []
-
-        # Split search text into keywords for ANY/ALL modes
-        search_text = search_text.lower()
-        if search_mode in ("any", "all"):
-            keywords = list(set(filter(None, search_text.split())))
-        else:
-            keywords = [search_text]
-
-        for sheet_index in range(workbook.nsheets):
-            sheet = workbook.sheet_by_index(sheet_index)
-            for row_idx in range(sheet.nrows):
-                for col_idx in range(sheet.ncols):
-                    try:
-                        cell_value = str(sheet.cell_value(row_idx, col_idx)).lower()
-                        if not cell_value:
-                            continue
-
-                        match = False
-                        if search_mode == "exact":
-                            match = keywords[0] in cell_value
-                        elif search_mode == "any":
-                            match = any(keyword in cell_value for keyword in keywords)
-                        elif search_mode == "all":
-                            match = all(keyword in cell_value for keyword in keywords)
-
-                        if match:
-                            results.append(
-                                {
-                                    "filename": os.path.basename(file_path),
-                                    "filepath": str(os.path.abspath(file_path)),
-                                    "sheet": sheet.name,
-                                    "cell": format_cell_address(
-                                        row_idx + 1, col_idx + 1
-                                    ),
-                                    "value": str(sheet.cell_value(row_idx, col_idx)),
-                                }
-                            )
-                    except Exception as e:
-                        logger.error(f"Error processing cell in {file_path}: {str(e)}")
-                        continue
-
-        return {"results": results, "count": len(results)}
-    except Exception as e:
-        logger.error(f"Error processing file {file_path}: {str(e)}")
-        return {"error": str(e), "skipped": True}
+    return filename.lower().endswith(workbook_suffixes())
 
 
 @app.route("/")
@@ -226,6 +161,27 @@ def search():
     if search_mode not in ("exact", "any", "all"):
         return jsonify({"error": "Invalid search mode"}), 400
 
+    profile_mode = request.form.get("profile")
+    if profile_mode and profile_mode not in PROFILE_MODES:
+        return jsonify({"error": "Invalid profile mode"}), 400
+    if not profile_mode:
+        return run_search(search_text, search_mode)
+
+    # The response stays the same; the profile is announced in headers
+    profiler = SearchProfiler(profile_mode)
+    profiler.start()
+    try:
+        response = make_response(run_search(search_text, search_mode))
+    finally:
+        profiler.stop()
+    profile = save_profile(str(uuid.uuid4()), profiler)
+    response.headers["X-Profile-Id"] = profile["id"]
+    response.headers["X-Profile-URL"] = profile["url"]
+    return response
+
+
+def run_search(search_text, search_mode):
+    """Search the uploaded file or the folder of a /search request."""
     results = []
     total_files = 0
     processed_files = 0
@@ -236,11 +192,7 @@ def search():
             if not os.path.isdir(folder_path):
                 return jsonify({"error": "Invalid folder path"}), 400
 
-            excel_files = []
-            for root, _, files in os.walk(folder_path):
-                excel_files.extend(
-                    [os.path.join(root, f) for f in files if f.endswith(".xls")]
-                )
+            excel_files = search_engine.find_excel_files(folder_path).paths()
 
             total_files = len(excel_files)
 
@@ -258,13 +210,17 @@ def search():
                 )
         else:
             file = request.files["file"]
-            if not file or not file.filename.endswith(".xls"):
+            if not file or not allowed_file(file.filename):
                 return jsonify({"error": "Invalid file type"}), 400
 
             temp_path = os.path.join(
                 app.config["UPLOAD_FOLDER"], secure_filename(file.filename)
             )
             file.save(temp_path)
+            # Refuse files whose contents no reader recognizes without parsing
+            if detect_reader(temp_path) is None:
+                os.remove(temp_path)
+                return jsonify({"error": "Invalid file type"}), 400
 
             results = process_excel_file(temp_path, search_text, search_mode)
             os.remove(temp_path)  # Clean up temporary file
@@ -275,171 +231,96 @@ def search():
         return jsonify({"error": str(e)}), 500
 
 
-def find_excel_files(folder_path):
-    """Recursively find all Excel files in the folder and its subdirectories."""
-    xls_files = []
-    try:
-        for root, _, files in os.walk(folder_path):
-            for file in files:
-                if file.lower().endswith(".xls"):
-                    xls_files.append(os.path.join(root, file))
-    except Exception as e:
-        logger.error(f"Error scanning directory {folder_path}: {str(e)}")
-    return xls_files
-
-
-def calculate_directory_hash(folder_path, skip_list):
-    """Calculate a hash of the directory state including file contents and skip list."""
-    hasher = hashlib.sha256()
-
-    # Get all Excel files
-    xls_files = find_excel_files(folder_path)
-
-    # Sort files for consistent hashing
-    xls_files.sort()
-
-    for file_path in xls_files:
-        abs_path = str(os.path.abspath(file_path))
-        if abs_path in skip_list:
-            continue
-
-        try:
-            # Add file path, size, and modification time to hash
-            stats = os.stat(file_path)
-            file_info = f"{abs_path}|{stats.st_size}|{stats.st_mtime}"
-            hasher.update(file_info.encode())
-        except Exception as e:
-            logger.error(f"Error hashing file {file_path}: {str(e)}")
-            continue
-
-    # Add skip list to hash
-    hasher.update(json.dumps(skip_list, sort_keys=True).encode())
-
-    return hasher.hexdigest()
-
-
-def cleanup_old_cache_entries():
-    """Remove cache entries older than CACHE_MAX_AGE."""
-    try:
-        cache = load_search_cache()
-        current_time = datetime.now()
-        updated_cache = {}
-
-        for key, data in cache.items():
-            try:
-                cache_time = datetime.fromisoformat(data["timestamp"])
-                if (current_time - cache_time).total_seconds() < CACHE_MAX_AGE:
-                    updated_cache[key] = data
-            except (ValueError, KeyError):
-                # Skip invalid entries
-                continue
-
-        if len(updated_cache) != len(cache):
-            save_search_cache(updated_cache)
-            logger.info(
-                f"Cleaned up {len(cache) - len(updated_cache)} old cache entries"
-            )
-    except Exception as e:
-        logger.error(f"Error cleaning up cache: {str(e)}")
-
-
-def save_search_cache(cache_data):
-    """Save search results cache to file."""
-    try:
-        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
-        with open(CACHE_FILE, "wb") as f:
-            pickle.dump(cache_data, f)
-    except Exception as e:
-        logger.error(f"Error saving cache: {str(e)}")
-
-
-def load_search_cache():
-    """Load search results cache from file."""
-    try:
-        if os.path.exists(CACHE_FILE):
-            with open(CACHE_FILE, "rb") as f:
-                return pickle.load(f)
-    except Exception as e:
-        logger.error(f"Error loading cache: {str(e)}")
-    return {}
-
-
-def get_cache_key(folder_path, search_text, search_mode):
-    """Generate a cache key for the search parameters."""
-    # Include skip list in cache key to invalidate when skip list changes
-    skip_list = load_skip_list()
-    skip_list_hash = hashlib.sha256(
-        json.dumps(skip_list, sort_keys=True).encode()
-    ).hexdigest()
-    return f"{folder_path}|{search_text}|{search_mode}|{skip_list_hash}"
-
-
-def search_filenames(
-    folder_path,
-    search_text,
-    use_wildcard=False,
-    use_regex=False,
-    extension_filter=None,
-    path_filter=None,
-):
-    """Search for files by filename only."""
-    results = []
-
-    # Process extension filter
-    allowed_extensions = None
-    if extension_filter:
-        allowed_extensions = set(
-            ext.strip().lower() for ext in extension_filter.split(",")
-        )
-
-    # Compile regex pattern if using regex
-    regex_pattern = None
-    if use_regex:
-        try:
-            regex_pattern = re.compile(search_text, re.IGNORECASE)
-        except re.error:
-            raise ValueError("Invalid regular expression pattern")
-
-    for root, _, files in os.walk(folder_path):
-        # Check path filter if specified
-        if path_filter:
-            rel_path = os.path.relpath(root, folder_path)
-            if not fnmatch.fnmatch(rel_path.lower(), path_filter.lower()):
-                continue
-
-        for filename in files:
-            # Check file extension if filter is specified
-            if allowed_extensions:
-                ext = os.path.splitext(filename)[1][1:].lower()
-                if ext not in allowed_extensions:
-                    continue
-
-            # Get relative path for display
-            rel_path = os.path.relpath(os.path.join(root, filename), folder_path)
+def start_folder_watcher(folders):
+    """Keep the cell index of the given folders current in the background."""
+    global folder_watcher
+    folder_watcher = FolderWatcher(
+        search_engine.reindex_file,
+        search_engine.index_folder,
+        debounce=WATCH_DEBOUNCE,
+        max_pending=WATCH_MAX_PENDING,
+        poll_interval=WATCH_POLL_INTERVAL,
+    )
+    for folder in folders:
+        folder_watcher.watch(folder)
+    folder_watcher.start()
+    return folder_watcher
+
+
+def default_use_index(folder_path):
+    """
+    Whether a search uses the cell index when the request does not say.
+
+    The index of watched folders is kept current in the background, so
+    searches under them use it; other folders would have to be indexed
+    while the request waits.
+    """
+    if USE_INDEX:
+        return True
+    return (
+        isinstance(folder_path, str)
+        and folder_watcher is not None
+        and folder_watcher.covers(folder_path)
+    )
+
+
+def save_profile(profile_id, profiler):
+    """Store a finished profile and describe it for the client."""
+    profiler.stop()
+    profile_store.save(profile_id, profiler)
+    return {
+        "id": profile_id,
+        "mode": profiler.mode,
+        "format": profiler.format,
+        "seconds": round(profiler.seconds, 6),
+        "url": f"/profiles/{profile_id}",
+    }
+
+
+class EventEncoder:
+    """Formats SSE messages and keeps the time spent encoding them."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, payload):
+        start = time.perf_counter()
+        message = f"data: {json.dumps(payload)}\n\n"
+        self.seconds += time.perf_counter() - start
+        return message
+
+    def finish(self, event):
+        """Encode a search's final event, adding the encoding time to its metrics."""
+        if "metrics" in event:
+            event["metrics"]["phases"]["encode"] = round(self.seconds, 6)
+        message = self(event)
+        metrics_registry.observe_phase("encode", self.seconds)
+        return message
+
+
+def result_events(results, encode=None):
+    """Split results into SSE "results" events of at most RESULT_BATCH_SIZE rows."""
+    encode = encode or EventEncoder()
+    for start in range(0, len(results), RESULT_BATCH_SIZE):
+        batch = {
+            "type": "results",
+            "results": results[start : start + RESULT_BATCH_SIZE],
+        }
+        yield encode(batch)
 
-            # Perform filename matching based on search mode
-            match = False
-            if use_regex and regex_pattern:
-                match = bool(regex_pattern.search(filename))
-            elif use_wildcard:
-                match = fnmatch.fnmatch(filename.lower(), search_text.lower())
-            else:
-                match = search_text.lower() in filename.lower()
-
-            if match:
-                results.append(
-                    {
-                        "filename": filename,
-                        "filepath": str(os.path.abspath(os.path.join(root, filename))),
-                        "relative_path": rel_path,
-                        "directory": root,
-                        "sheet": "N/A",  # Add these fields to match the expected format
-                        "cell": "N/A",  # for the results table
-                        "value": filename,  # Use filename as the value
-                    }
-                )
 
-    return results
+def store_result_set(search_id, completion_data, results):
+    """Keep a finished search's results for paging and add the handle to its payload."""
+    result_store.put(
+        search_id,
+        results,
+        {
+            "total_processed": completion_data["total_processed"],
+            "total_skipped": completion_data["total_skipped"],
+            "partial": completion_data.get("partial", False),
+        },
+    )
+    completion_data["result_handle"] = search_id
 
 
 @app.route("/search_folder")
@@ -448,7 +329,21 @@ def search_folder():
     # Capture all request parameters outside the generator
     folder_path = request.args.get("folder_path")
     search_text = request.args.get("search_text")
-    search_mode = request.args.get("search_mode", "exact")
+    # Without a mode, or with "nlp", the one inferred from the query's
+    # wording is used
+    search_mode = request.args.get("search_mode")
+    if search_mode == "nlp":
+        search_mode = None
+    executor_mode = request.args.get("executor", SCAN_EXECUTOR)
+    use_index = (
+        request.args.get("use_index", str(default_use_index(folder_path))).lower()
+        == "true"
+    )
+    # Send results in "results" events as files finish instead of one large
+    # "complete" payload at the end
+    stream_results = request.args.get("stream") == "true"
+    # Run the search under a profiler: "sample" or "cprofile"
+    profile_mode = request.args.get("profile")
 
     # Capture filename search parameters if needed
     filename_params = None
@@ -463,240 +358,159 @@ def search_folder():
     if not folder_path or not search_text:
         return jsonify({"error": "Missing folder path or search text"}), 400
 
+    if search_mode not in (None, "exact", "any", "all", "filename"):
+        return jsonify({"error": "Invalid search mode"}), 400
+
+    if executor_mode not in EXECUTOR_MODES:
+        return jsonify({"error": "Invalid executor mode"}), 400
+
+    if profile_mode and profile_mode not in PROFILE_MODES:
+        return jsonify({"error": "Invalid profile mode"}), 400
+
     def generate():
         search_id = str(uuid.uuid4())
         cancel_event = threading.Event()
         active_searches[search_id] = cancel_event
-        total_results = 0
-        all_results = []
+        encode = EventEncoder()
+        profiler = SearchProfiler(profile_mode) if profile_mode else None
 
         try:
             # Send search ID first
             yield f"data: {json.dumps({'search_id': search_id})}\n\n"
 
-            if not os.path.exists(folder_path):
-                yield f"data: {json.dumps({'error': 'Folder not found'})}\n\n"
-                return
+            if profiler:
+                profiler.start()
+            for event in search_engine.search_folder(
+                folder_path,
+                search_text,
+                search_mode,
+                executor_mode=executor_mode,
+                use_index=use_index,
+                cancel_event=cancel_event,
+                filename_options=filename_params,
+                profiler=profiler,
+            ):
+                event_type = event.get("type")
+                if event_type == "results":
+                    # Rows are sent as they are found when streaming and only
+                    # in the final payload otherwise
+                    if stream_results:
+                        yield from result_events(event["results"], encode)
+                    continue
+                if event_type in ("complete", "cancelled"):
+                    store_result_set(search_id, event, event["results"])
+                    if stream_results:
+                        # Only a summary; the rows were sent as "results" events
+                        del event["results"]
+                        event["streamed"] = True
+                    if profiler:
+                        # Stored under the search ID, downloadable from
+                        # /profiles/<search_id>
+                        event["profile"] = save_profile(search_id, profiler)
+                    yield encode.finish(event)
+                    continue
+                yield encode(event)
 
-            # Handle filename search mode
-            if search_mode == "filename":
-                try:
-                    # Perform filename search using captured parameters
-                    results = search_filenames(
-                        folder_path,
-                        search_text,
-                        filename_params["use_wildcard"],
-                        filename_params["use_regex"],
-                        filename_params["extension_filter"],
-                        filename_params["path_filter"],
-                    )
+        except Exception as e:
+            logger.error(f"Error in search {search_id}: {str(e)}")
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
 
-                    # Send progress update
-                    progress_data = {
-                        "type": "progress",
-                        "current_file": "Searching filenames...",
-                        "processed": 1,
-                        "total": 1,
-                        "results_found": len(results),
-                    }
-                    yield f"data: {json.dumps(progress_data)}\n\n"
-
-                    # Send completion data
-                    completion_data = {
-                        "type": "complete",
-                        "results": results,
-                        "total_processed": 1,
-                        "total_skipped": 0,
-                        "skipped_files": [],
-                        "total_results": len(results),
-                        "from_cache": False,
-                    }
-                    yield f"data: {json.dumps(completion_data)}\n\n"
-                    return
-                except Exception as e:
-                    logger.error(f"Error in filename search: {str(e)}")
-                    yield f"data: {json.dumps({'error': str(e)})}\n\n"
-                    return
-
-            # Process natural language query for non-filename searches
-            search_params = search_integration.process_query(search_text)
-            logger.info(f"Processed search parameters: {search_params}")
-
-            # Load skip list
-            skip_list = load_skip_list()
-
-            # Calculate directory hash and check cache
-            dir_hash = calculate_directory_hash(folder_path, skip_list)
-            cache = load_search_cache()
-            cache_key = get_cache_key(
-                folder_path, json.dumps(search_params), search_mode
-            )
+        finally:
+            if profiler:
+                profiler.stop()
+            logger.info(f"Cleaning up search {search_id}")
+            if search_id in active_searches:
+                del active_searches[search_id]
 
-            if cache_key in cache and cache[cache_key]["hash"] == dir_hash:
-                logger.info("Using cached results")
-                cached_data = cache[cache_key]
-                cached_response = {
-                    "type": "complete",
-                    "results": cached_data["results"],
-                    "total_processed": cached_data["total_processed"],
-                    "total_skipped": cached_data["total_skipped"],
-                    "skipped_files": cached_data["skipped_files"],
-                    "total_results": len(cached_data["results"]),
-                    "from_cache": True,
-                }
-                yield f"data: {json.dumps(cached_response)}\n\n"
-                return
-
-            # Get all XLS files
-            xls_files = find_excel_files(folder_path)
-            if not xls_files:
-                yield f"data: {json.dumps({'error': 'No .xls files found in folder'})}\n\n"
-                return
-
-            # Prepare skipped files info
-            skipped_files = []
-
-            # Check for previously skipped files in this folder
-            for file_path in xls_files:
-                abs_path = str(os.path.abspath(file_path))
-                if abs_path in skip_list:
-                    skipped_files.append(
-                        {
-                            "file": os.path.basename(file_path),
-                            "path": abs_path,
-                            "reason": skip_list[abs_path],
-                        }
-                    )
+    return Response(generate(), mimetype="text/event-stream")
 
-            # Filter out skipped files from processing list
-            xls_files = [
-                f for f in xls_files if str(os.path.abspath(f)) not in skip_list
-            ]
-            total_files = len(xls_files)
-            processed = 0
-
-            # If there are previously skipped files, send initial skipped files update
-            if skipped_files:
-                progress_data = {
-                    "type": "progress",
-                    "current_file": "Starting search...",
-                    "processed": 0,
-                    "total": total_files,
-                    "skipped_files": len(skipped_files),
-                    "results_found": 0,
-                }
-                yield f"data: {json.dumps(progress_data)}\n\n"
-
-            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                for file_path in xls_files:
-                    # Check for cancellation
-                    if cancel_event.is_set():
-                        logger.info(f"Search {search_id} cancelled")
-                        # Send partial results if any were found
-                        completion_data = {
-                            "type": "cancelled",
-                            "results": all_results,
-                            "total_processed": processed,
-                            "total_skipped": len(skipped_files),
-                            "skipped_files": skipped_files,
-                            "total_results": total_results,
-                            "partial": True,
-                        }
-                        yield f"data: {json.dumps(completion_data)}\n\n"
-                        return
-
-                    processed += 1
-                    try:
-                        # Use search parameters from NLP processing
-                        result = process_excel_file(
-                            file_path,
-                            search_params["search_text"],
-                            search_params.get("search_mode", search_mode),
-                        )
 
-                        if "results" in result:
-                            # Apply NLP-based filters to results
-                            filtered_results = search_integration.apply_filters(
-                                result["results"], search_params.get("filters", {})
-                            )
-                            all_results.extend(filtered_results)
-                            total_results += len(filtered_results)
-                        elif result.get("skipped"):
-                            error_msg = result.get("error", "Unknown error")
-                            skipped_files.append(
-                                {
-                                    "file": os.path.basename(file_path),
-                                    "reason": error_msg,
-                                }
-                            )
-                            # Add to persistent skip list
-                            add_to_skip_list(file_path, error_msg)
-                    except Exception as e:
-                        error_msg = str(e)
-                        logger.error(f"Error processing {file_path}: {error_msg}")
-                        skipped_files.append(
-                            {"file": os.path.basename(file_path), "reason": error_msg}
-                        )
-                        # Add to persistent skip list
-                        add_to_skip_list(file_path, error_msg)
-                        continue
-
-                    # Send progress update
-                    progress_data = {
-                        "type": "progress",
-                        "current_file": os.path.basename(file_path),
-                        "processed": processed,
-                        "total": total_files,
-                        "skipped_files": len(skipped_files),
-                        "results_found": total_results,
-                    }
-                    yield f"data: {json.dumps(progress_data)}\n\n"
-
-                    # Check for cancellation again after progress update
-                    if cancel_event.is_set():
-                        logger.info(
-                            f"Search {search_id} cancelled after progress update"
-                        )
-                        # Send partial results if any were found
-                        completion_data = {
-                            "type": "cancelled",
-                            "results": all_results,
-                            "total_processed": processed,
-                            "total_skipped": len(skipped_files),
-                            "skipped_files": skipped_files,
-                            "total_results": total_results,
-                            "partial": True,
-                        }
-                        yield f"data: {json.dumps(completion_data)}\n\n"
-                        return
-
-            # Store results in cache
-            cache_data = {
-                "hash": dir_hash,
-                "timestamp": datetime.now().isoformat(),
-                "results": all_results,
-                "total_processed": processed,
-                "total_skipped": len(skipped_files),
-                "skipped_files": skipped_files,
-            }
-            cache[cache_key] = cache_data
-            save_search_cache(cache)
-
-            # Send completion data
-            completion_data = {
-                "type": "complete",
-                "results": all_results,
-                "total_processed": processed,
-                "total_skipped": len(skipped_files),
-                "skipped_files": skipped_files,
-                "total_results": total_results,
-                "from_cache": False,
+@app.route("/search_batch", methods=["POST"])
+def search_batch():
+    """
+    Run several queries over one folder, opening each workbook once.
+
+    Expects a JSON body with "folder_path" and "queries", a list of objects
+    with "text" and optionally "id", "mode" and "filters". Optional
+    "executor" and "use_index" work as on /search_folder. Responds with an
+    SSE stream: the search ID, "results" events tagged with the "query_id"
+    they belong to, progress events, and a "complete" (or "cancelled")
+    summary with the number of results per query.
+    """
+    data = request.get_json(silent=True) or {}
+    folder_path = data.get("folder_path")
+    executor_mode = data.get("executor", SCAN_EXECUTOR)
+    use_index = (
+        str(data.get("use_index", default_use_index(folder_path))).lower() == "true"
+    )
+    raw_queries = data.get("queries")
+
+    if not folder_path or not isinstance(raw_queries, list) or not raw_queries:
+        return jsonify({"error": "Missing folder path or queries"}), 400
+
+    if len(raw_queries) > BATCH_MAX_QUERIES:
+        return (
+            jsonify({"error": f"At most {BATCH_MAX_QUERIES} queries per batch"}),
+            400,
+        )
+
+    if executor_mode not in EXECUTOR_MODES:
+        return jsonify({"error": "Invalid executor mode"}), 400
+
+    queries = []
+    for number, query in enumerate(raw_queries, 1):
+        if isinstance(query, str):
+            query = {"text": query}
+        if not isinstance(query, dict) or not str(query.get("text", "")).strip():
+            return jsonify({"error": f"Query {number} has no search text"}), 400
+        if query.get("mode") not in (None, "exact", "any", "all"):
+            return jsonify({"error": f"Invalid search mode for query {number}"}), 400
+        if not isinstance(query.get("filters", {}), dict):
+            return jsonify({"error": f"Invalid filters for query {number}"}), 400
+        queries.append(
+            {
+                "id": str(query.get("id", number)),
+                "text": str(query["text"]).strip(),
+                "mode": query.get("mode"),
+                "filters": query.get("filters"),
             }
-            logger.info(f"Search completed. Sending completion data: {completion_data}")
-            yield f"data: {json.dumps(completion_data)}\n\n"
+        )
+    if len({query["id"] for query in queries}) != len(queries):
+        return jsonify({"error": "Query ids must be unique"}), 400
+
+    def generate():
+        search_id = str(uuid.uuid4())
+        cancel_event = threading.Event()
+        active_searches[search_id] = cancel_event
+        encode = EventEncoder()
+
+        try:
+            # Send search ID first
+            yield f"data: {json.dumps({'search_id': search_id})}\n\n"
+
+            for event in search_engine.search_batch(
+                folder_path,
+                queries,
+                executor_mode=executor_mode,
+                use_index=use_index,
+                cancel_event=cancel_event,
+            ):
+                event_type = event.get("type")
+                if event_type == "results":
+                    for start in range(0, len(event["results"]), RESULT_BATCH_SIZE):
+                        batch = dict(
+                            event,
+                            results=event["results"][start : start + RESULT_BATCH_SIZE],
+                        )
+                        yield encode(batch)
+                    continue
+                if event_type in ("complete", "cancelled"):
+                    yield encode.finish(event)
+                    continue
+                yield encode(event)
 
         except Exception as e:
-            logger.error(f"Error in search {search_id}: {str(e)}")
+            logger.error(f"Error in batch search {search_id}: {str(e)}")
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
 
         finally:
@@ -707,6 +521,63 @@ def search_folder():
     return Response(generate(), mimetype="text/event-stream")
 
 
+@app.route("/metrics")
+def metrics():
+    """Aggregated search metrics in the Prometheus text format."""
+    return Response(
+        metrics_registry.render(), mimetype="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.route("/profiles/<profile_id>")
+def download_profile(profile_id):
+    """Download the profile of a search run with the profile parameter."""
+    found = profile_store.find(profile_id)
+    if found is None:
+        return jsonify({"error": "Profile not found"}), 404
+    path, profile_format = found
+    return send_file(
+        path,
+        mimetype=(
+            "text/plain"
+            if profile_format == "collapsed"
+            else "application/octet-stream"
+        ),
+        as_attachment=True,
+        download_name=os.path.basename(path),
+    )
+
+
+@app.route("/results/<search_id>", methods=["GET", "DELETE"])
+def search_results(search_id):
+    """Page through, sort and filter the results of a finished search."""
+    if request.method == "DELETE":
+        if result_store.discard(search_id):
+            return jsonify({"message": "Results released"})
+        return jsonify({"error": "Results not found"}), 404
+
+    try:
+        page = int(request.args.get("page", 1))
+        page_size = min(int(request.args.get("page_size", 100)), RESULT_PAGE_MAX_SIZE)
+        if page_size < 1:
+            raise ValueError("page_size must be positive")
+        page_data = result_store.page(
+            search_id,
+            page=page,
+            page_size=page_size,
+            sort_key=request.args.get("sort") or None,
+            descending=request.args.get("direction", "asc") == "desc",
+            filter_text=request.args.get("filter", ""),
+            filter_column=request.args.get("filter_column", "all"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if page_data is None:
+        return jsonify({"error": "Results not found or expired"}), 404
+    return jsonify(page_data)
+
+
 def is_folder_service_running():
     try:
         response = requests.get("http://localhost:3000/health", timeout=1)
@@ -892,7 +763,7 @@ def cleanup_services(folder_service_process):
 @app.route("/skip-list", methods=["GET", "DELETE"])
 def manage_skip_list():
     if request.method == "GET":
-        skip_list = load_skip_list()
+        skip_list = skip_list_store.snapshot()
         # Convert to list of objects with full path information
         skip_list_array = [
             {
@@ -908,7 +779,7 @@ def manage_skip_list():
     elif request.method == "DELETE":
         try:
             # Clear the skip list
-            save_skip_list({})
+            skip_list_store.clear()
             return jsonify({"message": "Skip list cleared successfully"})
         except Exception as e:
             return jsonify({"error": str(e)}), 500
@@ -1088,6 +959,18 @@ def select_folder():
 
 
 if __name__ == "__main__":
+    # Required for the process scan pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="ExcelSeeker web app")
+    parser.add_argument(
+        "--watch",
+        action="append",
+        default=[],
+        metavar="FOLDER",
+        help="keep the cell index of FOLDER current in the background "
+        "(can be repeated)",
+    )
+    args = parser.parse_args()
     try:
         # Ensure the application can find its templates and static files
         template_dir = os.path.join(
@@ -1117,6 +1000,16 @@ if __name__ == "__main__":
 
         # Register cleanup function
         atexit.register(cleanup_services, folder_service_process)
+        atexit.register(scan_executor.shutdown)
+        atexit.register(skip_list_store.compact)
+
+        # Start the background indexer for watched folders. The debug
+        # reloader also runs this block in a parent process that only
+        # restarts the server, so only the serving child starts it.
+        watch_folders = WATCH_FOLDERS + args.watch
+        if watch_folders and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            start_folder_watcher(watch_folders)
+            atexit.register(folder_watcher.stop)
 
         # Start the server
         print("\nStarting server on http://127.0.0.1:8080")
@@ -0,0 +1,149 @@
+"""
+Microbenchmark for the workbook scanning kernel.
+
+Builds a synthetic .xls file with a mix of text and number cells and reports
+cells/sec for the original per-cell loop and for the current kernel. Both run
+over the same already-parsed workbook, so xlrd's parsing time (reported
+separately) does not hide the difference.
+
+Usage:
+    python benchmarks/bench_scan.py [--rows N] [--sheets N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import xlrd
+import xlwt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.readers import XlsWorkbook  # noqa: E402
+from engine.scanner import match_cells  # noqa: E402
+
+WORDS = [
+    "invoice",
+    "budget",
+    "travel",
+    "office",
+    "payroll",
+    "quarter",
+    "forecast",
+    "vendor",
+    "contract",
+    "approved",
+]
+
+QUERIES = [
+    ("budget", "exact"),
+    ("travel budget", "exact"),
+    ("vendor payroll forecast", "any"),
+    ("budget approved", "all"),
+    ("1250", "exact"),
+]
+
+
+def build_workbook(path, sheets, rows, cols=10):
+    """Write a workbook where every third cell is a number."""
+    rng = random.Random(42)
+    workbook = xlwt.Workbook()
+    for sheet_index in range(sheets):
+        sheet = workbook.add_sheet(f"Sheet{sheet_index + 1}")
+        for row_idx in range(rows):
+            for col_idx in range(cols):
+                if col_idx % 3 == 2:
+                    sheet.write(row_idx, col_idx, rng.randint(0, 100000) / 4)
+                else:
+                    sheet.write(row_idx, col_idx, " ".join(rng.sample(WORDS, 3)))
+    workbook.save(path)
+    return sheets * rows * cols
+
+
+def legacy_scan(workbook, search_text, search_mode="exact"):
+    """The original per-cell loop, kept here as the baseline."""
+    matches = []
+    search_text = search_text.lower()
+    if search_mode in ("any", "all"):
+        keywords = list(set(filter(None, search_text.split())))
+    else:
+        keywords = [search_text]
+
+    for sheet_index in range(workbook.nsheets):
+        sheet = workbook.sheet_by_index(sheet_index)
+        for row_idx in range(sheet.nrows):
+            for col_idx in range(sheet.ncols):
+                try:
+                    cell_value = str(sheet.cell_value(row_idx, col_idx)).lower()
+                    if not cell_value:
+                        continue
+
+                    match = False
+                    if search_mode == "exact":
+                        match = keywords[0] in cell_value
+                    elif search_mode == "any":
+                        match = any(keyword in cell_value for keyword in keywords)
+                    elif search_mode == "all":
+                        match = all(keyword in cell_value for keyword in keywords)
+
+                    if match:
+                        matches.append(
+                            (
+                                sheet.name,
+                                row_idx,
+                                col_idx,
+                                str(sheet.cell_value(row_idx, col_idx)),
+                            )
+                        )
+                except Exception:
+                    continue
+    return matches
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--sheets", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.xls")
+        cells = build_workbook(path, args.sheets, args.rows)
+        parse, workbook = best_time(lambda: xlrd.open_workbook(path), args.repeat)
+        print(
+            f"{cells} cells, {os.path.getsize(path) / 1e6:.1f} MB, "
+            f"xlrd parse {cells / parse:,.0f} cells/s"
+        )
+
+    print(f"{'query':<28} {'mode':<6} {'before':>14} {'after':>14} {'speedup':>8}")
+    for text, mode in QUERIES:
+        before, expected = best_time(
+            lambda: legacy_scan(workbook, text, mode), args.repeat
+        )
+        after, result = best_time(
+            lambda: match_cells(XlsWorkbook(workbook), text, mode), args.repeat
+        )
+        if result != expected:
+            raise SystemExit(f"Results differ for {text!r} ({mode})")
+        print(
+            f"{text!r:<28} {mode:<6} {cells / before:>12,.0f}/s "
+            f"{cells / after:>12,.0f}/s {before / after:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
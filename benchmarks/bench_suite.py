@@ -0,0 +1,330 @@
+"""
+End-to-end benchmark suite with machine-readable output.
+
+Generates a synthetic corpus (see corpus.py) and times:
+
+- folder searches through /search_folder: a cold search on empty stores, a
+  warm search for a new query (cache miss), and a repeated query (cache hit)
+- the same cold and warm searches answered from the cell index
+- the natural language query parser
+- skip list operations: adding, snapshotting, lookups, removing, reloading
+
+Every measurement is repeated; the JSON report lists each run together with
+the minimum and median, plus the corpus parameters, the git revision and the
+platform, so reports from different releases can be compared.
+
+Usage:
+    python benchmarks/bench_suite.py [-o report.json] [--repeat N]
+        [--corpus DIR] [corpus options, see corpus.py --help]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import (  # noqa: E402
+    add_corpus_arguments,
+    generate_corpus,
+    params_from_args,
+)
+
+REPORT_SCHEMA = 1
+# First query runs cold; the second is new to the cache but finds the
+# folder manifest and skip list warm
+COLD_QUERY = ("budget", "exact")
+WARM_QUERY = ("vendor approved", "all")
+NLP_QUERIES = [
+    "budget",
+    "travel expenses over $500",
+    "invoices from last quarter",
+    "all of vendor and contract",
+    "not pending marketing",
+    "payroll between $1000 and $5000 in 2023",
+]
+SKIP_LIST_ENTRIES = 1000
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty", "--tags"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(runs, **extra):
+    """Summarize the seconds of repeated runs."""
+    return dict(
+        extra,
+        runs=[round(run, 6) for run in runs],
+        min=round(min(runs), 6),
+        median=round(statistics.median(runs), 6),
+    )
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+class SearchBench:
+    """Runs searches through the Flask app, each repeat on fresh stores."""
+
+    def __init__(self, app_module, data_root):
+        self.app = app_module
+        self.client = app_module.app.test_client()
+        self.data_root = data_root
+        self.runs = 0
+
+    def reset_stores(self):
+        """
+        Point the app at empty stores, as on a first start.
+
+        The workbook cache is emptied as well, and process workers, which
+        hold caches of their own, are restarted.
+        """
+        from engine import (
+            CellIndex,
+            ManifestStore,
+            SearchCacheStore,
+            SearchEngine,
+            ShadowStore,
+            SkipListStore,
+            workbook_cache,
+        )
+
+        self.runs += 1
+        data_dir = os.path.join(self.data_root, f"run{self.runs}")
+        os.makedirs(data_dir)
+        app = self.app
+        workbook_cache.clear()
+        app.scan_executor.discard("process")
+        app.search_engine = SearchEngine(
+            app.scan_executor,
+            CellIndex(os.path.join(data_dir, "search_index.db")),
+            SearchCacheStore(
+                os.path.join(data_dir, "search_cache.db"),
+                app.CACHE_MAX_BYTES,
+                app.CACHE_MAX_AGE,
+            ),
+            SkipListStore(os.path.join(data_dir, "skip_list.json")),
+            ManifestStore(os.path.join(data_dir, "file_manifest.db")),
+            query_processor=app.search_integration,
+            default_executor=app.SCAN_EXECUTOR,
+            shadow_store=(
+                ShadowStore(os.path.join(data_dir, "shadow"), app.SHADOW_MAX_BYTES)
+                if app.SHADOW_MAX_BYTES
+                else None
+            ),
+        )
+
+    def search(self, folder, query, use_index=False):
+        """Run one search to completion; returns (seconds, final event)."""
+        text, mode = query
+
+        def run():
+            response = self.client.get(
+                "/search_folder",
+                query_string={
+                    "folder_path": folder,
+                    "search_text": text,
+                    "search_mode": mode,
+                    "use_index": str(use_index).lower(),
+                },
+            )
+            events = [
+                json.loads(line[6:])
+                for line in response.get_data(as_text=True).split("\n")
+                if line.startswith("data: ")
+            ]
+            return events[-1]
+
+        elapsed, final = timed(run)
+        if "error" in final:
+            raise RuntimeError(f"Search for {text!r} failed: {final['error']}")
+        self.app.result_store.discard(final.get("result_handle"))
+        return elapsed, final
+
+    def run(self, folder, repeat):
+        phases = {
+            "search_cold": [],
+            "search_warm_miss": [],
+            "search_cache_hit": [],
+            "index_cold": [],
+            "index_warm": [],
+        }
+        counts = {}
+
+        def record(name, result):
+            elapsed, final = result
+            metrics = final.get("metrics", {})
+            if name.endswith("_cold") and (
+                metrics.get("files_cached") or metrics.get("files_shadow")
+            ):
+                raise RuntimeError(f"{name} read workbooks from a warm cache")
+            phases[name].append(elapsed)
+            counts[name] = {
+                "files": final["total_processed"],
+                "skipped": final["total_skipped"],
+                "results": final["total_results"],
+                "from_cache": final.get("from_cache", False),
+                "files_cached": metrics.get("files_cached", 0),
+                "files_shadow": metrics.get("files_shadow", 0),
+            }
+
+        for _ in range(repeat):
+            self.reset_stores()
+            record("search_cold", self.search(folder, COLD_QUERY))
+            record("search_warm_miss", self.search(folder, WARM_QUERY))
+            record("search_cache_hit", self.search(folder, WARM_QUERY))
+
+            self.reset_stores()
+            record("index_cold", self.search(folder, COLD_QUERY, use_index=True))
+            record("index_warm", self.search(folder, WARM_QUERY, use_index=True))
+
+        return {name: summarize(runs, **counts[name]) for name, runs in phases.items()}
+
+
+def bench_nlp(repeat, iterations=200):
+    """Time the natural language parser per query."""
+    from nlp.search_integration import SearchIntegration
+
+    integration = SearchIntegration()
+    runs = []
+    for _ in range(repeat):
+        elapsed, _ = timed(
+            lambda: [
+                integration.process_query(query)
+                for _ in range(iterations)
+                for query in NLP_QUERIES
+            ]
+        )
+        runs.append(elapsed / (iterations * len(NLP_QUERIES)))
+    return {"process_query": summarize(runs, queries=len(NLP_QUERIES))}
+
+
+def bench_skip_list(repeat, entries=SKIP_LIST_ENTRIES):
+    """Time skip list changes, snapshots, lookups and reloading."""
+    from engine import SkipListStore
+
+    phases = {
+        "add": [],
+        "snapshot": [],
+        "lookup": [],
+        "remove": [],
+        "reload": [],
+    }
+    for _ in range(repeat):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "skip_list.json")
+            files = [
+                os.path.join(tmp_dir, f"missing_{index:05d}.xls")
+                for index in range(entries)
+            ]
+            store = SkipListStore(path)
+
+            elapsed, _ = timed(lambda: [store.add(f, "Corrupt file") for f in files])
+            phases["add"].append(elapsed)
+            elapsed, snapshot = timed(store.snapshot)
+            phases["snapshot"].append(elapsed)
+            elapsed, _ = timed(lambda: [f in snapshot for f in files * 10])
+            phases["lookup"].append(elapsed)
+            elapsed, _ = timed(lambda: [store.remove(f) for f in files[::2]])
+            phases["remove"].append(elapsed)
+            elapsed, _ = timed(lambda: SkipListStore(path))
+            phases["reload"].append(elapsed)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    operations = {
+        "add": entries,
+        "snapshot": 1,
+        "lookup": entries * 10,
+        "remove": entries // 2,
+        "reload": 1,
+    }
+    return {
+        name: summarize(runs, operations=operations[name])
+        for name, runs in phases.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--corpus", help="Search this folder instead of generating a corpus"
+    )
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="excelseeker-bench-")
+    try:
+        if args.corpus:
+            folder = os.path.abspath(args.corpus)
+            corpus = {"path": folder}
+        else:
+            folder = os.path.join(work_dir, "corpus")
+            corpus = generate_corpus(folder, **params_from_args(args))
+
+        # Keep the app's own stores out of the repository; every search
+        # phase still gets fresh stores of its own
+        os.environ["EXCELSEEKER_DATA_DIR"] = os.path.join(work_dir, "data")
+        os.makedirs(os.environ["EXCELSEEKER_DATA_DIR"])
+        import app as app_module
+
+        logging.disable(logging.CRITICAL)
+        try:
+            results = {
+                "search": SearchBench(app_module, work_dir).run(folder, args.repeat),
+                "nlp": bench_nlp(args.repeat),
+                "skip_list": bench_skip_list(args.repeat),
+            }
+        finally:
+            app_module.scan_executor.shutdown()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "schema": REPORT_SCHEMA,
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "workers": app_module.MAX_WORKERS,
+        "executor": app_module.SCAN_EXECUTOR,
+        "repeat": args.repeat,
+        "corpus": corpus,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Synthetic workbook corpus for benchmarks.
+
+Writes a folder tree of .xls files with a configurable number of files,
+sheets, rows and columns, a mix of text and number cells, and a fraction of
+corrupt files that searches have to skip. The same seed always produces the
+same corpus, so timings from different runs and releases are comparable.
+
+Usage:
+    python benchmarks/corpus.py OUT_DIR [--files N] [--sheets N] [--rows N]
+        [--cols N] [--number-ratio F] [--corrupt-ratio F] [--seed N]
+"""
+
+import argparse
+import json
+import os
+import random
+
+import xlwt
+
+# Words used to fill text cells; queries in bench_suite.py pick from these
+WORDS = [
+    "invoice",
+    "budget",
+    "travel",
+    "office",
+    "payroll",
+    "quarter",
+    "forecast",
+    "vendor",
+    "contract",
+    "approved",
+    "pending",
+    "marketing",
+    "engineering",
+    "finance",
+    "supplies",
+    "training",
+]
+# Files are spread over this many subfolders, two levels deep
+SUBFOLDERS = 8
+
+
+def corpus_params(
+    files=50,
+    sheets=3,
+    rows=500,
+    cols=8,
+    number_ratio=0.3,
+    corrupt_ratio=0.05,
+    seed=42,
+):
+    """Return the parameters describing a corpus, with defaults filled in."""
+    return {
+        "files": files,
+        "sheets": sheets,
+        "rows": rows,
+        "cols": cols,
+        "number_ratio": number_ratio,
+        "corrupt_ratio": corrupt_ratio,
+        "seed": seed,
+    }
+
+
+def write_workbook(path, rng, sheets, rows, cols, number_ratio):
+    """Write one workbook; returns the number of cells written."""
+    workbook = xlwt.Workbook()
+    for sheet_index in range(sheets):
+        sheet = workbook.add_sheet(f"Sheet{sheet_index + 1}")
+        for row_idx in range(rows):
+            for col_idx in range(cols):
+                if rng.random() < number_ratio:
+                    sheet.write(row_idx, col_idx, rng.randint(0, 1000000) / 100)
+                else:
+                    sheet.write(
+                        row_idx,
+                        col_idx,
+                        " ".join(rng.sample(WORDS, rng.randint(1, 4))),
+                    )
+    workbook.save(path)
+    return sheets * rows * cols
+
+
+def write_corrupt(path, rng):
+    """Write a file with an .xls name that is not a workbook."""
+    with open(path, "wb") as f:
+        f.write(bytes(rng.getrandbits(8) for _ in range(rng.randint(16, 4096))))
+
+
+def generate_corpus(out_dir, **params):
+    """
+    Write a corpus into out_dir.
+
+    Args:
+        out_dir: Folder to write into; created if missing
+        params: Overrides for corpus_params
+
+    Returns:
+        The corpus parameters together with the numbers of workbooks,
+        corrupt files and cells, and the total size in bytes
+    """
+    params = corpus_params(**params)
+    rng = random.Random(params["seed"])
+    corrupt = set(
+        rng.sample(
+            range(params["files"]), round(params["files"] * params["corrupt_ratio"])
+        )
+    )
+
+    cells = 0
+    total_bytes = 0
+    for file_index in range(params["files"]):
+        folder = os.path.join(
+            out_dir,
+            f"dept{file_index % SUBFOLDERS}",
+            f"{2020 + file_index % 5}",
+        )
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"report_{file_index:05d}.xls")
+        if file_index in corrupt:
+            write_corrupt(path, rng)
+        else:
+            cells += write_workbook(
+                path,
+                rng,
+                params["sheets"],
+                params["rows"],
+                params["cols"],
+                params["number_ratio"],
+            )
+        total_bytes += os.path.getsize(path)
+
+    return dict(
+        params,
+        workbooks=params["files"] - len(corrupt),
+        corrupt_files=len(corrupt),
+        cells=cells,
+        bytes=total_bytes,
+    )
+
+
+def add_corpus_arguments(parser):
+    """Add the corpus options to an argument parser."""
+    defaults = corpus_params()
+    parser.add_argument("--files", type=int, default=defaults["files"])
+    parser.add_argument("--sheets", type=int, default=defaults["sheets"])
+    parser.add_argument("--rows", type=int, default=defaults["rows"])
+    parser.add_argument("--cols", type=int, default=defaults["cols"])
+    parser.add_argument(
+        "--number-ratio",
+        type=float,
+        default=defaults["number_ratio"],
+        help="Fraction of cells holding numbers instead of text",
+    )
+    parser.add_argument(
+        "--corrupt-ratio",
+        type=float,
+        default=defaults["corrupt_ratio"],
+        help="Fraction of files that are not valid workbooks",
+    )
+    parser.add_argument("--seed", type=int, default=defaults["seed"])
+
+
+def params_from_args(args):
+    return corpus_params(
+        files=args.files,
+        sheets=args.sheets,
+        rows=args.rows,
+        cols=args.cols,
+        number_ratio=args.number_ratio,
+        corrupt_ratio=args.corrupt_ratio,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("out_dir", help="Folder to write the corpus into")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+    print(json.dumps(generate_corpus(args.out_dir, **params_from_args(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
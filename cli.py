@@ -0,0 +1,276 @@
+"""Command line folder search, sharing the search engine with the web app.
+
+Runs one or more queries over a folder without starting the server. Every
+workbook is opened once for all queries, and results are written as JSON
+lines or CSV, tagged with the query they belong to.
+
+Examples:
+    python cli.py /data/reports -q "John Smith" -q invoice
+    python cli.py /data/reports --queries-file queries.txt --format csv -o out.csv
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+
+from engine import (
+    EXECUTOR_MODES,
+    ScanExecutor,
+    CellIndex,
+    SearchCacheStore,
+    SkipListStore,
+    ManifestStore,
+    SearchEngine,
+    ShadowStore,
+)
+
+# The CLI shares its stores with the web app, so both benefit from the
+# same index, skip list and folder manifests
+DATA_DIR = os.environ.get(
+    "EXCELSEEKER_DATA_DIR", os.path.dirname(os.path.abspath(__file__))
+)
+SKIP_LIST_FILE = os.path.join(DATA_DIR, "skip_list.json")
+CACHE_FILE = os.path.join(DATA_DIR, "search_cache.db")
+CACHE_MAX_AGE = 7 * 24 * 60 * 60  # 7 days in seconds
+CACHE_MAX_BYTES = int(os.environ.get("EXCELSEEKER_CACHE_MAX_MB", 512)) * 1024 * 1024
+INDEX_FILE = os.path.join(DATA_DIR, "search_index.db")
+MANIFEST_FILE = os.path.join(DATA_DIR, "file_manifest.db")
+SHADOW_DIR = os.path.join(DATA_DIR, "shadow")
+SHADOW_MAX_BYTES = int(os.environ.get("EXCELSEEKER_SHADOW_MAX_MB", 1024)) * 1024 * 1024
+MAX_WORKERS = int(os.environ.get("EXCELSEEKER_MAX_WORKERS", 0)) or os.cpu_count() or 4
+TRUST_DIR_MTIME = (
+    os.environ.get("EXCELSEEKER_TRUST_DIR_MTIME", "false").lower() == "true"
+)
+
+SEARCH_MODES = ("exact", "any", "all")
+CSV_FIELDS = [
+    "query_id",
+    "query",
+    "mode",
+    "filename",
+    "filepath",
+    "sheet",
+    "cell",
+    "value",
+]
+
+logger = logging.getLogger("excelseeker.cli")
+
+
+def _parse_query_line(line, number):
+    """Read one line of a queries file as a JSON object or plain query text."""
+    if line.startswith(("{", "[")):
+        try:
+            query = json.loads(line)
+        except ValueError:
+            # Plain text such as "[Draft] budget" is a query of its own
+            if line.startswith("{"):
+                raise
+        else:
+            if not isinstance(query, dict):
+                raise ValueError(f"Query {number} is not a JSON object")
+            return query
+    return {"text": line}
+
+
+def load_queries(args):
+    """
+    Collect the queries given with -q and --queries-file.
+
+    A queries file holds one query per line, or one JSON object per line with
+    "text" and optionally "id" and "mode". Blank lines and lines starting
+    with # are ignored.
+
+    Raises:
+        ValueError: If a JSON line is not an object with search text, a
+            query has an unknown mode, or two queries share an id
+    """
+    queries = [{"text": text, "mode": args.mode} for text in args.query or []]
+    if args.queries_file:
+        with open(args.queries_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                query = _parse_query_line(line, len(queries) + 1)
+                query.setdefault("mode", args.mode)
+                queries.append(query)
+
+    for number, query in enumerate(queries, 1):
+        query["id"] = str(query.get("id", number))
+        text = query.get("text")
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f"Query {query['id']} has no search text")
+        if query["mode"] not in SEARCH_MODES:
+            raise ValueError(f"Invalid search mode for query {query['id']}")
+    if len({query["id"] for query in queries}) != len(queries):
+        raise ValueError("Query ids must be unique")
+    return queries
+
+
+def build_engine(args):
+    """Create the search engine with the stores the web app uses."""
+    query_processor = None
+    if not args.literal:
+        from nlp.search_integration import SearchIntegration
+
+        query_processor = SearchIntegration()
+    return SearchEngine(
+        ScanExecutor(args.workers),
+        CellIndex(INDEX_FILE),
+        SearchCacheStore(CACHE_FILE, CACHE_MAX_BYTES, CACHE_MAX_AGE),
+        SkipListStore(SKIP_LIST_FILE),
+        ManifestStore(MANIFEST_FILE, restat_files=not TRUST_DIR_MTIME),
+        query_processor=query_processor,
+        default_executor=args.executor,
+        shadow_store=(
+            ShadowStore(SHADOW_DIR, SHADOW_MAX_BYTES) if SHADOW_MAX_BYTES else None
+        ),
+    )
+
+
+def write_results(events, queries, output, output_format):
+    """
+    Write the rows of "results" events and return the final event.
+
+    Progress goes to stderr so it never mixes with the results.
+    """
+    by_id = {query["id"]: query for query in queries}
+    writer = None
+    if output_format == "csv":
+        writer = csv.DictWriter(output, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+
+    final = None
+    for event in events:
+        event_type = event.get("type")
+        if event_type == "results":
+            query = by_id[event["query_id"]]
+            for result in event["results"]:
+                row = dict(
+                    result,
+                    query_id=query["id"],
+                    query=query["text"],
+                    mode=query["mode"],
+                )
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    output.write(json.dumps(row) + "\n")
+        elif event_type == "progress":
+            logger.info(
+                f"{event['processed']}/{event['total']} {event['current_file']}"
+            )
+        else:
+            final = event
+    return final
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Search the spreadsheet and CSV files in a folder for one or more queries."
+    )
+    parser.add_argument("folder", help="Folder to search, including subfolders")
+    parser.add_argument(
+        "-q",
+        "--query",
+        action="append",
+        help="Query to run; repeat for several queries",
+    )
+    parser.add_argument(
+        "--queries-file",
+        help="File with one query per line, or JSON lines with id, text and mode",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=SEARCH_MODES,
+        default="exact",
+        help="Search mode for queries that do not set their own (default: exact)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("jsonl", "csv"),
+        default="jsonl",
+        help="Output format (default: jsonl)",
+    )
+    parser.add_argument(
+        "-o", "--output", help="File to write results to (default: stdout)"
+    )
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTOR_MODES,
+        default=os.environ.get("EXCELSEEKER_EXECUTOR", "thread"),
+        help="Worker pool used to open workbooks",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=MAX_WORKERS,
+        help="Number of parallel workers (default: CPU core count)",
+    )
+    parser.add_argument(
+        "--use-index",
+        action="store_true",
+        help="Answer the queries from the cell index, only parsing changed workbooks",
+    )
+    parser.add_argument(
+        "--literal",
+        action="store_true",
+        help="Search for the query text as given, without natural language parsing",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Report progress on stderr"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(message)s",
+        stream=sys.stderr,
+    )
+
+    try:
+        queries = load_queries(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not queries:
+        parser.error("no queries given; use -q or --queries-file")
+
+    engine = build_engine(args)
+    output = (
+        open(args.output, "w", encoding="utf-8", newline="")
+        if args.output
+        else sys.stdout
+    )
+    try:
+        final = write_results(
+            engine.search_batch(args.folder, queries, use_index=args.use_index),
+            queries,
+            output,
+            args.format,
+        )
+    finally:
+        if args.output:
+            output.close()
+        engine.scan_executor.shutdown()
+
+    if final is None or "error" in final:
+        error = final.get("error") if final else "Search did not complete"
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+
+    for query in final["queries"]:
+        print(
+            f"{query['id']}: {query['total_results']} results for {query['text']!r}",
+            file=sys.stderr,
+        )
+    for skipped in final["skipped_files"]:
+        print(f"Skipped {skipped['file']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
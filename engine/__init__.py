@@ -0,0 +1,66 @@
+"""Search engine package for ExcelSeeker."""
+
+from .cache_store import SearchCacheStore
+from .executor import EXECUTOR_MODES, ScanExecutor
+from .index import CellIndex, file_fingerprint
+from .manifest import FileEntry, FileManifest, ManifestStore, crawl
+from .matcher import KeywordMatcher, compile_matcher
+from .metrics import MetricsRegistry, SearchMetrics
+from .profiler import PROFILE_MODES, ProfileStore, SearchProfiler
+from .readers import (
+    detect_reader,
+    open_workbook,
+    register_reader,
+    workbook_suffixes,
+)
+from .result_store import ResultStore
+from .search import SearchEngine
+from .shadow_store import ShadowStore
+from .skip_list import SkipListSnapshot, SkipListStore
+from .watcher import FolderWatcher
+from .workbook_cache import WorkbookCache, workbook_cache
+from .scanner import (
+    format_cell_address,
+    scan_workbook,
+    scan_workbook_multi,
+    extract_cells,
+    expand_matches,
+    process_excel_file,
+)
+
+__all__ = [
+    "EXECUTOR_MODES",
+    "ScanExecutor",
+    "CellIndex",
+    "SearchCacheStore",
+    "ResultStore",
+    "SearchEngine",
+    "ShadowStore",
+    "SkipListSnapshot",
+    "SkipListStore",
+    "FolderWatcher",
+    "WorkbookCache",
+    "workbook_cache",
+    "file_fingerprint",
+    "FileEntry",
+    "FileManifest",
+    "ManifestStore",
+    "crawl",
+    "KeywordMatcher",
+    "compile_matcher",
+    "MetricsRegistry",
+    "SearchMetrics",
+    "PROFILE_MODES",
+    "ProfileStore",
+    "SearchProfiler",
+    "detect_reader",
+    "open_workbook",
+    "register_reader",
+    "workbook_suffixes",
+    "format_cell_address",
+    "scan_workbook",
+    "scan_workbook_multi",
+    "extract_cells",
+    "expand_matches",
+    "process_excel_file",
+]
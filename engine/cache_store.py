@@ -0,0 +1,138 @@
+"""SQLite-backed search result cache with LRU eviction and expiry."""
+
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+class SearchCacheStore:
+    """
+    Stores one row per cached search instead of one pickle for everything.
+
+    Reads and writes only touch the entry they need. Each write runs in its
+    own transaction, so concurrent searches cannot leave a half-written cache.
+    Entries older than max_age are dropped when they are read or when the
+    store is written to. The least recently used entries are evicted once the
+    total stored size goes over max_bytes.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int, max_age: float):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and always close it."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for key, or None if missing or expired."""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, created FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, created = row
+                if now - created >= self.max_age:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    return None
+                conn.execute(
+                    "UPDATE entries SET accessed = ? WHERE key = ?", (now, key)
+                )
+            return pickle.loads(value)
+        except Exception as e:
+            logger.error(f"Error loading cache entry: {str(e)}")
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """Store value under key, then expire and evict old entries."""
+        now = time.time()
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            if len(data) > self.max_bytes:
+                logger.info(
+                    f"Not caching entry of {len(data)} bytes (limit {self.max_bytes})"
+                )
+                return
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created,"
+                    " accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, sqlite3.Binary(data), len(data), now, now),
+                )
+                self._expire(conn, now)
+                self._evict(conn)
+        except Exception as e:
+            logger.error(f"Error saving cache entry: {str(e)}")
+
+    def delete(self, key: str):
+        """Remove a single entry."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of entries and their total size in bytes."""
+        with self._connect() as conn:
+            count, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"entries": count, "bytes": size}
+
+    def _expire(self, conn: sqlite3.Connection, now: float):
+        removed = conn.execute(
+            "DELETE FROM entries WHERE created <= ?", (now - self.max_age,)
+        ).rowcount
+        if removed:
+            logger.info(f"Expired {removed} old cache entries")
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        logger.info(f"Evicted {len(evicted)} least recently used cache entries")
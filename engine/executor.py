@@ -0,0 +1,115 @@
+"""Worker pools used to run folder scans in threads or separate processes."""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# "thread" shares the interpreter (cheap to start, limited by the GIL while
+# xlrd decodes); "process" runs each workbook in its own interpreter.
+EXECUTOR_MODES = ("thread", "process")
+
+
+class ScanExecutor:
+    """Lazily creates and reuses one worker pool per execution mode."""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._pools: Dict[str, Executor] = {}
+        self._lock = threading.Lock()
+
+    def get(self, mode: str = "thread") -> Executor:
+        """Return the shared pool for the given mode, creating it on first use."""
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode: {mode}")
+
+        with self._lock:
+            pool = self._pools.get(mode)
+            if pool is None:
+                if mode == "process":
+                    # Spawn instead of fork: the Flask server is multi-threaded
+                    # and forking it can copy held locks into the children.
+                    pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="scan"
+                    )
+                logger.info(f"Started {mode} scan pool with {self.max_workers} workers")
+                self._pools[mode] = pool
+            return pool
+
+    def map_files(
+        self,
+        mode: str,
+        task: Callable[..., Dict[str, Any]],
+        file_paths: Iterable[str],
+        *args,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Run task(file_path, *args) for every file and yield results as they finish.
+
+        Tasks report failures as {"error": str, "skipped": True}; exceptions
+        raised by the task are converted to the same shape. If the pool itself
+        breaks, the result also carries "pool_error": True so callers can tell
+        it apart from a bad file. Stops early (and drops pending files) once
+        cancel_event is set.
+
+        Yields:
+            (file_path, result) tuples in completion order
+        """
+        executor = self.get(mode)
+        futures = {}
+        try:
+            for file_path in file_paths:
+                futures[executor.submit(task, file_path, *args)] = file_path
+
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+
+                file_path = futures[future]
+                try:
+                    result = future.result()
+                except BrokenExecutor as e:
+                    logger.error(f"Scan pool failed on {file_path}: {str(e)}")
+                    self.discard(mode)
+                    result = {"error": str(e), "skipped": True, "pool_error": True}
+                except Exception as e:
+                    logger.error(f"Error processing {file_path}: {str(e)}")
+                    result = {"error": str(e), "skipped": True}
+                yield file_path, result
+        finally:
+            # Drop files that have not started yet; running ones finish on
+            # their own without blocking the caller.
+            for future in futures:
+                future.cancel()
+
+    def discard(self, mode: str):
+        """Drop a broken pool so the next search starts a fresh one."""
+        with self._lock:
+            pool = self._pools.pop(mode, None)
+        if pool is not None:
+            logger.warning(f"Discarding {mode} scan pool")
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Shut down every pool that has been started."""
+        with self._lock:
+            for mode, pool in self._pools.items():
+                logger.info(f"Shutting down {mode} scan pool")
+                pool.shutdown(wait=False, cancel_futures=True)
+            self._pools.clear()
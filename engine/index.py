@@ -0,0 +1,365 @@
+"""Persistent inverted index of workbook cell contents."""
+
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .matcher import compile_matcher
+from .scanner import MatchRecord
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# (sheet index, sheet name, zero-based row, zero-based column, cell value)
+CellRecord = Tuple[int, str, int, int, str]
+
+# SQLite limits the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cells (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    sheet_index INTEGER NOT NULL,
+    sheet TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    value_lower TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cells_file ON cells (file_id);
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    term TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER NOT NULL,
+    cell_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL
+);
+DROP INDEX IF EXISTS postings_term;
+CREATE INDEX IF NOT EXISTS postings_term_file ON postings (term_id, file_id);
+CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+"""
+
+
+def file_fingerprint(file_path: str) -> Tuple[int, float]:
+    """Return the (size, mtime) pair used to detect changed files."""
+    stats = os.stat(file_path)
+    return stats.st_size, stats.st_mtime
+
+
+def _chunks(items: Sequence, size: int = _SQL_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class CellIndex:
+    """
+    On-disk inverted index mapping cell terms to (file, sheet, cell) postings.
+
+    Terms are the whitespace-separated words of each lower-cased cell value.
+    Searches keep the substring semantics of the live scan: a keyword is looked
+    up against the term vocabulary, the postings of every term containing it
+    give the candidate cells, and candidates are verified against the stored
+    cell text. Any keyword that occurs in a cell is contained in one of that
+    cell's terms, so no match is lost.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and always close it."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def stale_files(
+        self,
+        file_paths: Iterable[str],
+        fingerprints: Optional[Dict[str, Tuple[int, float]]] = None,
+    ) -> Dict[str, Tuple[int, float]]:
+        """
+        Find files that are new or whose size/mtime changed since indexing.
+
+        Args:
+            file_paths: Files to check
+            fingerprints: Already known (size, mtime) of the files, e.g. from
+                a FileManifest; files missing from it are stat'ed
+
+        Returns:
+            Mapping of stale file path to its current (size, mtime)
+        """
+        file_paths = list(file_paths)
+        indexed = {}
+        with self._connect() as conn:
+            for chunk in _chunks(file_paths):
+                rows = conn.execute(
+                    "SELECT path, size, mtime FROM files WHERE path IN "
+                    f"({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                indexed.update({path: (size, mtime) for path, size, mtime in rows})
+
+        stale = {}
+        fingerprints = fingerprints or {}
+        for file_path in file_paths:
+            try:
+                fingerprint = fingerprints.get(file_path) or file_fingerprint(file_path)
+            except OSError as e:
+                logger.error(f"Error checking file {file_path}: {str(e)}")
+                continue
+            if indexed.get(file_path) != fingerprint:
+                stale[file_path] = fingerprint
+        return stale
+
+    def store(
+        self,
+        file_path: str,
+        fingerprint: Tuple[int, float],
+        cells: List[CellRecord],
+    ):
+        """Replace the indexed contents of one file."""
+        with self._write_lock, self._connect() as conn:
+            self._delete(conn, file_path)
+            size, mtime = fingerprint
+            file_id = conn.execute(
+                "INSERT INTO files (path, size, mtime) VALUES (?, ?, ?)",
+                (file_path, size, mtime),
+            ).lastrowid
+
+            next_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM cells").fetchone()[
+                0
+            ]
+            cell_rows = []
+            cell_terms: List[Tuple[int, Set[str]]] = []
+            for sheet_index, sheet_name, row_idx, col_idx, value in cells:
+                value_lower = value.lower()
+                if not value_lower:
+                    continue
+                terms = set(value_lower.split())
+                next_id += 1
+                cell_rows.append(
+                    (
+                        next_id,
+                        file_id,
+                        sheet_index,
+                        sheet_name,
+                        row_idx,
+                        col_idx,
+                        value,
+                        value_lower,
+                    )
+                )
+                cell_terms.append((next_id, terms))
+            conn.executemany(
+                "INSERT INTO cells (id, file_id, sheet_index, sheet, row, col, value,"
+                " value_lower) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                cell_rows,
+            )
+
+            vocabulary = list(set().union(*(terms for _, terms in cell_terms)))
+            conn.executemany(
+                "INSERT OR IGNORE INTO terms (term) VALUES (?)",
+                ((term,) for term in vocabulary),
+            )
+            term_ids = {}
+            for chunk in _chunks(vocabulary):
+                rows = conn.execute(
+                    "SELECT term, id FROM terms WHERE term IN "
+                    f"({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                term_ids.update(rows)
+            conn.executemany(
+                "INSERT INTO postings (term_id, cell_id, file_id) VALUES (?, ?, ?)",
+                (
+                    (term_ids[term], cell_id, file_id)
+                    for cell_id, terms in cell_terms
+                    for term in terms
+                ),
+            )
+
+    def remove(self, file_paths: Iterable[str]):
+        """Drop files from the index."""
+        with self._write_lock, self._connect() as conn:
+            for file_path in file_paths:
+                self._delete(conn, file_path)
+
+    def prune(self, folder_path: str, file_paths: Iterable[str]):
+        """Remove indexed files under folder_path that are no longer present."""
+        prefix = os.path.join(os.path.abspath(folder_path), "")
+        present = set(file_paths)
+        with self._connect() as conn:
+            indexed = [
+                path
+                for (path,) in conn.execute(
+                    "SELECT path FROM files WHERE substr(path, 1, ?) = ?",
+                    (len(prefix), prefix),
+                )
+            ]
+        missing = [path for path in indexed if path not in present]
+        if missing:
+            logger.info(f"Removing {len(missing)} deleted files from the index")
+            self.remove(missing)
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, file_path: str):
+        row = conn.execute(
+            "SELECT id FROM files WHERE path = ?", (file_path,)
+        ).fetchone()
+        if row is None:
+            return
+        term_ids = [
+            term_id
+            for (term_id,) in conn.execute(
+                "SELECT DISTINCT term_id FROM postings WHERE file_id = ?", row
+            )
+        ]
+        conn.execute("DELETE FROM postings WHERE file_id = ?", row)
+        conn.execute("DELETE FROM cells WHERE file_id = ?", row)
+        conn.execute("DELETE FROM files WHERE id = ?", row)
+        # Drop terms no other file uses, so the vocabulary scanned by every
+        # query does not keep growing
+        for chunk in _chunks(term_ids):
+            conn.execute(
+                f"DELETE FROM terms WHERE id IN ({','.join('?' * len(chunk))}) "
+                "AND NOT EXISTS "
+                "(SELECT 1 FROM postings WHERE postings.term_id = terms.id)",
+                chunk,
+            )
+
+    @staticmethod
+    def _candidate_cells(conn: sqlite3.Connection, keyword: str) -> Set[int]:
+        """Cell ids of the searched files with a term containing keyword."""
+        # CROSS JOIN fixes the join order: postings are looked up per matching
+        # term and searched file, never read for the whole index
+        rows = conn.execute(
+            "SELECT postings.cell_id FROM terms"
+            " CROSS JOIN temp.search_files CROSS JOIN postings"
+            " WHERE instr(terms.term, ?) > 0"
+            " AND postings.term_id = terms.id"
+            " AND postings.file_id = search_files.id",
+            (keyword,),
+        )
+        return {cell_id for (cell_id,) in rows}
+
+    def search(
+        self, file_paths: Iterable[str], search_text: str, search_mode: str = "exact"
+    ) -> Dict[str, List[MatchRecord]]:
+        """
+        Answer an exact/any/all query from the index.
+
+        Args:
+            file_paths: Files to search; other indexed files are ignored
+            search_text: Text to search for
+            search_mode: One of "exact", "any" or "all"
+
+        Returns:
+            Mapping of file path to its match records, in sheet/row/column order
+        """
+        matcher = compile_matcher(search_text, search_mode)
+        keywords = matcher.keywords
+        search_text = search_text.lower()
+
+        with self._connect() as conn:
+            file_ids = {}
+            file_paths = list(file_paths)
+            for chunk in _chunks(file_paths):
+                rows = conn.execute(
+                    "SELECT id, path FROM files WHERE path IN "
+                    f"({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                file_ids.update(rows)
+            # Postings and cells are only read for the requested files
+            conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS search_files (id INTEGER PRIMARY KEY)"
+            )
+            conn.execute("DELETE FROM temp.search_files")
+            conn.executemany(
+                "INSERT INTO temp.search_files (id) VALUES (?)",
+                ((file_id,) for file_id in file_ids),
+            )
+
+            candidates: Optional[Set[int]] = None
+            if search_mode == "exact":
+                # Every word of the phrase sits inside one term of a matching
+                # cell; the longest word is the most selective lookup.
+                words = search_text.split()
+                if words:
+                    candidates = self._candidate_cells(conn, max(words, key=len))
+            elif search_mode == "any":
+                candidates = set()
+                for keyword in keywords:
+                    candidates |= self._candidate_cells(conn, keyword)
+            elif search_mode == "all" and keywords:
+                for keyword in sorted(keywords, key=len, reverse=True):
+                    found = self._candidate_cells(conn, keyword)
+                    candidates = found if candidates is None else candidates & found
+                    if not candidates:
+                        break
+
+            columns = (
+                "cells.id, file_id, sheet_index, sheet, row, col, value, value_lower"
+            )
+            if candidates is None:
+                # Nothing to look up (e.g. a whitespace-only phrase); check
+                # every stored cell of the requested files instead.
+                rows = conn.execute(
+                    f"SELECT {columns} FROM temp.search_files CROSS JOIN cells"
+                    " WHERE cells.file_id = search_files.id"
+                ).fetchall()
+            else:
+                rows = []
+                for chunk in _chunks(sorted(candidates)):
+                    rows.extend(
+                        conn.execute(
+                            f"SELECT {columns} FROM cells WHERE id IN "
+                            f"({','.join('?' * len(chunk))})",
+                            chunk,
+                        )
+                    )
+
+        results: Dict[str, List[Tuple]] = {}
+        for (
+            _,
+            file_id,
+            sheet_index,
+            sheet,
+            row_idx,
+            col_idx,
+            value,
+            value_lower,
+        ) in rows:
+            if matcher.matches(value_lower):
+                results.setdefault(file_ids[file_id], []).append(
+                    (sheet_index, row_idx, col_idx, sheet, value)
+                )
+
+        return {
+            file_path: [
+                (sheet, row_idx, col_idx, value)
+                for _, row_idx, col_idx, sheet, value in sorted(matches)
+            ]
+            for file_path, matches in results.items()
+        }
@@ -0,0 +1,317 @@
+"""Concurrent directory crawler producing a shared file manifest."""
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Directories listed at the same time; listing is I/O bound, so this can be
+# well above the CPU count, which helps most on network shares
+CRAWL_WORKERS = 16
+
+# A directory modified this recently may change again within the same mtime
+# tick (coarse on FAT and some network file systems), so its listing is not
+# trusted on the next crawl
+RACY_SECONDS = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifests (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class FileEntry(NamedTuple):
+    """One file found by the crawler, with the stat fields searches need."""
+
+    path: str
+    size: int
+    mtime: float
+    inode: int
+
+    @property
+    def fingerprint(self) -> Tuple[int, float]:
+        """The (size, mtime) pair used to detect changed files."""
+        return self.size, self.mtime
+
+
+class DirRecord(NamedTuple):
+    """What one directory held when it was last listed."""
+
+    # Directory mtime at listing time, or None if it cannot be trusted
+    mtime: Optional[float]
+    subdirs: List[str]
+    files: List[FileEntry]
+
+
+class FileManifest:
+    """
+    The files under one root folder, sorted by path.
+
+    Built once per search and shared by hashing, counting and searching, so
+    the tree is walked and every file stat'ed only once.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        entries: Iterable[FileEntry],
+        dirs: Optional[Dict[str, DirRecord]] = None,
+    ):
+        self.root = root
+        # Per-directory listings, kept so the next crawl can reuse them
+        self.dirs: Dict[str, DirRecord] = dirs or {}
+        self.entries: List[FileEntry] = sorted(entries)
+        self._by_path: Dict[str, FileEntry] = {
+            entry.path: entry for entry in self.entries
+        }
+
+    def paths(self) -> List[str]:
+        """Absolute paths of all files, sorted."""
+        return [entry.path for entry in self.entries]
+
+    def get(self, path: str) -> Optional[FileEntry]:
+        return self._by_path.get(path)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._by_path
+
+    def __iter__(self) -> Iterator[FileEntry]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def _stat_file(path: str) -> Optional[FileEntry]:
+    try:
+        stats = os.stat(path)
+    except OSError as e:
+        logger.debug(f"Skipping {path}: {str(e)}")
+        return None
+    return FileEntry(path, stats.st_size, stats.st_mtime, stats.st_ino)
+
+
+def _scan_dir(
+    dir_path: str,
+    suffixes: Optional[Tuple[str, ...]],
+    known: Optional[DirRecord] = None,
+    restat_files: bool = True,
+) -> Tuple[DirRecord, bool]:
+    """
+    List one directory, or reuse its previous listing if it is unchanged.
+
+    A directory's mtime changes when entries are added, removed or renamed
+    in it, but not when a file is rewritten in place. Reused listings
+    therefore still re-stat their files unless restat_files is False.
+
+    Returns:
+        The directory's record and whether it had to be listed again
+    """
+    try:
+        dir_mtime = os.stat(dir_path).st_mtime
+    except OSError as e:
+        logger.error(f"Error scanning directory {dir_path}: {str(e)}")
+        return DirRecord(None, [], []), True
+
+    if known is not None and known.mtime is not None and known.mtime == dir_mtime:
+        if not restat_files:
+            return known, False
+        files = [_stat_file(entry.path) for entry in known.files]
+        return DirRecord(known.mtime, known.subdirs, [f for f in files if f]), False
+
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        # Like os.walk, don't descend into symlinked directories
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        continue
+                    if suffixes and not entry.name.lower().endswith(suffixes):
+                        continue
+                    # DirEntry caches the result; on Windows it comes for free
+                    # with the directory listing
+                    stats = entry.stat()
+                    files.append(
+                        FileEntry(
+                            entry.path, stats.st_size, stats.st_mtime, stats.st_ino
+                        )
+                    )
+                except OSError as e:
+                    logger.debug(f"Skipping {entry.path}: {str(e)}")
+    except OSError as e:
+        logger.error(f"Error scanning directory {dir_path}: {str(e)}")
+        return DirRecord(None, [], []), True
+
+    if time.time() - dir_mtime < RACY_SECONDS:
+        dir_mtime = None
+    return DirRecord(dir_mtime, subdirs, files), True
+
+
+def crawl(
+    folder_path: str,
+    suffixes: Optional[Iterable[str]] = None,
+    max_workers: int = CRAWL_WORKERS,
+    previous: Optional[FileManifest] = None,
+    restat_files: bool = True,
+) -> FileManifest:
+    """
+    Walk a folder tree, listing subdirectories concurrently.
+
+    Args:
+        folder_path: Root folder to walk
+        suffixes: Only record files whose lower-cased name ends with one of
+            these (e.g. (".xls",)); all files are recorded if omitted
+        max_workers: Number of directories listed at the same time
+        previous: Manifest from an earlier crawl of the same folder and
+            suffixes; directories whose mtime is unchanged are not listed again
+        restat_files: Re-stat the files of unchanged directories to catch
+            in-place modifications; if False, they are reused as recorded
+
+    Returns:
+        FileManifest of the matching files, with absolute paths
+    """
+    root = os.path.abspath(folder_path)
+    suffixes = tuple(s.lower() for s in suffixes) if suffixes else None
+    known = previous.dirs if previous is not None else {}
+    dirs: Dict[str, DirRecord] = {}
+    listed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {
+            pool.submit(_scan_dir, root, suffixes, known.get(root), restat_files): root
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                dir_path = pending.pop(future)
+                record, was_listed = future.result()
+                dirs[dir_path] = record
+                listed += was_listed
+                for subdir in record.subdirs:
+                    future = pool.submit(
+                        _scan_dir, subdir, suffixes, known.get(subdir), restat_files
+                    )
+                    pending[future] = subdir
+
+    if known:
+        logger.info(
+            f"Crawled {root}: listed {listed} of {len(dirs)} directories, "
+            "reused the rest"
+        )
+    entries = [entry for record in dirs.values() for entry in record.files]
+    return FileManifest(root, entries, dirs)
+
+
+class ManifestStore:
+    """
+    Keeps the last manifest of every crawled folder, in memory and in SQLite.
+
+    Crawling through the store only lists directories that changed since the
+    previous crawl of the same folder, which makes repeated searches over a
+    mostly static archive cheap.
+    """
+
+    def __init__(self, db_path: str, restat_files: bool = True):
+        self.db_path = db_path
+        self.restat_files = restat_files
+        self._manifests: Dict[str, FileManifest] = {}
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and always close it."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _key(root: str, suffixes: Optional[Tuple[str, ...]]) -> str:
+        return f"{root}|{','.join(suffixes or ())}"
+
+    def _load(self, key: str, root: str) -> Optional[FileManifest]:
+        with self._lock:
+            manifest = self._manifests.get(key)
+        if manifest is not None:
+            return manifest
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT data FROM manifests WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None:
+                return None
+            dirs = {
+                path: DirRecord(mtime, subdirs, [FileEntry(*f) for f in files])
+                for path, (mtime, subdirs, files) in pickle.loads(row[0]).items()
+            }
+        except Exception as e:
+            logger.error(f"Error loading file manifest: {str(e)}")
+            return None
+        entries = [entry for record in dirs.values() for entry in record.files]
+        return FileManifest(root, entries, dirs)
+
+    def _save(self, key: str, manifest: FileManifest):
+        # Plain tuples keep the stored data independent of these classes
+        data = {
+            path: (record.mtime, record.subdirs, [tuple(f) for f in record.files])
+            for path, record in manifest.dirs.items()
+        }
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO manifests (key, data, updated)"
+                    " VALUES (?, ?, ?)",
+                    (
+                        key,
+                        sqlite3.Binary(
+                            pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+                        ),
+                        time.time(),
+                    ),
+                )
+        except Exception as e:
+            logger.error(f"Error saving file manifest: {str(e)}")
+
+    def crawl(
+        self, folder_path: str, suffixes: Optional[Iterable[str]] = None
+    ) -> FileManifest:
+        """Crawl a folder, reusing and then replacing its stored manifest."""
+        root = os.path.abspath(folder_path)
+        suffixes = tuple(s.lower() for s in suffixes) if suffixes else None
+        key = self._key(root, suffixes)
+        previous = self._load(key, root)
+        manifest = crawl(
+            root, suffixes, previous=previous, restat_files=self.restat_files
+        )
+        with self._lock:
+            self._manifests[key] = manifest
+        if previous is None or manifest.dirs != previous.dirs:
+            self._save(key, manifest)
+        return manifest
+
+    def clear(self):
+        """Forget every stored manifest."""
+        with self._lock:
+            self._manifests.clear()
+            with self._connect() as conn:
+                conn.execute("DELETE FROM manifests")
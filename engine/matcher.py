@@ -0,0 +1,134 @@
+"""Keyword matching for the exact/any/all search modes."""
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Pattern
+
+# Characters that can appear in str() of the floats and ints xlrd returns
+# for number, date, boolean and error cells (e.g. "-1.5e-05", "inf", "nan")
+_NUMBER_CHARS = frozenset("0123456789.-+eainf")
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """
+    Build a regex from a keyword trie.
+
+    Shared prefixes are only tried once, and terminal nodes become greedy
+    optional groups, so the pattern always matches the longest keyword that
+    starts at a given position.
+    """
+    branches = [
+        re.escape(char) + _trie_pattern(child)
+        for char, child in sorted(node.items())
+        if char
+    ]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    if "" in node:
+        return f"(?:{body})?"
+    return body
+
+
+class KeywordMatcher:
+    """
+    Compiled form of one search query.
+
+    numeric tells whether the query could match the text of a number cell.
+    Multi-keyword queries are compiled once into a single regex that finds
+    every keyword occurring in a cell in one pass over its text, instead of
+    one substring scan per keyword. Single-keyword queries keep using a plain
+    substring check, which is faster than any regex.
+    """
+
+    def __init__(self, search_text: str, search_mode: str = "exact"):
+        search_text = search_text.lower()
+        self.search_mode = search_mode
+        if search_mode in ("any", "all"):
+            self.keywords: List[str] = sorted(set(filter(None, search_text.split())))
+        else:
+            self.keywords = [search_text]
+
+        numeric = [set(keyword) <= _NUMBER_CHARS for keyword in self.keywords]
+        if search_mode == "any":
+            self.numeric = any(numeric)
+        elif search_mode in ("exact", "all"):
+            self.numeric = all(numeric)
+        else:
+            self.numeric = False
+
+        self._pattern: Optional[Pattern[str]] = None
+        self._search: Optional[Pattern[str]] = None
+        self._implied: Dict[str, FrozenSet[str]] = {}
+        self._longest = max(self.keywords, key=len, default="")
+        if len(self.keywords) > 1:
+            trie: Dict[str, dict] = {}
+            for keyword in self.keywords:
+                node = trie
+                for char in keyword:
+                    node = node.setdefault(char, {})
+                node[""] = {}
+            pattern = _trie_pattern(trie)
+            self._search = re.compile(pattern)
+            # A lookahead match is zero-width, so finditer tries every start
+            # position and overlapping keywords are all seen.
+            self._pattern = re.compile(f"(?=({pattern}))")
+            # Only the longest keyword at each position is reported; any
+            # shorter keyword inside it occurs as well.
+            self._implied = {
+                keyword: frozenset(k for k in self.keywords if k in keyword)
+                for keyword in self.keywords
+            }
+
+    @property
+    def triggers(self) -> Optional[List[str]]:
+        """
+        Keywords of which every matching value contains at least one.
+
+        Readers use them to skip rows cheaply before parsing them. None if a
+        value without any of them can match, e.g. for an empty query.
+        """
+        if self.search_mode == "exact":
+            return self.keywords if self.keywords[0] else None
+        if self.search_mode == "any":
+            return self.keywords
+        if self.search_mode == "all":
+            return [self._longest] if self.keywords else None
+        return []
+
+    def hits(self, value: str) -> FrozenSet[str]:
+        """Return the keywords that occur in an already lower-cased value."""
+        if self._pattern is None:
+            return frozenset(k for k in self.keywords if k in value)
+        found = set()
+        for match in self._pattern.finditer(value):
+            keyword = match.group(1)
+            if keyword not in found:
+                found |= self._implied[keyword]
+                if len(found) == len(self.keywords):
+                    break
+        return frozenset(found)
+
+    def matches(self, value: str) -> bool:
+        """Check an already lower-cased cell value against the query."""
+        if self.search_mode == "exact":
+            return self.keywords[0] in value
+        if self.search_mode == "any":
+            if self._search is None:
+                return bool(self.keywords) and self.keywords[0] in value
+            return self._search.search(value) is not None
+        if self.search_mode == "all":
+            if not self.keywords:
+                return True
+            # Most cells miss the longest keyword; rule them out before
+            # collecting hits.
+            if self._longest not in value:
+                return False
+            return self._pattern is None or len(self.hits(value)) == len(self.keywords)
+        return False
+
+
+@lru_cache(maxsize=64)
+def compile_matcher(search_text: str, search_mode: str = "exact") -> KeywordMatcher:
+    """Return the matcher for a query, compiling it once per process."""
+    return KeywordMatcher(search_text, search_mode)
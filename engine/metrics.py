@@ -0,0 +1,316 @@
+"""Per-search timing and resource metrics, aggregated for Prometheus."""
+
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds, in seconds
+SEARCH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+FILE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0, 60.0)
+
+# Scanning processes whose workbook cache gauges are kept; worker processes
+# come and go when a pool is replaced
+MAX_CACHE_PROCESSES = 64
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class SearchMetrics:
+    """
+    Timings and counters of one search.
+
+    Phases are timed in the process running the search. Per-file scan
+    statistics are measured in the workers and added with add_file, so they
+    also cover process pools. The latest workbook cache statistics of every
+    worker process are kept in workbook_caches, by process ID.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.file_seconds: List[float] = []
+        self.files_scanned = 0
+        self.files_cached = 0
+        self.files_shadow = 0
+        self.bytes_read = 0
+        self.cells_scanned = 0
+        self.worker_peak_rss = 0
+        self.workbook_caches: Dict[int, Dict[str, Any]] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block; repeated phases add up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] += seconds
+
+    def add_file(self, stats: Optional[Dict[str, Any]]):
+        """Add the statistics a worker returned for one file."""
+        if not stats:
+            return
+        self.files_scanned += 1
+        cached = stats.get("cached")
+        self.files_cached += cached == "memory"
+        self.files_shadow += cached == "shadow"
+        self.file_seconds.append(stats["seconds"])
+        self.bytes_read += stats["bytes"]
+        self.cells_scanned += stats["cells"]
+        self.worker_peak_rss = max(self.worker_peak_rss, stats.get("peak_rss") or 0)
+        cache = stats.get("workbook_cache")
+        if cache is not None:
+            # Files finish out of order; the most lookups are the latest
+            seen = self.workbook_caches.get(stats["process"])
+            if seen is None or (cache["hits"] + cache["misses"]) >= (
+                seen["hits"] + seen["misses"]
+            ):
+                self.workbook_caches[stats["process"]] = cache
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Summary sent with the search's final event."""
+        peak_rss = max(peak_rss_bytes() or 0, self.worker_peak_rss) or None
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            "phases": {name: round(value, 6) for name, value in self.phases.items()},
+            "files_scanned": self.files_scanned,
+            "files_cached": self.files_cached,
+            "files_shadow": self.files_shadow,
+            "file_scan_seconds": round(sum(self.file_seconds), 6),
+            "bytes_read": self.bytes_read,
+            "cells_scanned": self.cells_scanned,
+            "peak_rss_bytes": peak_rss,
+        }
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, as Prometheus expects."""
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            pairs.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return pairs
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Aggregates finished searches into counters and histograms.
+
+    Safe to share between the threads serving searches. render() returns
+    the Prometheus text exposition format.
+    """
+
+    def __init__(self, prefix: str = "excelseeker"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self._gauges: Dict[str, Dict[Tuple, float]] = defaultdict(dict)
+        self._cache_processes: OrderedDict = OrderedDict()
+        self._histograms: Dict[str, Dict[Tuple, Histogram]] = defaultdict(dict)
+        self._buckets = {
+            "search_duration_seconds": SEARCH_BUCKETS,
+            "search_phase_seconds": PHASE_BUCKETS,
+            "file_scan_seconds": FILE_BUCKETS,
+        }
+        self._help = {
+            "searches_total": ("counter", "Finished searches by kind and status"),
+            "search_cache_total": ("counter", "Folder searches by cache hit or miss"),
+            "files_scanned_total": ("counter", "Workbooks opened by searches"),
+            "workbook_cache_total": (
+                "counter",
+                "Workbooks scanned by searches by workbook cache hit or miss",
+            ),
+            "shadow_store_hits_total": (
+                "counter",
+                "Workbooks scanned from shadow copies instead of being parsed",
+            ),
+            "shadow_store_bytes": (
+                "gauge",
+                "Bytes of shadow copies on disk, as of the last prune",
+            ),
+            "workbook_cache_bytes": (
+                "gauge",
+                "Bytes held by the workbook cache, per scanning process",
+            ),
+            "workbook_cache_entries": (
+                "gauge",
+                "Workbooks held by the workbook cache, per scanning process",
+            ),
+            "workbook_cache_hit_ratio": (
+                "gauge",
+                "Share of lookups answered by the workbook cache since the "
+                "scanning process started, per scanning process",
+            ),
+            "bytes_read_total": ("counter", "Bytes of workbooks opened by searches"),
+            "cells_scanned_total": ("counter", "Cells looked at by searches"),
+            "peak_rss_bytes": ("gauge", "Peak resident memory seen by any search"),
+            "search_duration_seconds": ("histogram", "Wall time of searches"),
+            "search_phase_seconds": ("histogram", "Time spent per search phase"),
+            "file_scan_seconds": ("histogram", "Time to open and scan one workbook"),
+        }
+
+    def _observe(self, name: str, value: float, labels: Tuple = ()):
+        histogram = self._histograms[name].get(labels)
+        if histogram is None:
+            histogram = self._histograms[name][labels] = Histogram(self._buckets[name])
+        histogram.observe(value)
+
+    def observe_phase(self, phase: str, seconds: float):
+        """Record a phase measured outside a SearchMetrics, e.g. encoding."""
+        with self._lock:
+            self._observe("search_phase_seconds", seconds, (("phase", phase),))
+
+    def set_gauge(self, name: str, value: float, labels: Tuple = ()):
+        """Set a gauge measured outside searches, e.g. a cache's size."""
+        with self._lock:
+            self._gauges[name][labels] = value
+
+    def _observe_workbook_cache(self, process: int, stats: Dict[str, Any]):
+        """Set the workbook cache gauges of one scanning process."""
+        labels = (("process", str(process)),)
+        self._cache_processes[process] = labels
+        self._cache_processes.move_to_end(process)
+        self._gauges["workbook_cache_bytes"][labels] = stats["bytes"]
+        self._gauges["workbook_cache_entries"][labels] = stats["entries"]
+        self._gauges["workbook_cache_hit_ratio"][labels] = stats["hit_rate"]
+        while len(self._cache_processes) > MAX_CACHE_PROCESSES:
+            _, stale = self._cache_processes.popitem(last=False)
+            for name in (
+                "workbook_cache_bytes",
+                "workbook_cache_entries",
+                "workbook_cache_hit_ratio",
+            ):
+                self._gauges[name].pop(stale, None)
+
+    def observe_search(
+        self,
+        kind: str,
+        status: str,
+        metrics: SearchMetrics,
+        from_cache: Optional[bool] = None,
+    ):
+        """
+        Record a finished search.
+
+        Args:
+            kind: "folder" or "batch"
+            status: "complete", "cancelled" or "error"
+            metrics: The search's metrics
+            from_cache: Whether the result came from the cache, if it was
+                looked up
+        """
+        summary = metrics.as_dict()
+        with self._lock:
+            self._counters["searches_total"][(("kind", kind), ("status", status))] += 1
+            if from_cache is not None:
+                self._counters["search_cache_total"][
+                    (("result", "hit" if from_cache else "miss"),)
+                ] += 1
+            self._counters["files_scanned_total"][()] += metrics.files_scanned
+            if metrics.files_scanned:
+                cache_total = self._counters["workbook_cache_total"]
+                cache_total[(("result", "hit"),)] += metrics.files_cached
+                cache_total[(("result", "miss"),)] += (
+                    metrics.files_scanned - metrics.files_cached
+                )
+            self._counters["shadow_store_hits_total"][()] += metrics.files_shadow
+            self._counters["bytes_read_total"][()] += metrics.bytes_read
+            self._counters["cells_scanned_total"][()] += metrics.cells_scanned
+            if summary["peak_rss_bytes"]:
+                peak = self._gauges["peak_rss_bytes"]
+                peak[()] = max(peak.get((), 0), summary["peak_rss_bytes"])
+            for process, cache in metrics.workbook_caches.items():
+                self._observe_workbook_cache(process, cache)
+            self._observe(
+                "search_duration_seconds",
+                summary["total_seconds"],
+                (("kind", kind),),
+            )
+            for phase, seconds in metrics.phases.items():
+                self._observe("search_phase_seconds", seconds, (("phase", phase),))
+            for seconds in metrics.file_seconds:
+                self._observe("file_scan_seconds", seconds)
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, (metric_type, help_text) in self._help.items():
+                full_name = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {metric_type}")
+                if metric_type in ("counter", "gauge"):
+                    values = (
+                        self._counters if metric_type == "counter" else self._gauges
+                    )
+                    for labels, value in sorted(values[name].items()):
+                        lines.append(f"{full_name}{_labels(labels)} {_number(value)}")
+                else:
+                    for labels, histogram in sorted(self._histograms[name].items()):
+                        for bound, count in histogram.cumulative():
+                            bucket_labels = labels + (("le", bound),)
+                            lines.append(
+                                f"{full_name}_bucket{_labels(bucket_labels)} {count}"
+                            )
+                        lines.append(
+                            f"{full_name}_sum{_labels(labels)} {_number(histogram.sum)}"
+                        )
+                        lines.append(
+                            f"{full_name}_count{_labels(labels)} {histogram.count}"
+                        )
+        return "\n".join(lines) + "\n"
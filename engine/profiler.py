@@ -0,0 +1,274 @@
+"""Opt-in profiling of single searches, including their scan workers."""
+
+import cProfile
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# "sample" records call stacks at a fixed interval and writes collapsed
+# stacks for flame graphs; "cprofile" records every call and writes pstats
+PROFILE_MODES = ("sample", "cprofile")
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+
+_FORMATS = {"sample": "collapsed", "cprofile": "pstats"}
+_EXTENSIONS = {"collapsed": ".collapsed.txt", "pstats": ".pstats"}
+_PROFILE_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def _frame_label(code) -> str:
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class StackSampler:
+    """
+    Samples the call stack of one thread from a background thread.
+
+    Stacks are counted in the collapsed format used by flame graph tools:
+    frames from the outermost call inwards, separated by semicolons.
+    """
+
+    def __init__(
+        self,
+        thread_id: int,
+        root: str,
+        interval: float = SAMPLE_INTERVAL,
+    ):
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="profile-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.counts
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stack.append(self.root)
+                self.counts[";".join(reversed(stack))] += 1
+
+
+class _Profile:
+    """Runs one profiler of the given mode on the current thread."""
+
+    def __init__(self, mode: str, root: str, interval: float):
+        self.mode = mode
+        self._sampler = None
+        self._profile = None
+        if mode == "sample":
+            self._sampler = StackSampler(threading.get_ident(), root, interval)
+        else:
+            self._profile = cProfile.Profile()
+
+    def start(self) -> bool:
+        if self._sampler is not None:
+            self._sampler.start()
+            return True
+        try:
+            self._profile.enable()
+        except ValueError as e:
+            # Only one deterministic profiler can be active at a time on
+            # newer Pythons; the search then runs unprofiled on this thread
+            logger.warning(f"Could not start profiler: {str(e)}")
+            self._profile = None
+            return False
+        return True
+
+    def stop(self):
+        """Stop profiling and return picklable profile data."""
+        if self._sampler is not None:
+            return dict(self._sampler.stop())
+        if self._profile is None:
+            return None
+        self._profile.disable()
+        self._profile.create_stats()
+        return self._profile.stats
+
+
+def profile_task(
+    mode: str,
+    interval: float,
+    task: Callable[..., Dict[str, Any]],
+    file_path: str,
+    *args,
+) -> Dict[str, Any]:
+    """
+    Run a scan task under a profiler and attach the data as "profile".
+
+    Used in place of the task in worker pools, so worker threads and worker
+    processes are profiled where they run.
+    """
+    profile = _Profile(mode, "worker", interval)
+    profile.start()
+    try:
+        result = task(file_path, *args)
+    finally:
+        data = profile.stop()
+    if data:
+        result["profile"] = data
+    return result
+
+
+class _RawStats:
+    """Adapter letting pstats.Stats load a stats dict from another profile."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class SearchProfiler:
+    """
+    Profiles one search in the request thread and in its scan workers.
+
+    Args:
+        mode: "sample" or "cprofile"
+        interval: Seconds between stack samples in "sample" mode
+    """
+
+    def __init__(self, mode: str, interval: float = SAMPLE_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.interval = interval
+        self.format = _FORMATS[mode]
+        self._main: Optional[_Profile] = None
+        self._samples: Counter = Counter()
+        self._stats = []
+        self._lock = threading.Lock()
+        self.started = None
+        self.seconds = None
+
+    def start(self):
+        """Start profiling the calling thread."""
+        self.started = time.perf_counter()
+        self._main = _Profile(self.mode, "request", self.interval)
+        self._main.start()
+
+    def stop(self):
+        """Stop profiling the calling thread; worker data may still be added."""
+        if self._main is None:
+            return
+        self.add(self._main.stop())
+        self._main = None
+        self.seconds = time.perf_counter() - self.started
+
+    def wrap(self, task: Callable[..., Dict[str, Any]]):
+        """
+        Return a task that profiles task wherever it runs.
+
+        The wrapper is a partial of a module-level function, so it can be
+        pickled to process pools.
+        """
+        return partial(profile_task, self.mode, self.interval, task)
+
+    def add(self, data):
+        """Add profile data returned by stop() or by a profiled task."""
+        if not data:
+            return
+        with self._lock:
+            if self.mode == "sample":
+                self._samples.update(data)
+            else:
+                self._stats.append(data)
+
+    def write(self, path: str):
+        """Write the profile: collapsed stacks or a pstats file."""
+        with self._lock:
+            if self.mode == "sample":
+                with open(path, "w") as f:
+                    for stack, count in sorted(self._samples.items()):
+                        f.write(f"{stack} {count}\n")
+                return
+            if not self._stats:
+                # Nothing was recorded; write an empty but loadable profile
+                empty = cProfile.Profile()
+                empty.create_stats()
+                self._stats.append(empty.stats)
+            stats = pstats.Stats(_RawStats(self._stats[0]))
+            for data in self._stats[1:]:
+                stats.add(_RawStats(data))
+            stats.dump_stats(path)
+
+
+class ProfileStore:
+    """
+    Keeps the profiles of the most recent profiled searches on disk.
+
+    Args:
+        directory: Folder the profile files are written to
+        max_count: Profiles kept; older ones are deleted
+    """
+
+    def __init__(self, directory: str, max_count: int = 20):
+        self.directory = directory
+        self.max_count = max_count
+        self._lock = threading.Lock()
+
+    def save(self, profile_id: str, profiler: SearchProfiler) -> str:
+        """Write a finished profile and return its file path."""
+        if not _PROFILE_ID.fullmatch(profile_id):
+            raise ValueError(f"Invalid profile id: {profile_id}")
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, profile_id + _EXTENSIONS[profiler.format])
+        profiler.write(path)
+        self._prune()
+        logger.info(f"Saved {profiler.mode} profile to {path}")
+        return path
+
+    def find(self, profile_id: str) -> Optional[Tuple[str, str]]:
+        """Return (path, format) of a stored profile, or None."""
+        if not _PROFILE_ID.fullmatch(profile_id):
+            return None
+        for profile_format, extension in _EXTENSIONS.items():
+            path = os.path.join(self.directory, profile_id + extension)
+            if os.path.exists(path):
+                return path, profile_format
+        return None
+
+    def _prune(self):
+        with self._lock:
+            try:
+                paths = [
+                    entry.path
+                    for entry in os.scandir(self.directory)
+                    if entry.name.endswith(tuple(_EXTENSIONS.values()))
+                ]
+            except OSError:
+                return
+            paths.sort(key=lambda path: os.path.getmtime(path), reverse=True)
+            for path in paths[self.max_count :]:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"Could not remove old profile {path}: {str(e)}")
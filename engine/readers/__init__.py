@@ -0,0 +1,42 @@
+"""
+Workbook readers for the scan kernel.
+
+Every reader opens a file as a workbook whose iter_sheets(counts, keywords)
+yields (sheet index, sheet name, rows), with rows yielding (row index,
+values, types) and types using xlrd's cell type codes. The kernel in
+scanner.py only relies on that shape, so every format is matched the same
+way. keywords is a hint: when given, only rows containing one of them can
+match, and readers that can skip other rows cheaply may leave them out;
+they set skips_rows so their workbooks are not held in the workbook cache.
+
+Readers are looked up in the registry by the first bytes of a file; see
+registry.py for adding one.
+"""
+
+from .delimited import DelimitedWorkbook, open_delimited
+from .registry import (
+    SNIFF_SIZE,
+    Reader,
+    detect_reader,
+    open_workbook,
+    register_reader,
+    workbook_suffixes,
+)
+from .xls import LOW_MEMORY_THRESHOLD, XlsWorkbook, open_xls
+from .xlsx import XlsxWorkbook, open_xlsx
+
+__all__ = [
+    "DelimitedWorkbook",
+    "LOW_MEMORY_THRESHOLD",
+    "Reader",
+    "SNIFF_SIZE",
+    "XlsWorkbook",
+    "XlsxWorkbook",
+    "detect_reader",
+    "open_delimited",
+    "open_workbook",
+    "open_xls",
+    "open_xlsx",
+    "register_reader",
+    "workbook_suffixes",
+]
@@ -0,0 +1,212 @@
+"""
+Chunked reader for .csv and .tsv files.
+
+Files are read in large fixed-size buffers that always end on a record
+boundary. When the scan kernel passes the keywords a matching cell must
+contain, each buffer is searched for them as raw bytes first, and only the
+records around a hit are decoded and parsed into cells; everything else is
+skipped at the speed of a substring search.
+
+Record boundaries are newlines outside quoted fields, found by tracking the
+parity of quote characters, so quoted fields may span lines. A stray quote
+inside an unquoted field throws the parity off for the rest of its buffer,
+which merges records there; such files are still scanned, but row numbers
+after the stray quote may be off.
+"""
+
+import csv
+import io
+import os
+import re
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from xlrd import XL_CELL_TEXT
+
+# Bytes read per buffer; a record longer than this grows the buffer
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Every byte except the quote and the newline, for counting records
+_NOT_QUOTE_OR_NEWLINE = bytes(b for b in range(256) if b not in b'"\n')
+_BOM = b"\xef\xbb\xbf"
+# The only characters whose lower case is ASCII: KELVIN SIGN lowers to "k"
+# and LATIN CAPITAL LETTER I WITH DOT ABOVE to "i" and a combining dot
+_ASCII_LOWERING = ("\u212a".encode(), "\u0130".encode())
+# Control characters, which text files have few of apart from these
+_CONTROL = bytes(b for b in range(32) if b not in b"\t\n\r\f") + b"\x7f"
+
+
+def sniff_text(sample: bytes) -> bool:
+    """
+    Whether a file starting with sample looks like delimited text.
+
+    Single-byte and UTF-8 text is accepted; NUL bytes, as in UTF-16 text,
+    or more than the odd control character mean the file is binary.
+    """
+    if b"\x00" in sample:
+        return False
+    controls = len(sample) - len(sample.translate(None, _CONTROL))
+    return controls <= len(sample) // 100
+
+
+def _decode(data: bytes) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        # Spreadsheet exports are often in a legacy single-byte encoding
+        return data.decode("latin-1")
+
+
+def _last_boundary(buf: bytes) -> int:
+    """Index just after the last record-ending newline in buf, or 0."""
+    total = buf.count(b'"')
+    newline = buf.rfind(b"\n")
+    while newline != -1 and (total - buf.count(b'"', newline)) % 2:
+        newline = buf.rfind(b"\n", 0, newline)
+    return newline + 1
+
+
+def _separators(buf: bytes, start: int, end: int) -> int:
+    """Number of records ending in buf[start:end], which starts a record."""
+    if buf.find(b'"', start, end) == -1:
+        return buf.count(b"\n", start, end)
+    # Keep only quotes and newlines. Quotes on one line that pair up cancel
+    # out, leaving a single quote wherever a quoted field spans lines;
+    # newlines after an odd number of those are inside a field.
+    marks = buf[start:end].translate(None, _NOT_QUOTE_OR_NEWLINE)
+    parts = marks.replace(b'""', b"").split(b'"')
+    return sum(part.count(b"\n") for part in parts[::2])
+
+
+def _record_start(buf: bytes, start: int, pos: int) -> int:
+    """Start of the record holding pos, searching back to start."""
+    newline = buf.rfind(b"\n", start, pos)
+    while newline != -1 and buf.count(b'"', start, newline) % 2:
+        newline = buf.rfind(b"\n", start, newline)
+    return start if newline == -1 else newline + 1
+
+
+def _record_end(buf: bytes, start: int, pos: int) -> int:
+    """Index of the newline ending the record that starts at start."""
+    newline = buf.find(b"\n", pos)
+    while newline != -1 and buf.count(b'"', start, newline) % 2:
+        newline = buf.find(b"\n", newline + 1)
+    return len(buf) if newline == -1 else newline
+
+
+def _keyword_pattern(keywords: Optional[Sequence[str]]):
+    """
+    Bytes pattern finding the keywords in lower-cased raw data.
+
+    Returns None when the raw bytes cannot rule a record out: for queries
+    without keywords, and for keywords that are not ASCII (their case is
+    not folded in bytes) or contain a quote (quotes are doubled in the file).
+    """
+    if keywords is None or not all(
+        keyword and keyword.isascii() and '"' not in keyword for keyword in keywords
+    ):
+        return None
+    alternatives = sorted((k.encode() for k in keywords), key=len, reverse=True)
+    return re.compile(b"|".join(re.escape(k) for k in alternatives))
+
+
+class DelimitedWorkbook:
+    """A .csv or .tsv file, read as a workbook with one sheet."""
+
+    # Rows without a keyword are skipped before parsing, which is about as
+    # fast as scanning a cached copy, so these files are not cached
+    skips_rows = True
+
+    def __init__(self, file_path: str, delimiter: str = ","):
+        self.file_path = file_path
+        self.delimiter = delimiter
+        self.sheet_name = os.path.splitext(os.path.basename(file_path))[0]
+
+    def iter_sheets(
+        self,
+        counts: Optional[Dict[str, int]] = None,
+        keywords: Optional[Sequence[str]] = None,
+    ):
+        """
+        Yield the single sheet as (0, name, rows).
+
+        rows yields (row index, values, types) with every cell typed as text.
+        With keywords, only records containing one of them are parsed, and
+        only their cells are counted into counts.
+        """
+        yield 0, self.sheet_name, self._rows(counts, keywords)
+
+    def _parse(self, data: bytes) -> Iterator[List[str]]:
+        return csv.reader(
+            io.StringIO(_decode(data), newline=""), delimiter=self.delimiter
+        )
+
+    def _regions(self) -> Iterator[bytes]:
+        """Read the file in buffers that end on a record boundary."""
+        with open(self.file_path, "rb") as f:
+            carry = f.read(len(_BOM))
+            if carry == _BOM:
+                carry = b""
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    if carry:
+                        yield carry
+                    return
+                buf = carry + data
+                end = _last_boundary(buf)
+                if end:
+                    carry = buf[end:]
+                    yield buf[:end]
+                else:
+                    carry = buf
+
+    def _rows(
+        self,
+        counts: Optional[Dict[str, int]],
+        keywords: Optional[Sequence[str]],
+    ) -> Iterator[Tuple[int, List[str], List[int]]]:
+        if keywords is not None and not keywords:
+            return  # Nothing can match
+        pattern = _keyword_pattern(keywords)
+        row_idx = 0
+        for region in self._regions():
+            if pattern is None or (
+                not region.isascii() and any(seq in region for seq in _ASCII_LOWERING)
+            ):
+                records = enumerate(self._parse(region))
+            else:
+                records = self._matching_records(region, pattern)
+            for offset, values in records:
+                if values:
+                    if counts is not None:
+                        counts["cells"] = counts.get("cells", 0) + len(values)
+                    yield row_idx + offset, values, [XL_CELL_TEXT] * len(values)
+            row_idx += _separators(region, 0, len(region))
+
+    def _matching_records(self, region: bytes, pattern):
+        """Parse the records of a region that contain a keyword, numbered."""
+        pos = 0
+        offset = 0
+        for match in pattern.finditer(region.lower()):
+            hit = match.start()
+            if hit < pos:
+                continue  # Another keyword in a record already parsed
+            start = _record_start(region, pos, hit)
+            offset += _separators(region, pos, start)
+            end = _record_end(region, start, hit)
+            for values in self._parse(region[start:end]):
+                yield offset, values
+            pos = end + 1
+            offset += 1
+
+
+@contextmanager
+def open_delimited(file_path: str, low_memory: Optional[bool] = None):
+    """
+    Open a .csv or .tsv file for scanning; .tsv files are split on tabs.
+
+    The file is always read in buffers, so low_memory has no effect.
+    """
+    tabs = os.path.splitext(file_path)[1].lower() == ".tsv"
+    yield DelimitedWorkbook(file_path, "\t" if tabs else ",")
@@ -0,0 +1,126 @@
+"""
+Registry of workbook readers, chosen by file signature.
+
+The first SNIFF_SIZE bytes of a file decide which reader opens it, so a
+workbook saved under the wrong extension is still read by the right
+backend, and a file that no reader recognizes is rejected before any parse
+is attempted. Formats without a magic number, such as delimited text, are
+only recognized in files with their own extensions: a text heuristic would
+accept almost anything, and a corrupt .xls should be skipped, not read as
+CSV.
+"""
+
+import logging
+import os
+from typing import (
+    Callable,
+    ContextManager,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .delimited import open_delimited, sniff_text
+from .xls import open_xls, sniff_xls
+from .xlsx import open_xlsx, sniff_xlsx
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Bytes read from the start of a file to recognize its format
+SNIFF_SIZE = 2048
+
+
+class Reader(NamedTuple):
+    """A file format backend."""
+
+    name: str
+    suffixes: Sequence[str]
+    sniff: Callable[[bytes], bool]
+    open: Callable[[str, Optional[bool]], ContextManager]
+    magic: bool
+
+
+_readers: List[Reader] = []
+
+
+def register_reader(
+    name: str,
+    suffixes: Sequence[str],
+    sniff: Callable[[bytes], bool],
+    open_func: Callable[[str, Optional[bool]], ContextManager],
+    magic: bool = True,
+) -> Reader:
+    """
+    Add a reader for a file format.
+
+    Args:
+        name: Short name of the format, as reported in logs
+        suffixes: File name suffixes of the format, such as ".xls"
+        sniff: Called with the first SNIFF_SIZE bytes of a file (fewer for
+            short files); returns whether the file has this format
+        open_func: Called as open_func(file_path, low_memory) and returns a
+            context manager yielding a workbook with iter_sheets
+        magic: Whether sniff checks a signature that sets the format apart;
+            if not, only files with one of suffixes are given to the reader
+
+    Returns:
+        The registered reader
+    """
+    reader = Reader(name, tuple(s.lower() for s in suffixes), sniff, open_func, magic)
+    _readers.append(reader)
+    return reader
+
+
+def workbook_suffixes() -> Tuple[str, ...]:
+    """File name suffixes of every registered format."""
+    return tuple(dict.fromkeys(s for reader in _readers for s in reader.suffixes))
+
+
+def detect_reader(file_path: str) -> Optional[Reader]:
+    """
+    Find the reader for a file from its first bytes.
+
+    When several readers accept the signature, the one registered for the
+    file's extension wins, otherwise the first registered with magic.
+
+    Returns:
+        The reader, or None if no reader recognizes the file
+    """
+    with open(file_path, "rb") as f:
+        sample = f.read(SNIFF_SIZE)
+    extension = os.path.splitext(file_path)[1].lower()
+    found = None
+    for reader in _readers:
+        if extension in reader.suffixes:
+            if reader.sniff(sample):
+                return reader
+        elif found is None and reader.magic and reader.sniff(sample):
+            found = reader
+    if found is not None:
+        logger.debug(f"{file_path} is read as {found.name} by its contents")
+    return found
+
+
+def open_workbook(file_path: str, low_memory: Optional[bool] = None):
+    """
+    Open a workbook with the reader for its format, as a context manager.
+
+    Args:
+        file_path: Path of the workbook
+        low_memory: Passed to the reader; see open_xls
+
+    Raises:
+        ValueError: If no reader recognizes the file
+    """
+    reader = detect_reader(file_path)
+    if reader is None:
+        raise ValueError("Unrecognized file format")
+    return reader.open(file_path, low_memory)
+
+
+register_reader("xls", [".xls"], sniff_xls, open_xls)
+register_reader("xlsx", [".xlsx"], sniff_xlsx, open_xlsx)
+register_reader("delimited", [".csv", ".tsv"], sniff_text, open_delimited, magic=False)
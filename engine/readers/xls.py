@@ -0,0 +1,94 @@
+"""Reader for legacy .xls workbooks, backed by xlrd."""
+
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence
+
+import xlrd
+
+# Workbooks at least this large are scanned one sheet at a time from a
+# memory-mapped file, so peak memory is bounded by the largest sheet
+LOW_MEMORY_THRESHOLD = (
+    int(os.environ.get("EXCELSEEKER_LOW_MEMORY_MB", 32)) * 1024 * 1024
+)
+
+# BIFF8 workbooks are stored in an OLE2 compound document; older BIFF2-4
+# files are a bare stream that starts with a BOF record
+_OLE2_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+_BIFF_BOF = (b"\x09\x00", b"\x09\x02", b"\x09\x04", b"\x09\x08")
+
+
+def sniff_xls(sample: bytes) -> bool:
+    """Whether a file starting with sample is an .xls workbook."""
+    return sample.startswith(_OLE2_SIGNATURE) or sample[:2] in _BIFF_BOF
+
+
+class XlsWorkbook:
+    """Row access to an open xlrd workbook, in the form the scan kernel reads."""
+
+    def __init__(self, book: xlrd.book.Book):
+        self.book = book
+
+    def iter_sheets(
+        self,
+        counts: Optional[Dict[str, int]] = None,
+        keywords: Optional[Sequence[str]] = None,
+    ):
+        """
+        Yield (index, name, rows) per sheet, unloading on-demand sheets once
+        scanned.
+
+        rows yields (row index, values, types) with xlrd's cell types. If
+        counts is given, counts["cells"] is increased by the size of each
+        sheet's used range. keywords is not used; every row is read.
+        """
+        book = self.book
+        for sheet_index in range(book.nsheets):
+            sheet = book.sheet_by_index(sheet_index)
+            if counts is not None:
+                counts["cells"] = counts.get("cells", 0) + sheet.nrows * sheet.ncols
+            yield sheet_index, sheet.name, _rows(sheet)
+            if book.on_demand:
+                book.unload_sheet(sheet_index)
+
+
+def _rows(sheet):
+    for row_idx in range(sheet.nrows):
+        yield row_idx, sheet.row_values(row_idx), sheet.row_types(row_idx)
+
+
+@contextmanager
+def open_xls(file_path: str, low_memory: Optional[bool] = None):
+    """
+    Open an .xls workbook for scanning.
+
+    In low-memory mode the file is memory-mapped instead of read into a
+    bytes object, and sheets are only parsed when iter_sheets reaches them.
+
+    Args:
+        file_path: Path of the .xls file
+        low_memory: Force low-memory mode on or off; by default it is used
+            for files of at least LOW_MEMORY_THRESHOLD bytes
+    """
+    if low_memory is None:
+        low_memory = os.path.getsize(file_path) >= LOW_MEMORY_THRESHOLD
+
+    if not low_memory:
+        book = xlrd.open_workbook(file_path)
+        try:
+            yield XlsWorkbook(book)
+        finally:
+            book.release_resources()
+        return
+
+    with open(file_path, "rb") as f:
+        contents = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        book = xlrd.open_workbook(file_contents=contents, on_demand=True)
+        try:
+            yield XlsWorkbook(book)
+        finally:
+            book.release_resources()
+    finally:
+        contents.close()
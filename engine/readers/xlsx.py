@@ -0,0 +1,243 @@
+"""
+Streaming reader for .xlsx workbooks.
+
+The sheet XML inside the zip is decompressed and parsed incrementally, one
+row at a time, and every row is discarded once it has been handed to the
+scan kernel. No document tree is built, so memory stays flat however large
+a sheet is; only the shared strings table is held, read once per workbook.
+"""
+
+import posixpath
+import zipfile
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+from xml.etree.ElementTree import iterparse
+
+from xlrd import (
+    XL_CELL_BOOLEAN,
+    XL_CELL_EMPTY,
+    XL_CELL_ERROR,
+    XL_CELL_NUMBER,
+    XL_CELL_TEXT,
+)
+
+_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_DOC_REL_NS = (
+    "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}",
+    "{http://purl.oclc.org/ooxml/officeDocument/relationships}",
+)
+# Relationship types end the same way in transitional and strict files
+_OFFICE_DOCUMENT = "/officeDocument"
+_WORKSHEET = "/worksheet"
+_SHARED_STRINGS = "/sharedStrings"
+# Local file header that starts every zip archive
+_ZIP_SIGNATURE = b"PK\x03\x04"
+
+
+def sniff_xlsx(sample: bytes) -> bool:
+    """Whether a file starting with sample is a zip archive, as .xlsx are."""
+    return sample.startswith(_ZIP_SIGNATURE)
+
+
+def _namespace(tag: str) -> str:
+    return tag[: tag.index("}") + 1] if tag.startswith("{") else ""
+
+
+def _column_index(ref: str) -> int:
+    """Zero-based column of a cell reference such as "AB12"."""
+    col = 0
+    for char in ref:
+        if "A" <= char <= "Z":
+            col = col * 26 + ord(char) - 64
+        else:
+            break
+    return col - 1
+
+
+def _string_item(item, ns: str) -> str:
+    """Text of a shared string or inline string, without phonetic runs."""
+    text_tag = ns + "t"
+    run_tag = ns + "r"
+    parts = []
+    for child in item:
+        if child.tag == text_tag:
+            parts.append(child.text or "")
+        elif child.tag == run_tag:
+            text = child.find(text_tag)
+            if text is not None:
+                parts.append(text.text or "")
+    return "".join(parts)
+
+
+def _relationships(archive: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str]]:
+    """Map relationship ids of a part to (type, target part name)."""
+    folder, name = posixpath.split(part)
+    rels_part = posixpath.join(folder, "_rels", name + ".rels")
+    if rels_part not in archive.NameToInfo:
+        return {}
+    rels = {}
+    with archive.open(rels_part) as f:
+        for _, elem in iterparse(f):
+            if elem.tag == _REL_NS + "Relationship":
+                target = elem.get("Target", "")
+                if target.startswith("/"):
+                    target = target[1:]
+                else:
+                    target = posixpath.normpath(posixpath.join(folder, target))
+                rels[elem.get("Id")] = (elem.get("Type", ""), target)
+    return rels
+
+
+class XlsxWorkbook:
+    """An open .xlsx file whose sheets are streamed when iterated."""
+
+    def __init__(self, archive: zipfile.ZipFile):
+        self.archive = archive
+        package_rels = _relationships(archive, "")
+        workbook_part = next(
+            (
+                target
+                for rel_type, target in package_rels.values()
+                if rel_type.endswith(_OFFICE_DOCUMENT)
+            ),
+            "xl/workbook.xml",
+        )
+        rels = _relationships(archive, workbook_part)
+
+        # Sheets in workbook order; chart sheets have no cells and are left out
+        self.sheets: List[Tuple[str, str]] = []
+        with archive.open(workbook_part) as f:
+            for _, elem in iterparse(f):
+                if not elem.tag.endswith("}sheet"):
+                    continue
+                rel_id = next(
+                    (elem.get(ns + "id") for ns in _DOC_REL_NS if elem.get(ns + "id")),
+                    None,
+                )
+                rel_type, target = rels.get(rel_id, ("", ""))
+                if rel_type.endswith(_WORKSHEET) and target in archive.NameToInfo:
+                    self.sheets.append((elem.get("name", ""), target))
+
+        strings_part = next(
+            (
+                target
+                for rel_type, target in rels.values()
+                if rel_type.endswith(_SHARED_STRINGS)
+            ),
+            None,
+        )
+        self.shared_strings = self._read_shared_strings(strings_part)
+
+    def _read_shared_strings(self, part: Optional[str]) -> List[str]:
+        if not part or part not in self.archive.NameToInfo:
+            return []
+        strings = []
+        ns = None
+        with self.archive.open(part) as f:
+            for event, elem in iterparse(f, events=("start", "end")):
+                if ns is None:
+                    ns = _namespace(elem.tag)
+                    root = elem
+                    continue
+                if event == "end" and elem.tag == ns + "si":
+                    strings.append(_string_item(elem, ns))
+                    root.clear()
+        return strings
+
+    def iter_sheets(
+        self,
+        counts: Optional[Dict[str, int]] = None,
+        keywords: Optional[Sequence[str]] = None,
+    ):
+        """
+        Yield (index, name, rows) per worksheet.
+
+        rows streams (row index, values, types) with xlrd's cell types, so
+        the scan kernel reads both formats the same way. Rows are padded up
+        to their last cell and empty rows are left out. If counts is given,
+        counts["cells"] is increased by the cells of each row read.
+        keywords is not used; a row's strings are only known once parsed.
+        """
+        for sheet_index, (name, part) in enumerate(self.sheets):
+            yield sheet_index, name, self._rows(part, counts)
+
+    def _rows(self, part: str, counts: Optional[Dict[str, int]]):
+        shared = self.shared_strings
+        with self.archive.open(part) as f:
+            ns = None
+            sheet_data = None
+            row_idx = -1
+            for event, elem in iterparse(f, events=("start", "end")):
+                if ns is None:
+                    ns = _namespace(elem.tag)
+                    row_tag, cell_tag = ns + "row", ns + "c"
+                    value_tag, inline_tag = ns + "v", ns + "is"
+                    continue
+                if event == "start":
+                    if elem.tag == ns + "sheetData":
+                        sheet_data = elem
+                    continue
+                if elem.tag != row_tag:
+                    continue
+
+                ref = elem.get("r")
+                row_idx = int(ref) - 1 if ref else row_idx + 1
+                values = []
+                types = []
+                col_idx = -1
+                for cell in elem:
+                    if cell.tag != cell_tag:
+                        continue
+                    ref = cell.get("r")
+                    col_idx = _column_index(ref) if ref else col_idx + 1
+                    cell_type = cell.get("t", "n")
+                    if cell_type == "inlineStr":
+                        item = cell.find(inline_tag)
+                        if item is None:
+                            continue
+                        value, xl_type = _string_item(item, ns), XL_CELL_TEXT
+                    else:
+                        raw = cell.findtext(value_tag)
+                        if raw is None:
+                            continue
+                        if cell_type == "s":
+                            value, xl_type = shared[int(raw)], XL_CELL_TEXT
+                        elif cell_type == "n":
+                            value, xl_type = float(raw), XL_CELL_NUMBER
+                        elif cell_type == "b":
+                            value, xl_type = int(raw), XL_CELL_BOOLEAN
+                        elif cell_type == "e":
+                            value, xl_type = raw, XL_CELL_ERROR
+                        else:  # "str" formula results and "d" ISO dates
+                            value, xl_type = raw, XL_CELL_TEXT
+                    if col_idx >= len(values):
+                        padding = col_idx - len(values)
+                        values.extend([""] * padding)
+                        types.extend([XL_CELL_EMPTY] * padding)
+                        values.append(value)
+                        types.append(xl_type)
+                    else:
+                        values[col_idx] = value
+                        types[col_idx] = xl_type
+
+                # Drop the parsed row before the next one is read
+                if sheet_data is not None:
+                    sheet_data.clear()
+                else:
+                    elem.clear()
+                if values:
+                    if counts is not None:
+                        counts["cells"] = counts.get("cells", 0) + len(values)
+                    yield row_idx, values, types
+
+
+@contextmanager
+def open_xlsx(file_path: str, low_memory: Optional[bool] = None):
+    """
+    Open an .xlsx workbook for scanning.
+
+    Sheets are always streamed, so low_memory is accepted for the same
+    signature as open_xls but has no effect.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        yield XlsxWorkbook(archive)
@@ -0,0 +1,169 @@
+"""Server-side storage of finished result sets for paginated access."""
+
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SORT_KEYS = ("filename", "sheet", "cell", "value")
+FILTER_COLUMNS = ("all",) + SORT_KEYS
+
+_CELL_ADDRESS = re.compile(r"([A-Z]+)(\d+)")
+
+
+def _cell_sort_key(result: Dict[str, Any]):
+    """Sort cell references column-wise like Excel (B2 < B10 < AA1)."""
+    match = _CELL_ADDRESS.fullmatch(str(result.get("cell", "")))
+    if not match:
+        return (1, 0, "", 0)
+    letters, row = match.groups()
+    return (0, len(letters), letters, int(row))
+
+
+_SORT_FUNCTIONS = {
+    "filename": lambda r: (r["filename"].lower(), r["filepath"]),
+    "sheet": lambda r: str(r["sheet"]).lower(),
+    "cell": _cell_sort_key,
+    "value": lambda r: str(r["value"]).lower(),
+}
+
+
+class ResultSet:
+    """A finished search's results plus the last sorted/filtered view of them."""
+
+    def __init__(self, results: List[Dict[str, Any]], summary: Dict[str, Any]):
+        self.results = results
+        self.summary = summary
+        self.last_access = time.time()
+        # (view key, view) kept as one tuple so concurrent readers never see
+        # a key paired with another request's view
+        self._last_view = (None, results)
+
+    def view(
+        self,
+        sort_key: Optional[str],
+        descending: bool,
+        filter_text: str,
+        filter_column: str,
+    ) -> List[Dict[str, Any]]:
+        """Return the results sorted and filtered; the last view is reused."""
+        key = (sort_key, descending, filter_text, filter_column)
+        last_key, last_view = self._last_view
+        if key == last_key:
+            return last_view
+
+        view = self.results
+        if filter_text:
+            needle = filter_text.lower()
+            if filter_column == "all":
+                view = [
+                    r
+                    for r in view
+                    if any(needle in str(r[column]).lower() for column in SORT_KEYS)
+                ]
+            else:
+                view = [r for r in view if needle in str(r[filter_column]).lower()]
+        if sort_key:
+            view = sorted(view, key=_SORT_FUNCTIONS[sort_key], reverse=descending)
+
+        self._last_view = (key, view)
+        return view
+
+
+class ResultStore:
+    """
+    Keeps finished result sets in memory under their search id.
+
+    Sets expire max_age seconds after they were last read, and only the
+    max_sets most recently used sets are kept.
+    """
+
+    def __init__(self, max_sets: int, max_age: float):
+        self.max_sets = max_sets
+        self.max_age = max_age
+        self._sets: "OrderedDict[str, ResultSet]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(
+        self,
+        search_id: str,
+        results: List[Dict[str, Any]],
+        summary: Optional[Dict[str, Any]] = None,
+    ):
+        """Store the results of a finished search."""
+        with self._lock:
+            self._sets[search_id] = ResultSet(results, summary or {})
+            self._sets.move_to_end(search_id)
+            self._expire()
+
+    def discard(self, search_id: str) -> bool:
+        """Release a result set; returns False if it was not found."""
+        with self._lock:
+            return self._sets.pop(search_id, None) is not None
+
+    def page(
+        self,
+        search_id: str,
+        page: int = 1,
+        page_size: int = 100,
+        sort_key: Optional[str] = None,
+        descending: bool = False,
+        filter_text: str = "",
+        filter_column: str = "all",
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetch one page of a stored result set.
+
+        Returns:
+            Dictionary with the page's results and paging totals, or None if
+            the result set does not exist or has expired
+        """
+        if sort_key is not None and sort_key not in SORT_KEYS:
+            raise ValueError(f"Invalid sort key: {sort_key}")
+        if filter_column not in FILTER_COLUMNS:
+            raise ValueError(f"Invalid filter column: {filter_column}")
+
+        with self._lock:
+            self._expire()
+            result_set = self._sets.get(search_id)
+            if result_set is None:
+                return None
+            result_set.last_access = time.time()
+            self._sets.move_to_end(search_id)
+
+        view = result_set.view(sort_key, descending, filter_text, filter_column)
+        total = len(view)
+        total_pages = max(1, math.ceil(total / page_size))
+        page = min(max(1, page), total_pages)
+        start = (page - 1) * page_size
+        return {
+            "search_id": search_id,
+            "results": view[start : start + page_size],
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
+            "total_results": total,
+            "unfiltered_results": len(result_set.results),
+            "summary": result_set.summary,
+        }
+
+    def _expire(self):
+        now = time.time()
+        expired = [
+            search_id
+            for search_id, result_set in self._sets.items()
+            if now - result_set.last_access >= self.max_age
+        ]
+        for search_id in expired:
+            del self._sets[search_id]
+        while len(self._sets) > self.max_sets:
+            search_id, _ = self._sets.popitem(last=False)
+            expired.append(search_id)
+        if expired:
+            logger.info(f"Released {len(expired)} stored result sets")
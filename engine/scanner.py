@@ -0,0 +1,389 @@
+"""Workbook scanning kernel shared by the web app and the worker pools."""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from xlrd import XL_CELL_TEXT
+
+from .matcher import compile_matcher
+from .metrics import peak_rss_bytes
+from .readers import LOW_MEMORY_THRESHOLD, open_workbook
+from .shadow_store import ShadowStore
+from .workbook_cache import CompactWorkbook, RecordingWorkbook, workbook_cache
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# (sheet name, zero-based row, zero-based column, cell value)
+MatchRecord = Tuple[str, int, int, str]
+
+
+def format_cell_address(row, col):
+    """Convert row and column numbers to Excel cell reference."""
+    col_str = ""
+    while col:
+        col, remainder = divmod(col - 1, 26)
+        col_str = chr(65 + remainder) + col_str
+    return f"{col_str}{row}"
+
+
+def match_cells(
+    workbook,
+    search_text: str,
+    search_mode: str = "exact",
+    counts: Optional[Dict[str, int]] = None,
+):
+    """
+    Run a query over every sheet of an open workbook.
+
+    The workbook comes from readers.open_workbook or open_cached. Whole
+    rows are read at once, and when the query cannot occur in the text of a
+    number, the cell types are used to look at text cells only. Cached
+    workbooks are searched through their text buffers instead. Cells scanned
+    are counted into counts, as by the reader's iter_sheets.
+
+    Returns:
+        List of MatchRecord tuples in sheet/row/column order
+    """
+    matcher = compile_matcher(search_text, search_mode)
+    if isinstance(workbook, CompactWorkbook):
+        return workbook.find([matcher], counts)[0]
+    matches: List[MatchRecord] = []
+    add_match = matches.append
+    matches_cell = matcher.matches
+    # Number, date, boolean and error cells render as numbers; when no
+    # keyword could occur in one, only text cells need to be looked at.
+    text_only = not matcher.numeric
+
+    for _, sheet_name, rows in workbook.iter_sheets(counts, matcher.triggers):
+        for row_idx, values, types in rows:
+            if text_only:
+                for col_idx, cell_type in enumerate(types):
+                    if cell_type == XL_CELL_TEXT:
+                        value = values[col_idx]
+                        if value and matches_cell(value.lower()):
+                            add_match((sheet_name, row_idx, col_idx, value))
+            else:
+                for col_idx, cell_value in enumerate(values):
+                    value = str(cell_value)
+                    if value and matches_cell(value.lower()):
+                        add_match((sheet_name, row_idx, col_idx, value))
+    return matches
+
+
+def match_cells_multi(
+    workbook,
+    queries: Sequence[Tuple[str, str]],
+    counts: Optional[Dict[str, int]] = None,
+) -> List[List[MatchRecord]]:
+    """
+    Run several queries over an open workbook in one pass.
+
+    Each cell is read and lower-cased once and then tested against every
+    query, so a batch costs one parse and one walk over the cells.
+
+    Args:
+        workbook: Workbook from readers.open_workbook
+        queries: (search text, search mode) pairs
+        counts: Cells scanned are counted into it, as by the reader's
+            iter_sheets
+
+    Returns:
+        One list of MatchRecord tuples per query, in the order given
+    """
+    matchers = [compile_matcher(text, mode) for text, mode in queries]
+    if isinstance(workbook, CompactWorkbook):
+        return workbook.find(matchers, counts)
+    matches: List[List[MatchRecord]] = [[] for _ in matchers]
+    tests = [
+        (matcher.matches, found.append) for matcher, found in zip(matchers, matches)
+    ]
+    text_only = not any(matcher.numeric for matcher in matchers)
+    # Rows may be skipped only if every query rules them out
+    triggers = [matcher.triggers for matcher in matchers]
+    keywords = (
+        None
+        if any(t is None for t in triggers)
+        else sorted({keyword for t in triggers for keyword in t})
+    )
+
+    for _, sheet_name, rows in workbook.iter_sheets(counts, keywords):
+        for row_idx, values, types in rows:
+            if text_only:
+                cells = (
+                    (col_idx, values[col_idx])
+                    for col_idx, cell_type in enumerate(types)
+                    if cell_type == XL_CELL_TEXT
+                )
+            else:
+                cells = (
+                    (col_idx, str(cell_value))
+                    for col_idx, cell_value in enumerate(values)
+                )
+            for col_idx, value in cells:
+                if not value:
+                    continue
+                lowered = value.lower()
+                record = None
+                for matches_cell, add_match in tests:
+                    if matches_cell(lowered):
+                        if record is None:
+                            record = (sheet_name, row_idx, col_idx, value)
+                        add_match(record)
+    return matches
+
+
+def file_stats(
+    file_path: str,
+    started: float,
+    cells: int,
+    cached: Optional[str] = None,
+    bytes_read: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Statistics a worker reports for one file it opened.
+
+    cached is where the cells came from instead of the file, as yielded by
+    open_cached, and bytes_read what was read for them; the file's size by
+    default. The statistics of this process's workbook cache are included,
+    with the process ID, since each worker process has its own cache.
+    """
+    if bytes_read is not None:
+        size = bytes_read
+    else:
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+    return {
+        "seconds": time.perf_counter() - started,
+        "cells": cells,
+        "bytes": size,
+        "peak_rss": peak_rss_bytes(),
+        "cached": cached,
+        "process": os.getpid(),
+        "workbook_cache": workbook_cache.stats(),
+    }
+
+
+@contextmanager
+def open_cached(
+    file_path: str, low_memory: Optional[bool] = None, shadow_dir: Optional[str] = None
+):
+    """
+    Open a workbook for a scan, from the workbook cache or shadow store.
+
+    Yields (workbook, cached), where cached is "memory" for a hit in the
+    workbook cache, "shadow" for a shadow copy and None if the file is
+    read. The workbook cache is tried first, then the shadow copy in
+    shadow_dir, if given. On a miss the workbook is read as
+    usual and recorded while it is scanned; if the scan reads it to the
+    end, the compact copy is added to the cache and saved to the store for
+    the next query. Workbooks opened in low-memory mode are never recorded,
+    as holding a copy would undo the bounded memory of that mode.
+    """
+    cache = workbook_cache
+    store = ShadowStore(shadow_dir) if shadow_dir else None
+    if not cache.max_bytes and store is None:
+        with open_workbook(file_path, low_memory) as workbook:
+            yield workbook, None
+        return
+
+    stats = os.stat(file_path)
+    fingerprint = (stats.st_size, stats.st_mtime)
+    if cache.max_bytes:
+        hit = cache.get(file_path, fingerprint)
+        if hit is not None:
+            yield hit, "memory"
+            return
+    if store is not None:
+        with store.open(file_path, fingerprint) as shadow:
+            if shadow is not None:
+                yield shadow, "shadow"
+        if shadow is not None:
+            return
+
+    if low_memory is None:
+        low_memory = stats.st_size >= LOW_MEMORY_THRESHOLD
+    max_bytes = max(
+        cache.max_entry_bytes, store.max_entry_bytes if store is not None else 0
+    )
+    recorder = None
+    with open_workbook(file_path, low_memory) as workbook:
+        if (
+            not low_memory
+            and stats.st_size <= max_bytes
+            and not getattr(workbook, "skips_rows", False)
+        ):
+            recorder = workbook = RecordingWorkbook(workbook, max_bytes)
+        yield workbook, None
+    compact = recorder.result() if recorder is not None else None
+    if compact is None:
+        return
+    if cache.max_bytes:
+        cache.put(file_path, fingerprint, compact)
+    if store is not None:
+        try:
+            store.write(file_path, fingerprint, compact)
+        except OSError as e:
+            logger.warning(f"Could not save shadow copy of {file_path}: {str(e)}")
+
+
+def _bytes_read(workbook, cached: Optional[str]) -> Optional[int]:
+    """Bytes a scan reads from disk, if not the whole file."""
+    if cached == "memory":
+        return 0
+    if cached == "shadow":
+        # Only the mapped shadow copy is read
+        return workbook.nbytes
+    return None
+
+
+def scan_workbook(
+    file_path: str,
+    search_text: str,
+    search_mode: str = "exact",
+    low_memory: Optional[bool] = None,
+    collect_stats: bool = False,
+    shadow_dir: Optional[str] = None,
+):
+    """
+    Open a workbook and collect compact match records.
+
+    This is the unit of work submitted to the worker pools. It only returns
+    plain tuples so results stay small when they cross a process boundary.
+    Workbooks in this process's workbook cache, or with a current shadow
+    copy in shadow_dir, are not read again.
+
+    Returns:
+        {"matches": [MatchRecord, ...]} on success or
+        {"error": str, "skipped": True} if the file could not be read. With
+        collect_stats, either also has "stats" as from file_stats.
+    """
+    started = time.perf_counter()
+    counts = {"cells": 0}
+    cached = None
+    bytes_read = None
+    try:
+        with open_cached(file_path, low_memory, shadow_dir) as (
+            workbook,
+            cached,
+        ):
+            bytes_read = _bytes_read(workbook, cached)
+            result = {
+                "matches": match_cells(
+                    workbook,
+                    search_text,
+                    search_mode,
+                    counts if collect_stats else None,
+                )
+            }
+    except Exception as e:
+        logger.error(f"Error processing file {file_path}: {str(e)}")
+        result = {"error": str(e), "skipped": True}
+    if collect_stats:
+        result["stats"] = file_stats(
+            file_path, started, counts["cells"], cached, bytes_read
+        )
+    return result
+
+
+def scan_workbook_multi(
+    file_path: str,
+    queries: Sequence[Tuple[str, str]],
+    low_memory: Optional[bool] = None,
+    collect_stats: bool = False,
+    shadow_dir: Optional[str] = None,
+):
+    """
+    Open a workbook once and collect match records for several queries.
+
+    Returns:
+        {"matches": [[MatchRecord, ...] per query]} on success or
+        {"error": str, "skipped": True} if the file could not be read. With
+        collect_stats, either also has "stats" as from file_stats.
+    """
+    started = time.perf_counter()
+    counts = {"cells": 0}
+    cached = None
+    bytes_read = None
+    try:
+        with open_cached(file_path, low_memory, shadow_dir) as (
+            workbook,
+            cached,
+        ):
+            bytes_read = _bytes_read(workbook, cached)
+            result = {
+                "matches": match_cells_multi(
+                    workbook, queries, counts if collect_stats else None
+                )
+            }
+    except Exception as e:
+        logger.error(f"Error processing file {file_path}: {str(e)}")
+        result = {"error": str(e), "skipped": True}
+    if collect_stats:
+        result["stats"] = file_stats(
+            file_path, started, counts["cells"], cached, bytes_read
+        )
+    return result
+
+
+def extract_cells(
+    file_path: str, low_memory: Optional[bool] = None, collect_stats: bool = False
+):
+    """
+    Read every non-empty cell of a workbook for indexing.
+
+    Returns:
+        {"cells": [(sheet index, sheet name, row, col, value), ...]} on success
+        or {"error": str, "skipped": True} if the file could not be read. With
+        collect_stats, either also has "stats" as from file_stats.
+    """
+    started = time.perf_counter()
+    counts = {"cells": 0}
+    try:
+        cells = []
+        with open_workbook(file_path, low_memory) as workbook:
+            for sheet_index, sheet_name, rows in workbook.iter_sheets(counts):
+                for row_idx, values, _ in rows:
+                    for col_idx, cell_value in enumerate(values):
+                        value = str(cell_value)
+                        if value:
+                            cells.append(
+                                (sheet_index, sheet_name, row_idx, col_idx, value)
+                            )
+        result = {"cells": cells}
+    except Exception as e:
+        logger.error(f"Error indexing file {file_path}: {str(e)}")
+        result = {"error": str(e), "skipped": True}
+    if collect_stats:
+        result["stats"] = file_stats(file_path, started, counts["cells"])
+    return result
+
+
+def expand_matches(file_path: str, matches: List[MatchRecord]) -> List[Dict[str, Any]]:
+    """Turn compact match records into the result dicts sent to the browser."""
+    filename = os.path.basename(file_path)
+    filepath = str(os.path.abspath(file_path))
+    return [
+        {
+            "filename": filename,
+            "filepath": filepath,
+            "sheet": sheet_name,
+            "cell": format_cell_address(row_idx + 1, col_idx + 1),
+            "value": value,
+        }
+        for sheet_name, row_idx, col_idx, value in matches
+    ]
+
+
+def process_excel_file(file_path, search_text, search_mode="exact"):
+    """Process an Excel file and search for text."""
+    scanned = scan_workbook(file_path, search_text, search_mode)
+    if "matches" not in scanned:
+        return scanned
+    results = expand_matches(file_path, scanned["matches"])
+    return {"results": results, "count": len(results)}
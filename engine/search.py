@@ -0,0 +1,914 @@
+"""Folder search engine shared by the web app and the command line."""
+
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .cache_store import SearchCacheStore
+from .executor import ScanExecutor
+from .index import CellIndex
+from .manifest import FileManifest, ManifestStore
+from .metrics import MetricsRegistry, SearchMetrics
+from .profiler import SearchProfiler
+from .readers import workbook_suffixes
+from .scanner import expand_matches, extract_cells, scan_workbook, scan_workbook_multi
+from .shadow_store import ShadowStore
+from .skip_list import SkipListSnapshot, SkipListStore
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class SearchEngine:
+    """
+    Runs folder searches and reports them as a stream of event dicts.
+
+    The events are the payloads the web app sends over SSE:
+
+    - {"type": "progress", ...} after each file
+    - {"type": "results", "file": path, "results": [...]} with the rows of
+      one file (or all rows at once for cached and filename searches)
+    - {"type": "complete", "results": [...], ...} or
+      {"type": "cancelled", "results": [...], "partial": True, ...} at the
+      end, always with every row in folder order
+    - {"error": message} if the search could not run
+
+    Final events carry a "metrics" summary of the search (see SearchMetrics),
+    which is also added to the metrics registry if one is given.
+
+    Args:
+        scan_executor: Worker pools used to open workbooks
+        cell_index: Persistent cell index, used when use_index is set
+        search_cache: Cache of finished searches
+        skip_list: Store of workbooks that failed to open
+        manifests: Store of folder manifests used to find workbooks
+        query_processor: Optional natural language query processor with
+            process_query(text) and apply_filters(results, filters), like
+            nlp.SearchIntegration; queries are used literally without one
+        default_executor: Worker pool used when a search does not pick one
+        metrics: Optional registry that aggregates finished searches
+        shadow_store: Optional store of extracted workbook cells; scans
+            read workbooks from it instead of parsing them again
+    """
+
+    def __init__(
+        self,
+        scan_executor: ScanExecutor,
+        cell_index: CellIndex,
+        search_cache: SearchCacheStore,
+        skip_list: SkipListStore,
+        manifests: ManifestStore,
+        query_processor=None,
+        default_executor: str = "thread",
+        metrics: Optional[MetricsRegistry] = None,
+        shadow_store: Optional[ShadowStore] = None,
+    ):
+        self.scan_executor = scan_executor
+        self.cell_index = cell_index
+        self.search_cache = search_cache
+        self.skip_list = skip_list
+        self.manifests = manifests
+        self.query_processor = query_processor
+        self.default_executor = default_executor
+        self.metrics = metrics
+        self.shadow_store = shadow_store
+
+    def _scan_task(self, scan):
+        """Bind the options every scan worker runs with."""
+        shadow_dir = self.shadow_store.directory if self.shadow_store else None
+        return partial(scan, collect_stats=True, shadow_dir=shadow_dir)
+
+    def find_excel_files(self, folder_path: str) -> FileManifest:
+        """Recursively find all Excel files in the folder and its subdirectories.
+
+        Returns a FileManifest with the absolute path, size and mtime of each
+        file, sorted by path.
+        """
+        return self.manifests.crawl(folder_path, workbook_suffixes())
+
+    @staticmethod
+    def directory_hash(manifest: FileManifest, skip_list: SkipListSnapshot) -> str:
+        """Calculate a hash of the directory state including file contents and skip list.
+
+        Manifest paths are absolute, so skip list membership is checked
+        without normalizing each path again, and no file is stat'ed a second
+        time. Only the skip list entries under the folder are hashed, so the
+        hash survives restarts and is not changed by skips in other folders.
+        """
+        hasher = hashlib.sha256()
+
+        # Manifest entries are sorted for consistent hashing
+        for entry in manifest:
+            if entry.path in skip_list:
+                # Skipped files are left out of the search whatever their state
+                file_info = f"{entry.path}|skipped"
+            else:
+                # Add file path, size, and modification time to hash
+                file_info = f"{entry.path}|{entry.size}|{entry.mtime}"
+            hasher.update(file_info.encode())
+
+        return hasher.hexdigest()
+
+    @staticmethod
+    def cache_key(folder_path: str, search_text: str, search_mode: str) -> str:
+        """Generate a cache key for the search parameters."""
+        # The skip list is not part of the key: it is already folded into the
+        # directory hash, and per-file results for skipped files are never
+        # reused, so a skip list change only rescans the files it affects.
+        return f"{folder_path}|{search_text}|{search_mode}"
+
+    def process_query(
+        self, search_text: str, search_mode: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Turn a query into search parameters, using the NLP processor if set.
+
+        An "exact", "any" or "all" search_mode given by the caller wins over
+        the mode the processor infers from the wording; with None or "nlp"
+        the inferred mode is used, or "exact" without a processor.
+        """
+        if search_mode not in ("exact", "any", "all"):
+            search_mode = None
+        if self.query_processor is None:
+            return {
+                "search_text": search_text,
+                "search_mode": search_mode or "exact",
+                "filters": {},
+            }
+        search_params = self.query_processor.process_query(search_text)
+        if search_mode:
+            search_params["search_mode"] = search_mode
+        logger.info(f"Processed search parameters: {search_params}")
+        return search_params
+
+    def build_results(
+        self,
+        file_path: str,
+        matches: List,
+        search_params: Dict[str, Any],
+        search_metrics: Optional[SearchMetrics] = None,
+    ) -> List[Dict[str, Any]]:
+        """Expand a file's match records and apply the query's filters."""
+        with _phase(search_metrics, "expand"):
+            results = expand_matches(file_path, matches)
+        if self.query_processor is None:
+            return results
+        with _phase(search_metrics, "filters"):
+            return self.query_processor.apply_filters(
+                results, search_params.get("filters", {})
+            )
+
+    def _skipped_entries(self, xls_files: List[str], skip_list: SkipListSnapshot):
+        # find_excel_files returns absolute paths, as stored in the list
+        return [
+            {
+                "file": os.path.basename(file_path),
+                "path": file_path,
+                "reason": skip_list.get(file_path),
+            }
+            for file_path in xls_files
+            if file_path in skip_list
+        ]
+
+    def _record_failure(self, file_path: str, result: Dict[str, Any]):
+        """Describe a file that failed to open and put it on the skip list."""
+        error_msg = result.get("error", "Unknown error")
+        # Add to persistent skip list, unless the worker pool failed rather
+        # than the file itself
+        if not result.get("pool_error"):
+            self.skip_list.add(file_path, error_msg)
+        return {"file": os.path.basename(file_path), "reason": error_msg}
+
+    def search_filenames(
+        self,
+        folder_path: str,
+        search_text: str,
+        use_wildcard: bool = False,
+        use_regex: bool = False,
+        extension_filter: Optional[str] = None,
+        path_filter: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search for files by filename only."""
+        results = []
+
+        # Process extension filter
+        allowed_extensions = None
+        if extension_filter:
+            allowed_extensions = set(
+                ext.strip().lower() for ext in extension_filter.split(",")
+            )
+
+        # Compile regex pattern if using regex
+        regex_pattern = None
+        if use_regex:
+            try:
+                regex_pattern = re.compile(search_text, re.IGNORECASE)
+            except re.error:
+                raise ValueError("Invalid regular expression pattern")
+
+        manifest = self.manifests.crawl(folder_path)
+        for entry in manifest:
+            root, filename = os.path.split(entry.path)
+
+            # Check path filter if specified
+            if path_filter:
+                rel_path = os.path.relpath(root, manifest.root)
+                if not fnmatch.fnmatch(rel_path.lower(), path_filter.lower()):
+                    continue
+
+            # Check file extension if filter is specified
+            if allowed_extensions:
+                ext = os.path.splitext(filename)[1][1:].lower()
+                if ext not in allowed_extensions:
+                    continue
+
+            # Get relative path for display
+            rel_path = os.path.relpath(entry.path, manifest.root)
+
+            # Perform filename matching based on search mode
+            match = False
+            if use_regex and regex_pattern:
+                match = bool(regex_pattern.search(filename))
+            elif use_wildcard:
+                match = fnmatch.fnmatch(filename.lower(), search_text.lower())
+            else:
+                match = search_text.lower() in filename.lower()
+
+            if match:
+                results.append(
+                    {
+                        "filename": filename,
+                        "filepath": entry.path,
+                        "relative_path": rel_path,
+                        "directory": root,
+                        "sheet": "N/A",  # Match the fields of cell results
+                        "cell": "N/A",  # for the results table
+                        "value": filename,  # Use filename as the value
+                    }
+                )
+
+        return results
+
+    def _index_tasks(
+        self,
+        folder_path: str,
+        xls_files: List[str],
+        scan_files: List[str],
+        fingerprints: Dict,
+        executor_mode: str,
+        cancel_event: Optional[threading.Event] = None,
+        search_metrics: Optional[SearchMetrics] = None,
+        profiler: Optional[SearchProfiler] = None,
+    ):
+        """
+        Prepare indexing of the new or changed workbooks among scan_files.
+
+        Returns:
+            The stale files, as from CellIndex.stale_files, and an iterator
+            of (file path, result) per parsed workbook like
+            ScanExecutor.map_files; extracted cells are stored before each
+            result is yielded
+        """
+        self.cell_index.prune(folder_path, xls_files)
+        stale = self.cell_index.stale_files(scan_files, fingerprints)
+
+        def tasks():
+            for file_path, result in self.scan_executor.map_files(
+                executor_mode,
+                _profiled(partial(extract_cells, collect_stats=True), profiler),
+                list(stale),
+                cancel_event=cancel_event,
+            ):
+                if "cells" in result:
+                    with _phase(search_metrics, "index_store"):
+                        self.cell_index.store(
+                            file_path, stale[file_path], result["cells"]
+                        )
+                yield file_path, result
+
+        return stale, tasks()
+
+    def index_folder(self, folder_path: str, executor_mode: Optional[str] = None):
+        """Bring the cell index up to date for every workbook in a folder."""
+        manifest = self.find_excel_files(folder_path)
+        skip_list = self.skip_list.snapshot()
+        xls_files = [path for path in manifest.paths() if path not in skip_list]
+        fingerprints = {path: manifest.get(path).fingerprint for path in xls_files}
+        stale, tasks = self._index_tasks(
+            folder_path,
+            xls_files,
+            xls_files,
+            fingerprints,
+            executor_mode or self.default_executor,
+        )
+        for _ in tasks:
+            pass
+        logger.info(f"Indexed {len(stale)} changed workbooks in {folder_path}")
+
+    def reindex_file(self, file_path: str):
+        """Update the cell index for one workbook that changed or was removed."""
+        if not os.path.exists(file_path):
+            self.cell_index.remove([file_path])
+            return
+
+        stale = self.cell_index.stale_files([file_path])
+        if file_path not in stale:
+            return
+        result = extract_cells(file_path)
+        if "cells" not in result:
+            # Leave it to the next search to put the file on the skip list
+            logger.warning(f"Could not index {file_path}: {result.get('error')}")
+            return
+        self.cell_index.store(file_path, stale[file_path], result["cells"])
+        # A workbook that was skipped before has been replaced by a readable one
+        self.skip_list.remove(file_path)
+        logger.info(f"Re-indexed {file_path}")
+
+    def search_folder(
+        self,
+        folder_path: str,
+        search_text: str,
+        search_mode: Optional[str] = "exact",
+        executor_mode: Optional[str] = None,
+        use_index: bool = False,
+        cancel_event: Optional[threading.Event] = None,
+        filename_options: Optional[Dict[str, Any]] = None,
+        profiler: Optional[SearchProfiler] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Search every workbook in a folder, yielding events as it goes.
+
+        Args:
+            folder_path: Folder to search, including subfolders
+            search_text: Query text; run through the query processor
+            search_mode: "exact", "any", "all" or "filename"; wins over the
+                mode the query processor infers, which is used if None or
+                "nlp"
+            executor_mode: Worker pool to scan with, "thread" or "process"
+            use_index: Answer the query from the cell index, only parsing
+                new or changed workbooks
+            cancel_event: Set to stop the search after the current file
+            filename_options: use_wildcard, use_regex, extension_filter and
+                path_filter for filename searches
+            profiler: Optional profiler, started by the caller; the scan
+                workers of this search are profiled into it as well
+        """
+        search_metrics = SearchMetrics()
+        yield from self._instrument(
+            "folder",
+            search_metrics,
+            self._search_folder(
+                search_metrics,
+                folder_path,
+                search_text,
+                search_mode,
+                executor_mode,
+                use_index,
+                cancel_event,
+                filename_options,
+                profiler,
+            ),
+        )
+
+    def _instrument(
+        self,
+        kind: str,
+        search_metrics: SearchMetrics,
+        events: Iterator[Dict[str, Any]],
+    ) -> Iterator[Dict[str, Any]]:
+        """Add metrics to the final event and record the finished search."""
+        for event in events:
+            if "error" in event:
+                status = "error"
+            elif event.get("type") in ("complete", "cancelled"):
+                status = event["type"]
+                if self.shadow_store is not None and search_metrics.files_scanned > (
+                    search_metrics.files_cached + search_metrics.files_shadow
+                ):
+                    # Workbooks were parsed, so shadow copies may have been added
+                    with search_metrics.phase("shadow_prune"):
+                        shadow_bytes = self.shadow_store.prune()
+                    if self.metrics is not None:
+                        self.metrics.set_gauge("shadow_store_bytes", shadow_bytes)
+                event["metrics"] = search_metrics.as_dict()
+            else:
+                yield event
+                continue
+            if self.metrics is not None:
+                self.metrics.observe_search(
+                    kind, status, search_metrics, event.get("from_cache")
+                )
+            yield event
+
+    def _search_folder(
+        self,
+        search_metrics: SearchMetrics,
+        folder_path: str,
+        search_text: str,
+        search_mode: Optional[str],
+        executor_mode: Optional[str],
+        use_index: bool,
+        cancel_event: Optional[threading.Event],
+        filename_options: Optional[Dict[str, Any]],
+        profiler: Optional[SearchProfiler],
+    ) -> Iterator[Dict[str, Any]]:
+        executor_mode = executor_mode or self.default_executor
+        cancel_event = cancel_event or threading.Event()
+
+        if not os.path.exists(folder_path):
+            yield {"error": "Folder not found"}
+            return
+
+        # Handle filename search mode
+        if search_mode == "filename":
+            try:
+                with search_metrics.phase("walk"):
+                    results = self.search_filenames(
+                        folder_path, search_text, **(filename_options or {})
+                    )
+            except Exception as e:
+                logger.error(f"Error in filename search: {str(e)}")
+                yield {"error": str(e)}
+                return
+
+            yield {
+                "type": "progress",
+                "current_file": "Searching filenames...",
+                "processed": 1,
+                "total": 1,
+                "results_found": len(results),
+            }
+            yield {"type": "results", "results": results}
+            yield {
+                "type": "complete",
+                "results": results,
+                "total_processed": 1,
+                "total_skipped": 0,
+                "skipped_files": [],
+                "total_results": len(results),
+                "from_cache": False,
+            }
+            return
+
+        # Process natural language query for non-filename searches
+        with search_metrics.phase("parse_query"):
+            search_params = self.process_query(search_text, search_mode)
+
+        # Take one skip list snapshot for the whole search
+        skip_list = self.skip_list.snapshot()
+
+        # Walk the folder once; the manifest serves hashing, counting and
+        # change detection below
+        with search_metrics.phase("walk"):
+            manifest = self.find_excel_files(folder_path)
+
+        # Calculate directory hash and check cache
+        with search_metrics.phase("hash"):
+            dir_hash = self.directory_hash(manifest, skip_list)
+        cache_key = self.cache_key(
+            folder_path, json.dumps(search_params), search_params["search_mode"]
+        )
+        with search_metrics.phase("cache_load"):
+            cached_data = self.search_cache.get(cache_key)
+
+        if cached_data and cached_data["hash"] == dir_hash:
+            logger.info("Using cached results")
+            yield {"type": "results", "results": cached_data["results"]}
+            yield {
+                "type": "complete",
+                "results": cached_data["results"],
+                "total_processed": cached_data["total_processed"],
+                "total_skipped": cached_data["total_skipped"],
+                "skipped_files": cached_data["skipped_files"],
+                "total_results": len(cached_data["results"]),
+                "from_cache": True,
+            }
+            return
+
+        # Get all XLS files
+        xls_files = manifest.paths()
+        if not xls_files:
+            yield {"error": "No spreadsheet files found in folder"}
+            return
+
+        # Check for previously skipped files in this folder, then filter
+        # them out of the processing list
+        skipped_files = self._skipped_entries(xls_files, skip_list)
+        xls_files = [f for f in xls_files if f not in skip_list]
+        total_files = len(xls_files)
+
+        # Reuse per-file results from the previous run of this query and only
+        # rescan files that were added or changed since then. Files that
+        # disappeared are dropped simply by not being listed anymore.
+        cached_files = (cached_data or {}).get("files", {})
+        fingerprints = {
+            file_path: manifest.get(file_path).fingerprint for file_path in xls_files
+        }
+        file_results: Dict[str, List[Dict[str, Any]]] = {}
+        for file_path in xls_files:
+            cached_file = cached_files.get(file_path)
+            if cached_file and cached_file["fingerprint"] == fingerprints[file_path]:
+                file_results[file_path] = cached_file["results"]
+        scan_files = [f for f in xls_files if f not in file_results]
+        if file_results:
+            logger.info(
+                f"Reusing cached results for {len(file_results)} files, "
+                f"rescanning {len(scan_files)}"
+            )
+        total_results = sum(len(results) for results in file_results.values())
+        processed = len(file_results)
+
+        # If there are previously skipped files, send initial skipped files update
+        if skipped_files:
+            yield {
+                "type": "progress",
+                "current_file": "Starting search...",
+                "processed": 0,
+                "total": total_files,
+                "skipped_files": len(skipped_files),
+                "results_found": 0,
+            }
+
+        # Reused results go out before any file is scanned
+        for file_path in xls_files:
+            if file_results.get(file_path):
+                yield {
+                    "type": "results",
+                    "file": file_path,
+                    "results": file_results[file_path],
+                }
+
+        def ordered_results():
+            # Keep results in folder order regardless of completion order
+            return [
+                result
+                for file_path in xls_files
+                for result in file_results.get(file_path, [])
+            ]
+
+        def cancelled_event():
+            logger.info("Search cancelled")
+            # Send partial results if any were found
+            return {
+                "type": "cancelled",
+                "results": ordered_results(),
+                "total_processed": processed,
+                "total_skipped": len(skipped_files),
+                "skipped_files": skipped_files,
+                "total_results": total_results,
+                "partial": True,
+            }
+
+        # Use search parameters from NLP processing
+        query_text = search_params["search_text"]
+        query_mode = search_params["search_mode"]
+
+        if use_index:
+            # Bring the index up to date so only new or changed workbooks are
+            # opened, then answer the query from postings.
+            stale, file_tasks = self._index_tasks(
+                folder_path,
+                xls_files,
+                scan_files,
+                fingerprints,
+                executor_mode,
+                cancel_event,
+                search_metrics,
+                profiler,
+            )
+            processed = total_files - len(stale)
+        else:
+            # Submit every file up front and drain completions as they finish
+            # so the scan uses all workers, not one file at a time.
+            file_tasks = self.scan_executor.map_files(
+                executor_mode,
+                _profiled(self._scan_task(scan_workbook), profiler),
+                scan_files,
+                query_text,
+                query_mode,
+                cancel_event=cancel_event,
+            )
+
+        failed_files = set()
+        for file_path, result in _timed_tasks(file_tasks, search_metrics, profiler):
+            processed += 1
+            if "matches" in result:
+                # Workers only return compact records; the result dicts are
+                # built here in the parent.
+                new_results = self.build_results(
+                    file_path, result["matches"], search_params, search_metrics
+                )
+                file_results[file_path] = new_results
+                total_results += len(new_results)
+                yield {"type": "results", "file": file_path, "results": new_results}
+            elif result.get("skipped"):
+                failed_files.add(file_path)
+                skipped_files.append(self._record_failure(file_path, result))
+
+            # Send progress update
+            yield {
+                "type": "progress",
+                "current_file": os.path.basename(file_path),
+                "processed": processed,
+                "total": total_files,
+                "skipped_files": len(skipped_files),
+                "results_found": total_results,
+            }
+
+            # Check for cancellation after progress update
+            if cancel_event.is_set():
+                yield cancelled_event()
+                return
+
+        # Check for cancellation while waiting on the workers
+        if cancel_event.is_set():
+            yield cancelled_event()
+            return
+
+        if use_index:
+            indexed_files = [f for f in scan_files if f not in failed_files]
+            with search_metrics.phase("index_search"):
+                index_matches = self.cell_index.search(
+                    indexed_files, query_text, query_mode
+                )
+            for file_path in indexed_files:
+                if file_path in index_matches:
+                    new_results = self.build_results(
+                        file_path,
+                        index_matches[file_path],
+                        search_params,
+                        search_metrics,
+                    )
+                    file_results[file_path] = new_results
+                    total_results += len(new_results)
+                    yield {
+                        "type": "results",
+                        "file": file_path,
+                        "results": new_results,
+                    }
+
+        all_results = ordered_results()
+
+        # Store results in cache, together with the per-file results so the
+        # next run only has to rescan what changed
+        with search_metrics.phase("cache_store"):
+            self.search_cache.set(
+                cache_key,
+                {
+                    "hash": dir_hash,
+                    "timestamp": datetime.now().isoformat(),
+                    "files": {
+                        file_path: {
+                            "fingerprint": fingerprints[file_path],
+                            "results": results,
+                        }
+                        for file_path, results in file_results.items()
+                        if file_path in fingerprints
+                    },
+                    "results": all_results,
+                    "total_processed": processed,
+                    "total_skipped": len(skipped_files),
+                    "skipped_files": skipped_files,
+                },
+            )
+
+        logger.info(f"Search completed: {total_results} results from {processed} files")
+        yield {
+            "type": "complete",
+            "results": all_results,
+            "total_processed": processed,
+            "total_skipped": len(skipped_files),
+            "skipped_files": skipped_files,
+            "total_results": total_results,
+            "from_cache": False,
+        }
+
+    def search_batch(
+        self,
+        folder_path: str,
+        queries: Sequence[Dict[str, Any]],
+        executor_mode: Optional[str] = None,
+        use_index: bool = False,
+        cancel_event: Optional[threading.Event] = None,
+        profiler: Optional[SearchProfiler] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Run several queries over one folder, parsing each workbook once.
+
+        Args:
+            folder_path: Folder to search, including subfolders
+            queries: Dicts with "id", "text" and optionally "mode" ("exact",
+                "any" or "all") and "filters"; without a mode, the one the
+                query processor infers is used, or "exact". Filters are
+                merged over the ones the query processor derives
+            executor_mode: Worker pool to scan with, "thread" or "process"
+            use_index: Answer the queries from the cell index, only parsing
+                new or changed workbooks
+            cancel_event: Set to stop the batch after the current file
+            profiler: Optional profiler, started by the caller; the scan
+                workers of this batch are profiled into it as well
+
+        Yields:
+            Events like search_folder, except that "results" events carry
+            the "query_id" they belong to and the final "complete" (or
+            "cancelled") event lists per-query totals under "queries"
+            instead of repeating every row
+        """
+        search_metrics = SearchMetrics()
+        yield from self._instrument(
+            "batch",
+            search_metrics,
+            self._search_batch(
+                search_metrics,
+                folder_path,
+                queries,
+                executor_mode,
+                use_index,
+                cancel_event,
+                profiler,
+            ),
+        )
+
+    def _search_batch(
+        self,
+        search_metrics: SearchMetrics,
+        folder_path: str,
+        queries: Sequence[Dict[str, Any]],
+        executor_mode: Optional[str],
+        use_index: bool,
+        cancel_event: Optional[threading.Event],
+        profiler: Optional[SearchProfiler],
+    ) -> Iterator[Dict[str, Any]]:
+        executor_mode = executor_mode or self.default_executor
+        cancel_event = cancel_event or threading.Event()
+
+        if not os.path.exists(folder_path):
+            yield {"error": "Folder not found"}
+            return
+
+        batch = []
+        for query in queries:
+            with search_metrics.phase("parse_query"):
+                params = self.process_query(query["text"], query.get("mode"))
+            mode = params["search_mode"]
+            if query.get("filters"):
+                params["filters"] = {**params.get("filters", {}), **query["filters"]}
+            batch.append(
+                {
+                    "id": query["id"],
+                    "text": query["text"],
+                    "mode": mode,
+                    "params": params,
+                    "total_results": 0,
+                }
+            )
+        kernel_queries = [(q["params"]["search_text"], q["mode"]) for q in batch]
+
+        skip_list = self.skip_list.snapshot()
+        with search_metrics.phase("walk"):
+            manifest = self.find_excel_files(folder_path)
+        xls_files = manifest.paths()
+        if not xls_files:
+            yield {"error": "No spreadsheet files found in folder"}
+            return
+        skipped_files = self._skipped_entries(xls_files, skip_list)
+        xls_files = [f for f in xls_files if f not in skip_list]
+        total_files = len(xls_files)
+        processed = 0
+
+        def results_events(file_path, matches_per_query):
+            for query, matches in zip(batch, matches_per_query):
+                if not matches:
+                    continue
+                results = self.build_results(
+                    file_path, matches, query["params"], search_metrics
+                )
+                if results:
+                    query["total_results"] += len(results)
+                    yield {
+                        "type": "results",
+                        "query_id": query["id"],
+                        "file": file_path,
+                        "results": results,
+                    }
+
+        def summary(event_type):
+            return {
+                "type": event_type,
+                "queries": [
+                    {
+                        "id": q["id"],
+                        "text": q["text"],
+                        "mode": q["mode"],
+                        "total_results": q["total_results"],
+                    }
+                    for q in batch
+                ],
+                "total_processed": processed,
+                "total_skipped": len(skipped_files),
+                "skipped_files": skipped_files,
+                "total_results": sum(q["total_results"] for q in batch),
+            }
+
+        if use_index:
+            fingerprints = {path: manifest.get(path).fingerprint for path in xls_files}
+            stale, file_tasks = self._index_tasks(
+                folder_path,
+                xls_files,
+                xls_files,
+                fingerprints,
+                executor_mode,
+                cancel_event,
+                search_metrics,
+                profiler,
+            )
+            processed = total_files - len(stale)
+        else:
+            file_tasks = self.scan_executor.map_files(
+                executor_mode,
+                _profiled(self._scan_task(scan_workbook_multi), profiler),
+                xls_files,
+                kernel_queries,
+                cancel_event=cancel_event,
+            )
+
+        failed_files = set()
+        for file_path, result in _timed_tasks(file_tasks, search_metrics, profiler):
+            processed += 1
+            if "matches" in result:
+                yield from results_events(file_path, result["matches"])
+            elif result.get("skipped"):
+                failed_files.add(file_path)
+                skipped_files.append(self._record_failure(file_path, result))
+
+            yield {
+                "type": "progress",
+                "current_file": os.path.basename(file_path),
+                "processed": processed,
+                "total": total_files,
+                "skipped_files": len(skipped_files),
+                "results_found": sum(q["total_results"] for q in batch),
+            }
+            if cancel_event.is_set():
+                yield dict(summary("cancelled"), partial=True)
+                return
+
+        if cancel_event.is_set():
+            yield dict(summary("cancelled"), partial=True)
+            return
+
+        if use_index:
+            indexed_files = [f for f in xls_files if f not in failed_files]
+            with search_metrics.phase("index_search"):
+                per_query = [
+                    self.cell_index.search(indexed_files, text, mode)
+                    for text, mode in kernel_queries
+                ]
+            for file_path in indexed_files:
+                yield from results_events(
+                    file_path, [matches.get(file_path) for matches in per_query]
+                )
+
+        yield summary("complete")
+
+
+def _phase(search_metrics: Optional[SearchMetrics], name: str):
+    """Time a block if the caller is collecting metrics."""
+    return search_metrics.phase(name) if search_metrics else nullcontext()
+
+
+def _profiled(task, profiler: Optional[SearchProfiler]):
+    """Wrap a scan task so it is profiled in the worker, if profiling."""
+    return profiler.wrap(task) if profiler else task
+
+
+def _timed_tasks(
+    file_tasks,
+    search_metrics: SearchMetrics,
+    profiler: Optional[SearchProfiler] = None,
+):
+    """
+    Iterate worker results, timing only the waits for workers.
+
+    Time the caller spends on each result, e.g. sending it to a client, is
+    not counted. Per-file statistics and profiles from the workers are added
+    as well.
+    """
+    file_tasks = iter(file_tasks)
+    while True:
+        with search_metrics.phase("scan"):
+            item = next(file_tasks, None)
+        if item is None:
+            return
+        search_metrics.add_file(item[1].get("stats"))
+        if profiler:
+            profiler.add(item[1].pop("profile", None))
+        yield item
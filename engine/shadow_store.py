@@ -0,0 +1,296 @@
+"""
+On-disk store of extracted workbook cells ("shadow copies").
+
+Each workbook that has been scanned once is saved next to its fingerprint
+in the workbook cache's compact layout: per sheet its name, arrays of cell
+offsets, rows, columns and types, the cells' text as one UTF-8 buffer and
+a pre-lowercased copy of it. Later scans memory-map the file and search the
+lower-cased buffer in place, so the workbook is parsed once until its size
+or mtime changes, after which the next scan writes a fresh copy.
+
+File layout, all numbers in native byte order:
+
+    header   magic, byte order, file size, file mtime, sheet count
+    sheet    index, flags, name length, cells, text bytes, lowered bytes,
+             name, then padded to 8 bytes: text offsets, lowered offsets
+             (unless flagged as shared), rows, columns (uint32 each) and
+             types (uint8), the text and the lowered text (unless it is the
+             same as the text), padded to 8 bytes
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from .workbook_cache import BufferedSheet, CompactSheet, CompactWorkbook
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Largest workbook text recorded for the store; the record is held in memory
+# until the scan that builds it ends
+MAX_ENTRY_BYTES = 64 * 1024 * 1024
+
+_MAGIC = b"XLSHADW1"
+_HEADER = struct.Struct("=8sBqdI")
+_SHEET = struct.Struct("=IIIQQQ")
+_LOWERED_IS_TEXT = 1
+_SUFFIX = ".shadow"
+
+
+def _pad(length: int) -> int:
+    return -length % 8
+
+
+def _encode(text: str) -> bytes:
+    # xlrd can return lone surrogates from damaged strings
+    return text.encode("utf-8", "surrogatepass")
+
+
+def _byte_offsets(text: str, offsets: array) -> Tuple[bytes, array]:
+    """Encode text and turn its character offsets into byte offsets."""
+    if text.isascii():
+        return text.encode("ascii"), offsets
+    parts = [
+        _encode(text[offsets[i] : offsets[i + 1]]) for i in range(len(offsets) - 1)
+    ]
+    byte_offsets = array("I", [0])
+    for part in parts:
+        byte_offsets.append(byte_offsets[-1] + len(part))
+    return b"".join(parts), byte_offsets
+
+
+class MappedSheet(BufferedSheet):
+    """A sheet of a shadow copy, searched in the memory-mapped file."""
+
+    def __init__(self, contents: mmap.mmap, pos: int):
+        start = pos
+        (
+            self.index,
+            flags,
+            name_length,
+            cells,
+            text_length,
+            lowered_length,
+        ) = _SHEET.unpack_from(contents, pos)
+        pos += _SHEET.size
+        self.name = contents[pos : pos + name_length].decode("utf-8", "surrogatepass")
+        pos += name_length
+        pos += _pad(pos)
+
+        def read(typecode: str, count: int) -> array:
+            nonlocal pos
+            values = array(typecode)
+            values.frombytes(contents[pos : pos + values.itemsize * count])
+            pos += values.itemsize * count
+            return values
+
+        self.offsets = read("I", cells + 1)
+        shared = flags & _LOWERED_IS_TEXT
+        self.lowered_offsets = self.offsets if shared else read("I", cells + 1)
+        self.rows = read("I", cells)
+        self.cols = read("I", cells)
+        self.types = read("B", cells)
+        self.contents = contents
+        self.text_start = pos
+        self.lowered_start = pos if shared else pos + text_length
+        pos += text_length + (0 if shared else lowered_length)
+        self.end = pos + _pad(pos)
+        if self.end > len(contents):
+            raise ValueError("truncated sheet")
+        self.nbytes = self.end - start
+
+    def value(self, cell: int) -> str:
+        start = self.text_start
+        return self.contents[
+            start + self.offsets[cell] : start + self.offsets[cell + 1]
+        ].decode("utf-8", "surrogatepass")
+
+    def lowered_value(self, cell: int) -> str:
+        start = self.lowered_start
+        offsets = self.lowered_offsets
+        return self.contents[start + offsets[cell] : start + offsets[cell + 1]].decode(
+            "utf-8", "surrogatepass"
+        )
+
+    def _lowered_buffer(self) -> Tuple[Any, int, Callable[[str], Any]]:
+        return self.contents, self.lowered_start, _encode
+
+
+class ShadowStore:
+    """
+    Folder of shadow copies, one file per workbook path.
+
+    Copies are written to a temporary file and renamed into place, so
+    concurrent workers never see a partial one. Safe to use from several
+    threads and processes at once.
+
+    Args:
+        directory: Folder the copies are kept in
+        max_bytes: Size the folder is pruned to by prune(), least recently
+            used copies first; None keeps everything
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = MAX_ENTRY_BYTES
+        self._lock = threading.Lock()
+
+    def path_for(self, file_path: str) -> str:
+        digest = hashlib.sha1(
+            os.path.abspath(file_path).encode("utf-8", "surrogatepass")
+        )
+        return os.path.join(self.directory, digest.hexdigest() + _SUFFIX)
+
+    @contextmanager
+    def open(
+        self, file_path: str, fingerprint: Tuple[int, float]
+    ) -> Iterator[Optional[CompactWorkbook]]:
+        """
+        Map the shadow copy of a workbook, as a context manager.
+
+        Yields a CompactWorkbook of MappedSheets, or None if there is no
+        copy or it was made from a different version of the file. The
+        workbook can only be used inside the with block.
+        """
+        path = self.path_for(file_path)
+        try:
+            with open(path, "rb") as f:
+                contents = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Missing, or empty and so not mappable
+            contents = None
+        if contents is None:
+            yield None
+            return
+        try:
+            workbook = self._read(contents, fingerprint)
+            if workbook is not None:
+                # Keep recently used copies when pruning
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+            yield workbook
+        finally:
+            contents.close()
+
+    @staticmethod
+    def _read(
+        contents: mmap.mmap, fingerprint: Tuple[int, float]
+    ) -> Optional[CompactWorkbook]:
+        try:
+            magic, byte_order, size, mtime, sheet_count = _HEADER.unpack_from(contents)
+            if (
+                magic != _MAGIC
+                or byte_order != (sys.byteorder == "little")
+                or (size, mtime) != tuple(fingerprint)
+            ):
+                return None
+            sheets: List[MappedSheet] = []
+            pos = _HEADER.size + _pad(_HEADER.size)
+            for _ in range(sheet_count):
+                sheet = MappedSheet(contents, pos)
+                sheets.append(sheet)
+                pos = sheet.end
+        except (struct.error, ValueError, UnicodeDecodeError) as e:
+            logger.warning(f"Ignoring damaged shadow copy: {str(e)}")
+            return None
+        return CompactWorkbook(sheets, len(contents))
+
+    def write(
+        self, file_path: str, fingerprint: Tuple[int, float], workbook: CompactWorkbook
+    ):
+        """Save the shadow copy of a workbook, replacing an older one."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                header = _HEADER.pack(
+                    _MAGIC,
+                    sys.byteorder == "little",
+                    fingerprint[0],
+                    fingerprint[1],
+                    len(workbook.sheets),
+                )
+                f.write(header + bytes(_pad(len(header))))
+                for sheet in workbook.sheets:
+                    self._write_sheet(f, sheet)
+            os.replace(temp_path, self.path_for(file_path))
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _write_sheet(f, sheet: CompactSheet):
+        text, offsets = _byte_offsets(sheet.text, sheet.offsets)
+        shared = sheet.lowered is sheet.text
+        if shared:
+            lowered, lowered_offsets = b"", offsets
+        else:
+            lowered, lowered_offsets = _byte_offsets(
+                sheet.lowered, sheet.lowered_offsets
+            )
+        name = _encode(sheet.name)
+        head = _SHEET.pack(
+            sheet.index,
+            _LOWERED_IS_TEXT if shared else 0,
+            len(name),
+            len(sheet),
+            len(text),
+            len(lowered),
+        )
+        parts = [head, name, bytes(_pad(len(head) + len(name))), offsets.tobytes()]
+        if not shared:
+            parts.append(lowered_offsets.tobytes())
+        parts += [
+            sheet.rows.tobytes(),
+            sheet.cols.tobytes(),
+            sheet.types.tobytes(),
+            text,
+            lowered,
+        ]
+        length = sum(len(part) for part in parts)
+        parts.append(bytes(_pad(length)))
+        f.write(b"".join(parts))
+
+    def prune(self) -> int:
+        """
+        Delete the least recently used copies until max_bytes is met.
+
+        Returns:
+            Bytes of the copies left in the folder
+        """
+        with self._lock:
+            try:
+                entries = [
+                    (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                    for entry in os.scandir(self.directory)
+                    if entry.name.endswith(_SUFFIX)
+                ]
+            except OSError:
+                return 0
+            total = sum(size for _, size, _ in entries)
+            if self.max_bytes is None:
+                return total
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError as e:
+                    logger.warning(f"Could not remove shadow copy {path}: {str(e)}")
+            return total
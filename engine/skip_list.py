@@ -0,0 +1,243 @@
+"""Skip list of unreadable workbooks, kept in memory and journaled to disk."""
+
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Never compact before the journal holds this many records
+COMPACT_MIN_RECORDS = 500
+
+
+def describe_file(file_path: str, reason: str) -> Dict[str, Any]:
+    """Build the skip list entry stored for a file."""
+    exists = os.path.exists(file_path)
+    return {
+        "reason": str(reason),
+        "timestamp": datetime.now().isoformat(),
+        "file_exists": exists,
+        "file_size": os.path.getsize(file_path) if exists else None,
+        "is_readable": os.access(file_path, os.R_OK) if exists else False,
+    }
+
+
+class SkipListSnapshot:
+    """
+    Read-only view of the skip list as of one change.
+
+    A search takes one snapshot and uses it throughout, so its membership
+    checks and cache validation agree even if files are skipped meanwhile.
+    Paths are the absolute paths the store was given; callers that already
+    hold absolute paths can test membership directly.
+    """
+
+    def __init__(self, entries: Mapping[str, Dict[str, Any]]):
+        self.entries = entries
+
+    def get(self, abs_path: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(abs_path)
+
+    def items(self):
+        return self.entries.items()
+
+    def __contains__(self, abs_path: str) -> bool:
+        return abs_path in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class SkipListStore:
+    """
+    In-memory skip list backed by a JSON snapshot and an append-only journal.
+
+    Every change is appended to the journal as one JSON line instead of
+    rewriting the whole snapshot. The journal is folded back into the
+    snapshot once it holds more records than the skip list has entries, so
+    the cost of a compaction is spread over at least as many changes.
+
+    Snapshots are built lazily and reused until the next change, so a
+    search does not copy the skip list unless it changed.
+
+    The store is safe to share between threads. The web app and the command
+    line each keep their own store on the same files, so journal appends and
+    compactions also take an exclusive lock on a sibling lock file, and a
+    compaction re-reads the snapshot and journal under that lock instead of
+    writing out only the changes this process made.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._journal_records = 0
+        self._lock = threading.RLock()
+        self._snapshot: Optional[SkipListSnapshot] = None
+        self._load()
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold an exclusive lock shared with other processes using the store."""
+        if fcntl is None:
+            yield
+            return
+        try:
+            lock_file = open(self.lock_path, "a")
+        except OSError as e:
+            logger.error(f"Error opening skip list lock file: {e}")
+            yield
+            return
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        """Read the skip list from disk and fold the journal into the snapshot."""
+        with self._lock, self._file_lock():
+            self._read()
+        if self._journal_records:
+            self.compact()
+
+    def _read(self):
+        """Read the snapshot, then replay the journal on top of it.
+
+        The caller holds both locks.
+        """
+        self._entries = {}
+        self._journal_records = 0
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                # Handle both old format (list of strings) and new format (dict)
+                if isinstance(data, list):
+                    data = {path: "Unknown reason" for path in data}
+                for path, info in data.items():
+                    if isinstance(info, str):
+                        # Convert old format to new format
+                        info = describe_file(path, info)
+                    self._entries[str(path)] = info
+        except (OSError, ValueError) as e:
+            logger.error(f"Skip list file is corrupted, starting empty: {e}")
+            self._entries = {}
+
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash can leave a partly written last line
+                        logger.warning("Ignoring truncated skip list journal record")
+                        continue
+                    self._apply(record)
+                    self._journal_records += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Error reading skip list journal: {e}")
+
+    def _apply(self, record: Dict[str, Any]):
+        op = record.get("op")
+        if op == "add":
+            self._entries[record["path"]] = record["info"]
+        elif op == "remove":
+            self._entries.pop(record["path"], None)
+        elif op == "clear":
+            self._entries.clear()
+
+    def _append(self, record: Dict[str, Any]):
+        """Journal one change; the caller holds the lock."""
+        self._snapshot = None
+        try:
+            with self._file_lock(), open(self.journal_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            self._journal_records += 1
+        except OSError as e:
+            logger.error(f"Error writing skip list journal: {e}")
+            return
+        if self._journal_records >= max(COMPACT_MIN_RECORDS, len(self._entries)):
+            self.compact()
+
+    def compact(self):
+        """Write the full skip list to the snapshot and empty the journal.
+
+        The skip list is read back from disk first, so entries that another
+        process journaled since this one loaded are kept, and picked up here.
+        """
+        with self._lock, self._file_lock():
+            entries = self._entries
+            self._read()
+            if self._entries != entries:
+                self._snapshot = None
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(self._entries, f, indent=2)
+                os.replace(tmp_path, self.path)
+                with open(self.journal_path, "w"):
+                    pass
+                self._journal_records = 0
+            except OSError as e:
+                logger.error(f"Error saving skip list: {e}")
+
+    def add(self, file_path: str, reason: str = "Unknown error"):
+        """Add a file to the skip list with a reason."""
+        abs_path = str(os.path.abspath(file_path))
+        info = describe_file(abs_path, reason)
+        with self._lock:
+            self._entries[abs_path] = info
+            self._append({"op": "add", "path": abs_path, "info": info})
+
+    def remove(self, file_path: str) -> bool:
+        """Remove a file from the skip list; returns False if it was not listed."""
+        abs_path = str(os.path.abspath(file_path))
+        with self._lock:
+            if self._entries.pop(abs_path, None) is None:
+                return False
+            self._append({"op": "remove", "path": abs_path})
+            return True
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._append({"op": "clear"})
+            self.compact()
+
+    def get(self, abs_path: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(abs_path)
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """Return a copy of the skip list keyed by absolute path."""
+        with self._lock:
+            return dict(self._entries)
+
+    def snapshot(self) -> SkipListSnapshot:
+        """Return the current snapshot; it is only rebuilt after a change."""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = SkipListSnapshot(MappingProxyType(dict(self._entries)))
+            return self._snapshot
+
+    def __contains__(self, abs_path: str) -> bool:
+        return abs_path in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,54 @@
+"""Test module for the search result cache store."""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from engine.cache_store import SearchCacheStore
+
+
+class TestSearchCacheStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "cache.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        """Test storing and loading an entry."""
+        store = SearchCacheStore(self.db_path, 1024 * 1024, 60)
+        store.set("a", {"hash": "x", "results": [{"value": "Travel"}]})
+        self.assertEqual(store.get("a")["results"][0]["value"], "Travel")
+        self.assertIsNone(store.get("missing"))
+
+    def test_expiry(self):
+        """Test that entries older than max_age are not returned."""
+        store = SearchCacheStore(self.db_path, 1024 * 1024, 0.05)
+        store.set("a", {"results": []})
+        time.sleep(0.1)
+        self.assertIsNone(store.get("a"))
+        self.assertEqual(store.stats()["entries"], 0)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        payload = {"results": ["x" * 400]}
+        store = SearchCacheStore(self.db_path, 1200, 60)
+        store.set("a", payload)
+        time.sleep(0.01)
+        store.set("b", payload)
+        time.sleep(0.01)
+        store.get("a")  # "b" is now the least recently used entry
+        time.sleep(0.01)
+        store.set("c", payload)
+
+        self.assertIsNotNone(store.get("a"))
+        self.assertIsNone(store.get("b"))
+        self.assertIsNotNone(store.get("c"))
+        self.assertLessEqual(store.stats()["bytes"], 1200)
+
+
+if __name__ == "__main__":
+    unittest.main()
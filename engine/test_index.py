@@ -0,0 +1,84 @@
+"""Test module for the persistent cell index."""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from engine.index import CellIndex
+
+
+class TestCellIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index = CellIndex(os.path.join(self.tmp_dir, "index.db"))
+        self.file_path = os.path.join(self.tmp_dir, "budget.xls")
+        with open(self.file_path, "wb") as f:
+            f.write(b"placeholder")
+        self.index.store(
+            self.file_path,
+            (11, 1.0),
+            [
+                (0, "Expenses", 0, 0, "Travel Expenses"),
+                (0, "Expenses", 1, 0, "Office budget"),
+                (0, "Expenses", 1, 1, "1250.0"),
+                (1, "Notes", 0, 2, "travel budget approved"),
+            ],
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def search(self, text, mode):
+        return self.index.search([self.file_path], text, mode).get(self.file_path, [])
+
+    def test_exact_substring(self):
+        """Test that exact mode keeps substring semantics."""
+        self.assertEqual(
+            self.search("udge", "exact"),
+            [
+                ("Expenses", 1, 0, "Office budget"),
+                ("Notes", 0, 2, "travel budget approved"),
+            ],
+        )
+        self.assertEqual(
+            self.search("travel exp", "exact"), [("Expenses", 0, 0, "Travel Expenses")]
+        )
+
+    def test_any_and_all(self):
+        """Test keyword modes."""
+        self.assertEqual(len(self.search("office 1250", "any")), 2)
+        self.assertEqual(
+            self.search("travel budget", "all"),
+            [("Notes", 0, 2, "travel budget approved")],
+        )
+
+    def test_stale_and_prune(self):
+        """Test change detection and removal of deleted files."""
+        self.assertIn(self.file_path, self.index.stale_files([self.file_path]))
+        self.index.store(self.file_path, (11, os.path.getmtime(self.file_path)), [])
+        self.assertEqual(self.index.stale_files([self.file_path]), {})
+
+        self.index.prune(self.tmp_dir, [])
+        self.assertIn(self.file_path, self.index.stale_files([self.file_path]))
+
+    def test_other_files_ignored(self):
+        """Test that other indexed files neither match nor keep stale terms."""
+        other = os.path.join(self.tmp_dir, "other.xls")
+        self.index.store(other, (5, 1.0), [(0, "Sheet1", 0, 0, "Zeppelin budget")])
+        self.assertEqual(self.search("zeppelin", "exact"), [])
+        self.assertEqual(len(self.search("budget", "exact")), 2)
+
+        self.index.store(other, (6, 2.0), [(0, "Sheet1", 0, 0, "Airship budget")])
+        self.assertEqual(self.index.search([other], "zeppelin", "exact"), {})
+        self.index.remove([other])
+        with sqlite3.connect(self.index.db_path) as conn:
+            terms = {term for (term,) in conn.execute("SELECT term FROM terms")}
+        self.assertEqual(
+            terms, {"travel", "expenses", "office", "budget", "1250.0", "approved"}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
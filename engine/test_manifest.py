@@ -0,0 +1,128 @@
+"""Test module for the directory crawler."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from engine import manifest as manifest_module
+from engine.manifest import ManifestStore, crawl
+
+
+class TestCrawl(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        for rel_path in ("a.xls", "B.XLS", "notes.txt", "sub/c.xls", "sub/deep/d.xls"):
+            path = os.path.join(self.tmp_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(b"x" * len(rel_path))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_matches_os_walk(self):
+        """Test that the crawl finds the same files as os.walk, sorted."""
+        expected = sorted(
+            os.path.join(root, name)
+            for root, _, files in os.walk(self.tmp_dir)
+            for name in files
+        )
+        self.assertEqual(crawl(self.tmp_dir, max_workers=2).paths(), expected)
+
+    def test_suffixes_and_stats(self):
+        """Test suffix filtering and the recorded stat fields."""
+        manifest = crawl(self.tmp_dir, (".xls",))
+        self.assertEqual(
+            [os.path.relpath(p, self.tmp_dir) for p in manifest.paths()],
+            ["B.XLS", "a.xls", "sub/c.xls", "sub/deep/d.xls"],
+        )
+        path = os.path.join(self.tmp_dir, "sub", "c.xls")
+        stats = os.stat(path)
+        entry = manifest.get(path)
+        self.assertEqual(entry.fingerprint, (stats.st_size, stats.st_mtime))
+        self.assertEqual(entry.inode, stats.st_ino)
+
+    def test_missing_folder(self):
+        """Test that a missing folder gives an empty manifest."""
+        self.assertEqual(len(crawl(os.path.join(self.tmp_dir, "missing"))), 0)
+
+
+class TestManifestStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmp_dir, "archive")
+        for rel_path in ("a.xls", "sub/b.xls", "sub/deep/c.xls"):
+            self.write(rel_path, b"x")
+        self.age_dirs()
+        self.db_path = os.path.join(self.tmp_dir, "manifest.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, rel_path, data):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def age_dirs(self):
+        """Backdate directory mtimes so their listings are trusted."""
+        for dir_path, _, _ in os.walk(self.root):
+            os.utime(dir_path, (1_000_000, 1_000_000))
+
+    def crawl_counting(self, store):
+        """Crawl through the store, returning the manifest and dirs listed."""
+        with mock.patch.object(
+            manifest_module.os, "scandir", wraps=os.scandir
+        ) as scandir:
+            result = store.crawl(self.root, (".xls",))
+        return result, scandir.call_count
+
+    def test_unchanged_dirs_are_not_listed(self):
+        """Test that a second crawl reuses every unchanged directory."""
+        store = ManifestStore(self.db_path)
+        first, listed = self.crawl_counting(store)
+        self.assertEqual(listed, 3)
+        second, listed = self.crawl_counting(store)
+        self.assertEqual(listed, 0)
+        self.assertEqual(second.paths(), first.paths())
+
+    def test_changed_subtree_is_listed(self):
+        """Test that only the directory that gained a file is listed again."""
+        store = ManifestStore(self.db_path)
+        self.crawl_counting(store)
+        new_file = self.write("sub/deep/d.xls", b"x")
+        os.utime(os.path.dirname(new_file), (2_000_000, 2_000_000))
+        result, listed = self.crawl_counting(store)
+        self.assertEqual(listed, 1)
+        self.assertIn(new_file, result)
+
+    def test_in_place_modification(self):
+        """Test that rewritten files are caught unless mtimes are trusted."""
+        store = ManifestStore(self.db_path)
+        self.crawl_counting(store)
+        path = self.write("sub/b.xls", b"longer")
+        self.age_dirs()
+        self.assertEqual(store.crawl(self.root, (".xls",)).get(path).size, 6)
+
+        trusting = ManifestStore(
+            os.path.join(self.tmp_dir, "trusting.db"), restat_files=False
+        )
+        trusting.crawl(self.root, (".xls",))
+        self.write("sub/b.xls", b"longest")
+        self.age_dirs()
+        self.assertEqual(trusting.crawl(self.root, (".xls",)).get(path).size, 6)
+
+    def test_persisted(self):
+        """Test that a new store picks up the saved manifest."""
+        self.crawl_counting(ManifestStore(self.db_path))
+        result, listed = self.crawl_counting(ManifestStore(self.db_path))
+        self.assertEqual(listed, 0)
+        self.assertEqual(len(result), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
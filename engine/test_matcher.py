@@ -0,0 +1,70 @@
+"""Test module for the compiled keyword matcher."""
+
+import random
+import unittest
+
+from engine.matcher import KeywordMatcher
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    def test_hits_overlapping_keywords(self):
+        """Test that keywords inside or overlapping other keywords are found."""
+        matcher = KeywordMatcher("ab abc bcd c xyz", "all")
+        self.assertEqual(matcher.hits("abcd"), {"ab", "abc", "bcd", "c"})
+        self.assertFalse(matcher.matches("abcd"))
+        self.assertTrue(matcher.matches("xyz abcd"))
+
+    def test_modes(self):
+        """Test exact, any and all semantics."""
+        self.assertTrue(KeywordMatcher("Office Bud", "exact").matches("office budget"))
+        self.assertFalse(
+            KeywordMatcher("budget office", "exact").matches("office budget")
+        )
+        self.assertTrue(KeywordMatcher("travel budget", "any").matches("office budget"))
+        self.assertFalse(
+            KeywordMatcher("travel budget", "all").matches("office budget")
+        )
+        self.assertTrue(KeywordMatcher("budget OFF", "all").matches("office budget"))
+        self.assertTrue(KeywordMatcher("  ", "all").matches("anything"))
+        self.assertFalse(KeywordMatcher("  ", "any").matches("anything"))
+        self.assertFalse(KeywordMatcher("budget", "fuzzy").matches("budget"))
+
+    def test_triggers(self):
+        """Test that every matching value contains one of the triggers."""
+        self.assertEqual(KeywordMatcher("Office Bud", "exact").triggers, ["office bud"])
+        self.assertEqual(
+            KeywordMatcher("travel budget", "any").triggers, ["budget", "travel"]
+        )
+        self.assertEqual(KeywordMatcher("travel budget", "all").triggers, ["budget"])
+        self.assertIsNone(KeywordMatcher("", "exact").triggers)
+        self.assertIsNone(KeywordMatcher("  ", "all").triggers)
+        self.assertEqual(KeywordMatcher("  ", "any").triggers, [])
+
+    def test_special_characters(self):
+        """Test that regex metacharacters in keywords are matched literally."""
+        matcher = KeywordMatcher("$1,250.00 (net) a+b", "any")
+        self.assertTrue(matcher.matches("total (net)"))
+        self.assertFalse(matcher.matches("total net"))
+        self.assertEqual(matcher.hits("a+b = $1,250.00"), {"a+b", "$1,250.00"})
+
+    def test_agrees_with_substring_checks(self):
+        """Test random queries against the per-keyword substring checks."""
+        rng = random.Random(7)
+        for _ in range(300):
+            keywords = {
+                "".join(rng.choice("abc") for _ in range(rng.randint(1, 4)))
+                for _ in range(rng.randint(1, 6))
+            }
+            value = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 12)))
+            for mode, check in (("any", any), ("all", all)):
+                matcher = KeywordMatcher(" ".join(keywords), mode)
+                self.assertEqual(
+                    matcher.hits(value), {k for k in keywords if k in value}
+                )
+                self.assertEqual(
+                    matcher.matches(value), check(k in value for k in keywords)
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Test module for search metrics and their Prometheus rendering."""
+
+import unittest
+
+from engine.metrics import MetricsRegistry, SearchMetrics
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def _search(self, file_seconds, cached=None):
+        metrics = SearchMetrics()
+        metrics.add_phase("walk", 0.002)
+        metrics.add_phase("walk", 0.001)
+        for seconds in file_seconds:
+            metrics.add_file(
+                {
+                    "seconds": seconds,
+                    "cells": 100,
+                    "bytes": 2048,
+                    "peak_rss": 1024,
+                    "cached": cached,
+                }
+            )
+        return metrics
+
+    def test_search_summary(self):
+        """Test that phases add up and file statistics are totalled."""
+        summary = self._search([0.02, 0.3]).as_dict()
+        self.assertEqual(summary["phases"], {"walk": 0.003})
+        self.assertEqual(summary["files_scanned"], 2)
+        self.assertEqual(summary["cells_scanned"], 200)
+        self.assertEqual(summary["bytes_read"], 4096)
+        self.assertAlmostEqual(summary["file_scan_seconds"], 0.32)
+
+    def test_render(self):
+        """Test counters and cumulative histogram buckets in the text format."""
+        registry = MetricsRegistry()
+        registry.observe_search("folder", "complete", self._search([0.02, 0.3]), False)
+        registry.observe_search("folder", "complete", self._search([]), True)
+        registry.observe_search("batch", "cancelled", self._search([0.02]))
+        registry.observe_search("batch", "complete", self._search([0.02], "shadow"))
+        registry.observe_search("batch", "complete", self._search([0.02], "memory"))
+        lines = registry.render().splitlines()
+
+        self.assertIn(
+            'excelseeker_searches_total{kind="folder",status="complete"} 2', lines
+        )
+        self.assertIn(
+            'excelseeker_searches_total{kind="batch",status="cancelled"} 1', lines
+        )
+        self.assertIn('excelseeker_search_cache_total{result="hit"} 1', lines)
+        self.assertIn("excelseeker_cells_scanned_total 500", lines)
+        self.assertIn('excelseeker_workbook_cache_total{result="hit"} 1', lines)
+        self.assertIn('excelseeker_workbook_cache_total{result="miss"} 4', lines)
+        self.assertIn("excelseeker_shadow_store_hits_total 1", lines)
+        self.assertIn("# TYPE excelseeker_file_scan_seconds histogram", lines)
+        self.assertIn('excelseeker_file_scan_seconds_bucket{le="0.01"} 0', lines)
+        self.assertIn('excelseeker_file_scan_seconds_bucket{le="0.025"} 4', lines)
+        self.assertIn('excelseeker_file_scan_seconds_bucket{le="+Inf"} 5', lines)
+        self.assertIn("excelseeker_file_scan_seconds_count 5", lines)
+        self.assertIn('excelseeker_search_phase_seconds_count{phase="walk"} 5', lines)
+
+    def test_workbook_cache_gauges(self):
+        """Test that each scanning process reports its latest cache statistics."""
+
+        def scanned(process, hits, misses, cache_bytes):
+            return {
+                "seconds": 0.01,
+                "cells": 10,
+                "bytes": 0,
+                "process": process,
+                "workbook_cache": {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": hits / (hits + misses),
+                    "entries": misses,
+                    "bytes": cache_bytes,
+                },
+            }
+
+        metrics = SearchMetrics()
+        metrics.add_file(scanned(101, 3, 1, 4096))
+        metrics.add_file(scanned(101, 1, 1, 2048))  # finished late
+        metrics.add_file(scanned(102, 0, 2, 1024))
+        registry = MetricsRegistry()
+        registry.observe_search("folder", "complete", metrics)
+        lines = registry.render().splitlines()
+
+        self.assertIn('excelseeker_workbook_cache_bytes{process="101"} 4096', lines)
+        self.assertIn('excelseeker_workbook_cache_hit_ratio{process="101"} 0.75', lines)
+        self.assertIn('excelseeker_workbook_cache_entries{process="102"} 2', lines)
+        self.assertIn('excelseeker_workbook_cache_hit_ratio{process="102"} 0', lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
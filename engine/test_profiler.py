@@ -0,0 +1,97 @@
+"""Test module for per-search profiling and the profile store."""
+
+import os
+import pstats
+import shutil
+import tempfile
+import time
+import unittest
+
+from engine.profiler import ProfileStore, SearchProfiler, profile_task
+
+
+def busy_task(file_path, seconds=0.05):
+    """Stand-in for a scan task that keeps the worker busy."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+    return {"file": file_path}
+
+
+class TestSearchProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_sample_collapsed_stacks(self):
+        """Test that request thread and worker stacks are written with counts."""
+        profiler = SearchProfiler("sample", interval=0.001)
+        profiler.start()
+        result = profiler.wrap(busy_task)("a.xls")
+        busy_task("b.xls")
+        profiler.stop()
+        profiler.add(result.pop("profile", None))
+        self.assertEqual(result, {"file": "a.xls"})
+
+        path = os.path.join(self.tmp_dir, "profile.collapsed.txt")
+        profiler.write(path)
+        with open(path) as f:
+            lines = f.read().splitlines()
+        roots = {line.split(";", 1)[0] for line in lines}
+        self.assertEqual(roots, {"request", "worker"})
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            self.assertGreater(int(count), 0)
+        self.assertTrue(any("busy_task" in line for line in lines))
+
+    def test_cprofile_pstats(self):
+        """Test that worker profiles are merged into a loadable pstats file."""
+        profiler = SearchProfiler("cprofile")
+        result = profile_task("cprofile", 0, busy_task, "a.xls", 0.01)
+        profiler.add(result.pop("profile"))
+
+        path = os.path.join(self.tmp_dir, "profile.pstats")
+        profiler.write(path)
+        functions = {name for _, _, name in pstats.Stats(path).stats}
+        self.assertIn("busy_task", functions)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            SearchProfiler("perf")
+
+
+class TestProfileStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _profile(self):
+        profiler = SearchProfiler("sample")
+        profiler.add({"request;busy_task (x.py:1)": 3})
+        return profiler
+
+    def test_save_and_find(self):
+        store = ProfileStore(self.tmp_dir)
+        path = store.save("search-1", self._profile())
+        self.assertEqual(store.find("search-1"), (path, "collapsed"))
+        self.assertIsNone(store.find("search-2"))
+        self.assertIsNone(store.find("../search-1"))
+        with self.assertRaises(ValueError):
+            store.save("../escape", self._profile())
+
+    def test_prune_keeps_newest(self):
+        store = ProfileStore(self.tmp_dir, max_count=2)
+        for number in range(3):
+            path = store.save(f"search-{number}", self._profile())
+            os.utime(path, (number, number))
+        self.assertIsNone(store.find("search-0"))
+        self.assertIsNotNone(store.find("search-1"))
+        self.assertIsNotNone(store.find("search-2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,309 @@
+"""Test module for the workbook readers."""
+
+import csv
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import xlwt
+
+from engine.matcher import compile_matcher
+from engine.readers import delimited, detect_reader, xls
+from engine.scanner import extract_cells, scan_workbook, scan_workbook_multi
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def write_xlsx(path, sheets, shared_strings=()):
+    """
+    Write a minimal .xlsx file.
+
+    sheets is a list of (name, sheetData XML) pairs; a name of None adds a
+    chart sheet, which has no cells.
+    """
+    sheet_entries = []
+    rels = [
+        f'<Relationship Id="rIdStrings" Type="{REL_NS}/sharedStrings" '
+        'Target="sharedStrings.xml"/>'
+    ]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "_rels/.rels",
+            f'<Relationships xmlns="{PKG_REL_NS}"><Relationship Id="rId1" '
+            f'Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+            "</Relationships>",
+        )
+        for number, (name, sheet_data) in enumerate(sheets, 1):
+            if name is None:
+                rel_type, target = "chartsheet", f"chartsheets/sheet{number}.xml"
+                name = f"Chart{number}"
+                archive.writestr(f"xl/{target}", f'<chartsheet xmlns="{MAIN_NS}"/>')
+            else:
+                rel_type, target = "worksheet", f"worksheets/sheet{number}.xml"
+                archive.writestr(
+                    f"xl/{target}",
+                    f'<worksheet xmlns="{MAIN_NS}"><sheetData>{sheet_data}'
+                    "</sheetData></worksheet>",
+                )
+            sheet_entries.append(
+                f'<sheet name="{name}" sheetId="{number}" r:id="rId{number}"/>'
+            )
+            rels.append(
+                f'<Relationship Id="rId{number}" Type="{REL_NS}/{rel_type}" '
+                f'Target="{target}"/>'
+            )
+        archive.writestr(
+            "xl/workbook.xml",
+            f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets>'
+            + "".join(sheet_entries)
+            + "</sheets></workbook>",
+        )
+        archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'<Relationships xmlns="{PKG_REL_NS}">'
+            + "".join(rels)
+            + "</Relationships>",
+        )
+        archive.writestr(
+            "xl/sharedStrings.xml",
+            f'<sst xmlns="{MAIN_NS}">'
+            + "".join(f"<si>{item}</si>" for item in shared_strings)
+            + "</sst>",
+        )
+
+
+class TestXlsxReader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, "budget.xlsx")
+        write_xlsx(
+            self.file_path,
+            [
+                (
+                    "Expenses",
+                    '<row r="1"><c r="A1" t="s"><v>0</v></c></row>'
+                    '<row r="2"><c r="A2" t="s"><v>1</v></c>'
+                    '<c r="B2"><v>1250</v></c></row>',
+                ),
+                (None, ""),
+                (
+                    "Notes",
+                    '<row r="1"><c r="C1" t="s"><v>2</v></c></row>'
+                    '<row r="30"><c r="AB30" t="inlineStr"><is><t>inline budget'
+                    '</t></is></c><c r="AC30" t="b"><v>1</v></c></row>',
+                ),
+            ],
+            shared_strings=[
+                "<t>Travel Expenses</t>",
+                "<t>Office budget</t>",
+                # Rich text runs are joined; phonetic hints are left out
+                "<r><t>travel </t></r><r><t>budget approved</t></r>"
+                "<rPh><t>ignored</t></rPh>",
+            ],
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_matches(self):
+        """Test shared, rich and inline strings, sparse cells and sheet order."""
+        self.assertEqual(
+            scan_workbook(self.file_path, "budget", "exact"),
+            {
+                "matches": [
+                    ("Expenses", 1, 0, "Office budget"),
+                    ("Notes", 0, 2, "travel budget approved"),
+                    ("Notes", 29, 27, "inline budget"),
+                ]
+            },
+        )
+
+    def test_same_as_xls(self):
+        """Test that an .xlsx matches like the same workbook saved as .xls."""
+        xls_path = os.path.join(self.tmp_dir, "budget.xls")
+        workbook = xlwt.Workbook()
+        expenses = workbook.add_sheet("Expenses")
+        expenses.write(0, 0, "Travel Expenses")
+        expenses.write(1, 0, "Office budget")
+        expenses.write(1, 1, 1250)
+        notes = workbook.add_sheet("Notes")
+        notes.write(0, 2, "travel budget approved")
+        notes.write(29, 27, "inline budget")
+        notes.write(29, 28, True)
+        workbook.save(xls_path)
+
+        queries = [("travel", "exact"), ("1250", "exact"), ("office 1", "any")]
+        self.assertEqual(
+            scan_workbook_multi(self.file_path, queries),
+            scan_workbook_multi(xls_path, queries),
+        )
+
+    def test_extract_cells(self):
+        result = extract_cells(self.file_path, collect_stats=True)
+        self.assertEqual(
+            result["cells"],
+            [
+                (0, "Expenses", 0, 0, "Travel Expenses"),
+                (0, "Expenses", 1, 0, "Office budget"),
+                (0, "Expenses", 1, 1, "1250.0"),
+                (1, "Notes", 0, 2, "travel budget approved"),
+                (1, "Notes", 29, 27, "inline budget"),
+                (1, "Notes", 29, 28, "1"),
+            ],
+        )
+        # Rows are counted up to their last cell
+        self.assertEqual(result["stats"]["cells"], 1 + 2 + 3 + 29)
+
+    def test_corrupt_file_skipped(self):
+        bad_path = os.path.join(self.tmp_dir, "bad.xlsx")
+        with open(bad_path, "wb") as f:
+            f.write(b"PK\x03\x04 not really a zip")
+        result = scan_workbook(bad_path, "budget")
+        self.assertTrue(result["skipped"])
+
+
+class TestDelimitedReader(unittest.TestCase):
+    ROWS = [
+        ["Name", "Note", "Amount"],
+        ["John Smith", "Travel budget", "1250"],
+        ["Jane Doe", "Office\nbudget, second line", "80"],
+        [],
+        ["Kelvin \u212aelvin", 'said ""hi""', "-5"],
+        ["Zoë", "café budget", "3"],
+        ["last", "no newline at end", "budget"],
+    ]
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, name, delimiter=",", encoding="utf-8", bom=False, rows=ROWS):
+        out = io.StringIO(newline="")
+        csv.writer(out, delimiter=delimiter, lineterminator="\r\n").writerows(rows)
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "wb") as f:
+            if bom:
+                f.write(b"\xef\xbb\xbf")
+            f.write(out.getvalue().rstrip("\r\n").encode(encoding, "replace"))
+        return path
+
+    def _expected(self, path, text, mode):
+        """Match every cell as parsed by the csv module."""
+        matcher = compile_matcher(text, mode)
+        sheet = os.path.splitext(os.path.basename(path))[0]
+        delimiter = "\t" if path.endswith(".tsv") else ","
+        with open(path, encoding="utf-8-sig", errors="replace", newline="") as f:
+            rows = list(csv.reader(f, delimiter=delimiter))
+        return [
+            (sheet, row_idx, col_idx, value)
+            for row_idx, row in enumerate(rows)
+            for col_idx, value in enumerate(row)
+            if value and matcher.matches(value.lower())
+        ]
+
+    def test_matches_full_parse(self):
+        """Test that pre-filtered matches equal those of a full parse."""
+        queries = [
+            ("budget", "exact"),
+            ("BUDGET", "exact"),
+            ("second line", "exact"),
+            ('"hi"', "exact"),
+            ("kelvin", "exact"),
+            ("café", "exact"),
+            ("john office", "any"),
+            ("budget office", "all"),
+            ("1250", "exact"),
+            ("", "exact"),
+        ]
+        for name, kwargs in [
+            ("data.csv", {}),
+            ("data.tsv", {"delimiter": "\t"}),
+            ("bom.csv", {"bom": True}),
+        ]:
+            path = self._write(name, **kwargs)
+            for chunk_size in (delimited.CHUNK_SIZE, 7):
+                with mock.patch.object(delimited, "CHUNK_SIZE", chunk_size):
+                    for text, mode in queries:
+                        with self.subTest(name=name, chunk=chunk_size, q=text):
+                            self.assertEqual(
+                                scan_workbook(path, text, mode)["matches"],
+                                self._expected(path, text, mode),
+                            )
+
+    def test_legacy_encoding(self):
+        path = self._write("latin.csv", encoding="latin-1")
+        self.assertEqual(
+            scan_workbook(path, "zoë", "exact")["matches"], [("latin", 5, 0, "Zoë")]
+        )
+
+    def test_only_candidate_rows_parsed(self):
+        """Test that rows without a keyword are skipped, not parsed."""
+        rows = self.ROWS[:4]
+        path = self._write("data.csv", rows=rows)
+        result = scan_workbook(path, "smith", "exact", collect_stats=True)
+        self.assertEqual(result["matches"], [("data", 1, 0, "John Smith")])
+        self.assertEqual(result["stats"]["cells"], 3)
+
+        cells = extract_cells(path)["cells"]
+        self.assertEqual(len(cells), sum(len(row) for row in rows))
+        self.assertIn((0, "data", 2, 1, "Office\nbudget, second line"), cells)
+
+
+class TestReaderRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_dispatch_by_signature(self):
+        """Test that mislabeled files are read by the reader for their contents."""
+        xlsx_path = os.path.join(self.tmp_dir, "report.xls")
+        write_xlsx(
+            xlsx_path,
+            [("Sheet1", '<row r="1"><c r="B1" t="s"><v>0</v></c></row>')],
+            shared_strings=["<t>Quarterly budget</t>"],
+        )
+        self.assertEqual(detect_reader(xlsx_path).name, "xlsx")
+        self.assertEqual(
+            scan_workbook(xlsx_path, "budget")["matches"],
+            [("Sheet1", 0, 1, "Quarterly budget")],
+        )
+
+        xls_path = os.path.join(self.tmp_dir, "old.csv")
+        workbook = xlwt.Workbook()
+        workbook.add_sheet("Sheet1").write(0, 0, "budget")
+        workbook.save(xls_path)
+        self.assertEqual(detect_reader(xls_path).name, "xls")
+
+    def test_unrecognized_rejected_before_parse(self):
+        """Test that files no reader recognizes never reach xlrd."""
+        for name, contents in [
+            ("binary.xls", bytes(range(256)) * 4),
+            ("text.xls", b"Name,Note\nJohn,budget\n"),
+            ("binary.csv", b"\xff\xfeN\x00a\x00m\x00e\x00"),
+            ("empty.xls", b""),
+        ]:
+            with self.subTest(name=name):
+                path = os.path.join(self.tmp_dir, name)
+                with open(path, "wb") as f:
+                    f.write(contents)
+                self.assertIsNone(detect_reader(path))
+                with mock.patch.object(xls.xlrd, "open_workbook") as open_xlrd:
+                    result = scan_workbook(path, "budget")
+                open_xlrd.assert_not_called()
+                self.assertEqual(
+                    result, {"error": "Unrecognized file format", "skipped": True}
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""Test module for the server-side result set store."""
+
+import time
+import unittest
+
+from engine.result_store import ResultStore
+
+
+def _result(filename, sheet, cell, value):
+    return {
+        "filename": filename,
+        "filepath": f"/data/{filename}",
+        "sheet": sheet,
+        "cell": cell,
+        "value": value,
+    }
+
+
+RESULTS = [
+    _result("b.xls", "Notes", "B10", "Office budget"),
+    _result("a.xls", "Expenses", "AA1", "Travel"),
+    _result("C.xls", "expenses 2024", "B2", 1250.0),
+    _result("A.xlsx", "Summary", "A3", "travel budget"),
+]
+
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.store = ResultStore(max_sets=3, max_age=60)
+        self.store.put("s1", RESULTS, {"total_processed": 3})
+
+    def _values(self, page):
+        return [r["value"] for r in page["results"]]
+
+    def test_sort(self):
+        """Test each sort key in both directions."""
+        cases = [
+            ("filename", ["Travel", "travel budget", "Office budget", 1250.0]),
+            ("sheet", ["Travel", 1250.0, "Office budget", "travel budget"]),
+            # Column-wise like Excel: A3 < B2 < B10 < AA1
+            ("cell", ["travel budget", 1250.0, "Office budget", "Travel"]),
+            ("value", [1250.0, "Office budget", "Travel", "travel budget"]),
+        ]
+        for sort_key, expected in cases:
+            with self.subTest(sort_key=sort_key):
+                page = self.store.page("s1", sort_key=sort_key)
+                self.assertEqual(self._values(page), expected)
+                page = self.store.page("s1", sort_key=sort_key, descending=True)
+                self.assertEqual(self._values(page), expected[::-1])
+        # Without a sort key the results keep their original order
+        self.assertEqual(self.store.page("s1")["results"], RESULTS)
+
+    def test_filter(self):
+        """Test case-insensitive filters on one column or all of them."""
+        cases = [
+            ("filename", "A.XLS", ["Travel", "travel budget"]),
+            ("sheet", "expenses", ["Travel", 1250.0]),
+            ("cell", "b1", ["Office budget"]),
+            ("value", "budget", ["Office budget", "travel budget"]),
+            ("value", "1250", [1250.0]),
+            ("all", "notes", ["Office budget"]),
+            ("all", "missing", []),
+        ]
+        for column, text, expected in cases:
+            with self.subTest(column=column, text=text):
+                page = self.store.page("s1", filter_text=text, filter_column=column)
+                self.assertEqual(self._values(page), expected)
+                self.assertEqual(page["total_results"], len(expected))
+                self.assertEqual(page["unfiltered_results"], len(RESULTS))
+
+        page = self.store.page(
+            "s1", sort_key="value", filter_text="budget", filter_column="value"
+        )
+        self.assertEqual(self._values(page), ["Office budget", "travel budget"])
+
+    def test_pages(self):
+        """Test page slicing and clamping of out-of-range pages."""
+        page = self.store.page("s1", page=2, page_size=3)
+        self.assertEqual(page["results"], RESULTS[3:])
+        self.assertEqual((page["page"], page["total_pages"]), (2, 2))
+        self.assertEqual(page["summary"], {"total_processed": 3})
+
+        self.assertEqual(self.store.page("s1", page=9, page_size=3)["page"], 2)
+        self.assertEqual(self.store.page("s1", page=0, page_size=3)["page"], 1)
+        empty = self.store.page("s1", filter_text="missing")
+        self.assertEqual((empty["page"], empty["total_pages"]), (1, 1))
+        self.assertEqual(empty["results"], [])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self.store.page("s1", sort_key="filepath")
+        with self.assertRaises(ValueError):
+            self.store.page("s1", filter_column="filepath")
+
+    def test_expire_by_count(self):
+        """Test that only the most recently used sets are kept."""
+        self.store.put("s2", RESULTS)
+        self.store.put("s3", RESULTS)
+        self.store.page("s1")  # "s2" is now the least recently used set
+        self.store.put("s4", RESULTS)
+        self.assertIsNone(self.store.page("s2"))
+        for search_id in ("s1", "s3", "s4"):
+            self.assertIsNotNone(self.store.page(search_id))
+
+    def test_expire_by_age(self):
+        """Test that sets expire max_age seconds after they were last read."""
+        store = ResultStore(max_sets=3, max_age=0.2)
+        store.put("old", RESULTS)
+        store.put("read", RESULTS)
+        time.sleep(0.12)
+        self.assertIsNotNone(store.page("read"))
+        time.sleep(0.12)
+        self.assertIsNone(store.page("old"))
+        self.assertIsNotNone(store.page("read"))
+
+    def test_discard(self):
+        self.assertTrue(self.store.discard("s1"))
+        self.assertFalse(self.store.discard("s1"))
+        self.assertIsNone(self.store.page("s1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
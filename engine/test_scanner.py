@@ -0,0 +1,103 @@
+"""Test module for the workbook scanning kernel."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import xlwt
+
+from engine.scanner import extract_cells, scan_workbook, scan_workbook_multi
+
+
+class TestScanWorkbook(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, "budget.xls")
+        workbook = xlwt.Workbook()
+        expenses = workbook.add_sheet("Expenses")
+        expenses.write(0, 0, "Travel Expenses")
+        expenses.write(1, 0, "Office budget")
+        expenses.write(1, 1, 1250)
+        notes = workbook.add_sheet("Notes")
+        notes.write(0, 2, "travel budget approved")
+        workbook.save(self.file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_matches(self):
+        """Test that matches come back in sheet/row/column order."""
+        self.assertEqual(
+            scan_workbook(self.file_path, "budget", "exact"),
+            {
+                "matches": [
+                    ("Expenses", 1, 0, "Office budget"),
+                    ("Notes", 0, 2, "travel budget approved"),
+                ]
+            },
+        )
+
+    def test_number_cells(self):
+        """Test that number cells are only matched by numeric queries."""
+        self.assertEqual(
+            scan_workbook(self.file_path, "1250", "exact"),
+            {"matches": [("Expenses", 1, 1, "1250.0")]},
+        )
+        self.assertEqual(
+            scan_workbook(self.file_path, "office 50.0", "any"),
+            {
+                "matches": [
+                    ("Expenses", 1, 0, "Office budget"),
+                    ("Expenses", 1, 1, "1250.0"),
+                ]
+            },
+        )
+        self.assertEqual(
+            scan_workbook(self.file_path, "budget 1250", "all"), {"matches": []}
+        )
+
+    def test_low_memory_matches_default(self):
+        """Test that on-demand sheet loading finds the same cells."""
+        for mode, text in (("exact", "travel"), ("any", "office 1250"), ("all", "")):
+            self.assertEqual(
+                scan_workbook(self.file_path, text, mode, low_memory=True),
+                scan_workbook(self.file_path, text, mode, low_memory=False),
+            )
+        self.assertEqual(
+            extract_cells(self.file_path, low_memory=True),
+            extract_cells(self.file_path, low_memory=False),
+        )
+
+    def test_multi_matches_single(self):
+        """Test that one pass over the workbook answers each query alike."""
+        queries = [
+            ("budget", "exact"),
+            ("office 1250", "any"),
+            ("travel budget", "all"),
+        ]
+        for low_memory in (True, False):
+            self.assertEqual(
+                scan_workbook_multi(self.file_path, queries, low_memory=low_memory),
+                {
+                    "matches": [
+                        scan_workbook(self.file_path, text, mode)["matches"]
+                        for text, mode in queries
+                    ]
+                },
+            )
+
+    def test_unreadable_file_is_skipped(self):
+        """Test that a corrupt workbook is reported instead of raising."""
+        with open(self.file_path, "wb") as f:
+            f.write(b"not a workbook")
+        for low_memory in (True, False):
+            result = scan_workbook(self.file_path, "budget", low_memory=low_memory)
+            self.assertTrue(result["skipped"])
+        self.assertTrue(
+            scan_workbook_multi(self.file_path, [("budget", "exact")])["skipped"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
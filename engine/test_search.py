@@ -0,0 +1,291 @@
+"""Test module for the shared folder search engine."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import xlwt
+
+from engine import (
+    CellIndex,
+    ManifestStore,
+    MetricsRegistry,
+    ScanExecutor,
+    SearchCacheStore,
+    SearchEngine,
+    ShadowStore,
+    SkipListStore,
+    WorkbookCache,
+)
+from engine import scanner
+
+
+def _crash_worker(file_path):
+    """Scan task that kills its worker process."""
+    os._exit(1)
+
+
+class TestSearchEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.folder = os.path.join(self.tmp_dir, "reports")
+        os.makedirs(os.path.join(self.folder, "2024"))
+        self._write(os.path.join(self.folder, "a.xls"), ["Travel budget", "Office"])
+        self._write(
+            os.path.join(self.folder, "2024", "b.xls"), ["office travel", "Budget"]
+        )
+        with open(os.path.join(self.folder, "broken.xls"), "wb") as f:
+            f.write(b"not a workbook")
+
+        self.executor = ScanExecutor(2)
+        self.engine = SearchEngine(
+            self.executor,
+            CellIndex(os.path.join(self.tmp_dir, "index.db")),
+            SearchCacheStore(os.path.join(self.tmp_dir, "cache.db"), 1 << 20, 3600),
+            SkipListStore(os.path.join(self.tmp_dir, "skip.json")),
+            ManifestStore(os.path.join(self.tmp_dir, "manifest.db")),
+        )
+
+    def tearDown(self):
+        self.executor.shutdown()
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, path, values):
+        workbook = xlwt.Workbook()
+        sheet = workbook.add_sheet("Sheet1")
+        for row, value in enumerate(values):
+            sheet.write(row, 0, value)
+        workbook.save(path)
+
+    def _cells(self, results):
+        return [(r["filename"], r["cell"], r["value"]) for r in results]
+
+    def test_search_folder_events(self):
+        """Test that a search reports rows per file and all of them at the end."""
+        events = list(self.engine.search_folder(self.folder, "budget"))
+        streamed = [
+            row
+            for event in events
+            if event.get("type") == "results"
+            for row in event["results"]
+        ]
+        complete = events[-1]
+        self.assertEqual(complete["type"], "complete")
+        self.assertEqual(
+            self._cells(complete["results"]),
+            [("b.xls", "A2", "Budget"), ("a.xls", "A1", "Travel budget")],
+        )
+        self.assertCountEqual(streamed, complete["results"])
+        self.assertEqual(complete["total_skipped"], 1)
+        self.assertEqual(complete["metrics"]["files_scanned"], 3)
+        self.assertGreater(complete["metrics"]["cells_scanned"], 0)
+        self.assertIn(os.path.join(self.folder, "broken.xls"), self.engine.skip_list)
+
+        # The broken file went on the skip list, which changes the folder
+        # hash; the next run reuses per-file results and the one after is
+        # answered from the cache
+        reused = list(self.engine.search_folder(self.folder, "budget"))[-1]
+        self.assertFalse(reused["from_cache"])
+        self.assertEqual(reused["results"], complete["results"])
+        cached = list(self.engine.search_folder(self.folder, "budget"))[-1]
+        self.assertTrue(cached["from_cache"])
+        self.assertEqual(cached["results"], complete["results"])
+
+        # Only the skip list entries under the folder are hashed, so the
+        # cache survives a restart and files skipped in other folders
+        self.engine.skip_list = SkipListStore(os.path.join(self.tmp_dir, "skip.json"))
+        self.engine.skip_list.add(os.path.join(self.tmp_dir, "other.xls"), "corrupt")
+        restarted = list(self.engine.search_folder(self.folder, "budget"))[-1]
+        self.assertTrue(restarted["from_cache"])
+
+    def test_rescans_changed_files_only(self):
+        """Test that only changed files are rescanned and removed ones dropped."""
+
+        def search():
+            return list(self.engine.search_folder(self.folder, "budget"))[-1]
+
+        def fresh_search():
+            self.engine.search_cache.clear()
+            return search()
+
+        search()  # the broken file goes on the skip list
+        search()
+        a_path = os.path.join(self.folder, "a.xls")
+        stats = os.stat(a_path)
+        self._write(a_path, ["Office", "Budget review", "budget"])
+        os.utime(a_path, (stats.st_atime, stats.st_mtime + 10))
+
+        changed = search()
+        self.assertFalse(changed["from_cache"])
+        self.assertEqual(changed["metrics"]["files_scanned"], 1)
+        self.assertEqual(
+            self._cells(changed["results"]),
+            [
+                ("b.xls", "A2", "Budget"),
+                ("a.xls", "A2", "Budget review"),
+                ("a.xls", "A3", "budget"),
+            ],
+        )
+
+        os.remove(os.path.join(self.folder, "2024", "b.xls"))
+        removed = search()
+        self.assertEqual(removed["metrics"]["files_scanned"], 0)
+        self.assertEqual(
+            self._cells(removed["results"]),
+            [("a.xls", "A2", "Budget review"), ("a.xls", "A3", "budget")],
+        )
+        self.assertEqual(removed["results"], fresh_search()["results"])
+
+        # The merged results match a scan of every file
+        self._write(os.path.join(self.folder, "2024", "b.xls"), ["Budget"])
+        merged = search()
+        self.assertEqual(merged["metrics"]["files_scanned"], 1)
+        self.assertEqual(merged["results"], fresh_search()["results"])
+
+    def test_process_executor(self):
+        """Test that worker processes find the same rows as worker threads."""
+        queries = [{"id": "q1", "text": "budget"}, {"id": "q2", "text": "office"}]
+        finished = {}
+        for mode in ("thread", "process"):
+            self.engine.search_cache.clear()
+            folder = list(
+                self.engine.search_folder(self.folder, "budget", executor_mode=mode)
+            )[-1]
+            self.assertFalse(folder["from_cache"])
+            batch = list(
+                self.engine.search_batch(self.folder, queries, executor_mode=mode)
+            )
+            finished[mode] = (
+                folder["results"],
+                folder["total_skipped"],
+                sorted(
+                    (event["query_id"], row["filename"], row["cell"])
+                    for event in batch
+                    if event.get("type") == "results"
+                    for row in event["results"]
+                ),
+                batch[-1]["queries"],
+            )
+        self.assertEqual(finished["process"], finished["thread"])
+        self.assertEqual(len(finished["process"][0]), 2)
+
+    def test_process_pool_failure(self):
+        """Test that a crashed worker is reported and the pool replaced."""
+        file_path = os.path.join(self.folder, "a.xls")
+        cancel_event = mock.Mock(is_set=mock.Mock(return_value=True))
+        self.assertEqual(
+            list(
+                self.executor.map_files(
+                    "process",
+                    scanner.scan_workbook,
+                    [file_path],
+                    "budget",
+                    cancel_event=cancel_event,
+                )
+            ),
+            [],
+        )
+
+        pool = self.executor.get("process")
+        [(path, result)] = self.executor.map_files(
+            "process", _crash_worker, [file_path]
+        )
+        self.assertEqual(path, file_path)
+        self.assertTrue(result["pool_error"])
+        self.assertTrue(result["skipped"])
+        self.assertIsNot(self.executor.get("process"), pool)
+        [(_, result)] = self.executor.map_files(
+            "process", scanner.scan_workbook, [file_path], "budget"
+        )
+        self.assertEqual(result["matches"], [("Sheet1", 0, 0, "Travel budget")])
+
+    def test_batch_matches_single_searches(self):
+        """Test that a batch finds what each query finds on its own."""
+        queries = [
+            {"id": "q1", "text": "budget"},
+            {"id": "q2", "text": "office travel", "mode": "all"},
+            {"id": "q3", "text": "missing", "mode": "any"},
+        ]
+        for use_index in (False, True):
+            events = list(
+                self.engine.search_batch(self.folder, queries, use_index=use_index)
+            )
+            by_query = {}
+            for event in events:
+                if event.get("type") == "results":
+                    by_query.setdefault(event["query_id"], []).extend(event["results"])
+            complete = events[-1]
+            self.assertEqual(complete["type"], "complete")
+            for query, summary in zip(queries, complete["queries"]):
+                expected = list(
+                    self.engine.search_folder(
+                        self.folder, query["text"], query.get("mode", "exact")
+                    )
+                )[-1]["results"]
+                self.assertCountEqual(by_query.get(query["id"], []), expected)
+                self.assertEqual(summary["total_results"], len(expected))
+
+    def test_mode_precedence(self):
+        """Test that folder and batch searches let a given mode win alike."""
+        processor = mock.Mock()
+        processor.process_query.side_effect = lambda text: {
+            "search_text": text,
+            "search_mode": "any",
+            "filters": {},
+        }
+        processor.apply_filters.side_effect = lambda results, filters: results
+        self.engine.query_processor = processor
+
+        for mode, expected in (("exact", 1), (None, 3), ("nlp", 3)):
+            with self.subTest(mode=mode):
+                folder = list(
+                    self.engine.search_folder(self.folder, "office travel", mode)
+                )[-1]
+                batch_query = {"id": "q", "text": "office travel", "mode": mode}
+                batch = [
+                    row
+                    for event in self.engine.search_batch(self.folder, [batch_query])
+                    if event.get("type") == "results"
+                    for row in event["results"]
+                ]
+                self.assertEqual(len(folder["results"]), expected)
+                self.assertCountEqual(batch, folder["results"])
+
+    def test_shadow_store(self):
+        """Test that workbooks parsed once are scanned from their shadow copies."""
+        self.engine.shadow_store = ShadowStore(os.path.join(self.tmp_dir, "shadow"))
+        self.engine.metrics = MetricsRegistry()
+        with mock.patch.object(scanner, "workbook_cache", WorkbookCache(0)):
+            first = list(self.engine.search_folder(self.folder, "travel"))[-1]
+            second = list(self.engine.search_folder(self.folder, "office"))[-1]
+        self.assertEqual(first["metrics"]["files_shadow"], 0)
+        self.assertEqual(second["metrics"]["files_shadow"], 2)
+        self.assertEqual(second["metrics"]["files_cached"], 0)
+        self.assertEqual(
+            self._cells(second["results"]),
+            [("b.xls", "A1", "office travel"), ("a.xls", "A2", "Office")],
+        )
+        lines = self.engine.metrics.render().splitlines()
+        self.assertIn("excelseeker_shadow_store_hits_total 2", lines)
+        self.assertIn(
+            "excelseeker_shadow_store_bytes " f"{self.engine.shadow_store.prune()}",
+            lines,
+        )
+
+    def test_missing_folder(self):
+        """Test that a missing folder yields a single error event."""
+        missing = os.path.join(self.tmp_dir, "missing")
+        self.assertEqual(
+            list(self.engine.search_folder(missing, "budget")),
+            [{"error": "Folder not found"}],
+        )
+        self.assertEqual(
+            list(self.engine.search_batch(missing, [{"id": "1", "text": "x"}])),
+            [{"error": "Folder not found"}],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
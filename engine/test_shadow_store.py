@@ -0,0 +1,132 @@
+"""Test module for the on-disk shadow copies of workbooks."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import xlwt
+
+from engine import scanner
+from engine.scanner import scan_workbook, scan_workbook_multi
+from engine.shadow_store import ShadowStore
+from engine.workbook_cache import WorkbookCache
+
+QUERIES = [
+    ("budget", "exact"),
+    ("1250", "exact"),
+    ("", "exact"),
+    ("i\u0307stanbul", "exact"),
+    ("café office", "any"),
+    ("budget approved", "all"),
+    ("nothing", "exact"),
+]
+
+
+class TestShadowStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.shadow_dir = os.path.join(self.tmp_dir, "shadow")
+        self.file_path = os.path.join(self.tmp_dir, "budget.xls")
+        self._write("Office budget")
+        # Only the store may answer repeated scans
+        patcher = mock.patch.object(scanner, "workbook_cache", WorkbookCache(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, office_note):
+        workbook = xlwt.Workbook()
+        expenses = workbook.add_sheet("Expenses")
+        expenses.write(0, 0, "Travel Expenses")
+        expenses.write(1, 0, office_note)
+        expenses.write(1, 1, 1250)
+        workbook.add_sheet("Empty")
+        notes = workbook.add_sheet("Notes café")
+        notes.write(0, 0, "İstanbul office")
+        notes.write(3, 2, "travel budget approved")
+        workbook.save(self.file_path)
+
+    def _scan(self):
+        return scan_workbook_multi(
+            self.file_path, QUERIES, collect_stats=True, shadow_dir=self.shadow_dir
+        )
+
+    def test_parsed_once(self):
+        """Test that a second scan reads the shadow copy, with the same matches."""
+        expected = scan_workbook_multi(self.file_path, QUERIES)
+        first = self._scan()
+        self.assertIsNone(first.pop("stats")["cached"])
+        self.assertEqual(first, expected)
+        self.assertTrue(
+            os.path.exists(ShadowStore(self.shadow_dir).path_for(self.file_path))
+        )
+
+        with mock.patch.object(scanner, "open_workbook") as open_workbook:
+            second = self._scan()
+            single = scan_workbook(self.file_path, "office", shadow_dir=self.shadow_dir)
+        open_workbook.assert_not_called()
+        stats = second.pop("stats")
+        self.assertEqual(stats["cached"], "shadow")
+        self.assertEqual(
+            stats["bytes"],
+            os.path.getsize(ShadowStore(self.shadow_dir).path_for(self.file_path)),
+        )
+        self.assertEqual(second, expected)
+        self.assertEqual(
+            single["matches"],
+            [
+                ("Expenses", 1, 0, "Office budget"),
+                ("Notes café", 0, 0, "İstanbul office"),
+            ],
+        )
+
+    def test_rebuilt_when_changed(self):
+        self._scan()
+        stats = os.stat(self.file_path)
+        self._write("Office budget, revised")
+        os.utime(self.file_path, (stats.st_atime, stats.st_mtime + 10))
+        result = self._scan()
+        self.assertIsNone(result["stats"]["cached"])
+        self.assertIn(
+            ("Expenses", 1, 0, "Office budget, revised"), result["matches"][0]
+        )
+        self.assertEqual(self._scan()["stats"]["cached"], "shadow")
+
+    def test_damaged_copy_ignored(self):
+        self._scan()
+        path = ShadowStore(self.shadow_dir).path_for(self.file_path)
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) // 2)
+        result = self._scan()
+        self.assertIsNone(result.pop("stats")["cached"])
+        self.assertEqual(result, scan_workbook_multi(self.file_path, QUERIES))
+        self.assertEqual(self._scan()["stats"]["cached"], "shadow")
+
+    def test_prune(self):
+        """Test that the least recently used copies are deleted first."""
+        paths = []
+        for number in range(3):
+            path = os.path.join(self.tmp_dir, f"copy{number}.xls")
+            shutil.copy(self.file_path, path)
+            scan_workbook(path, "budget", shadow_dir=self.shadow_dir)
+            paths.append(path)
+        store = ShadowStore(self.shadow_dir)
+        copies = [store.path_for(path) for path in paths]
+        for age, copy in zip((30, 10, 20), copies):
+            os.utime(copy, (0, 1000000000 + age))
+        # Reading a copy marks it as used
+        scan_workbook(paths[1], "budget", shadow_dir=self.shadow_dir)
+
+        size = os.path.getsize(copies[0])
+        self.assertEqual(store.prune(), 3 * size)
+        store.max_bytes = 2 * size
+        self.assertEqual(store.prune(), 2 * size)
+        self.assertEqual([os.path.exists(copy) for copy in copies], [True, True, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Test module for the journaled skip list."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from engine import skip_list
+from engine.skip_list import SkipListStore
+
+
+class TestSkipListStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "skip_list.json")
+        self.bad_file = os.path.join(self.tmp_dir, "bad.xls")
+        with open(self.bad_file, "wb") as f:
+            f.write(b"junk")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_changes_are_journaled(self):
+        """Test that adds only append to the journal and survive a reload."""
+        store = SkipListStore(self.path)
+        store.add(self.bad_file, "corrupt")
+        self.assertFalse(os.path.exists(self.path))
+        with open(store.journal_path) as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+        reloaded = SkipListStore(self.path)
+        self.assertIn(self.bad_file, reloaded)
+        self.assertEqual(reloaded.get(self.bad_file)["reason"], "corrupt")
+        self.assertEqual(reloaded.get(self.bad_file)["file_size"], 4)
+        # Loading folds the journal into the snapshot
+        self.assertEqual(os.path.getsize(store.journal_path), 0)
+
+    def test_truncated_journal_record(self):
+        """Test that a partly written last record is ignored."""
+        store = SkipListStore(self.path)
+        store.add(self.bad_file, "corrupt")
+        with open(store.journal_path, "a") as f:
+            f.write('{"op": "add", "path": "/x')
+        self.assertEqual(list(SkipListStore(self.path).entries()), [self.bad_file])
+
+    def test_remove_and_clear(self):
+        """Test that removals and clearing are persisted."""
+        store = SkipListStore(self.path)
+        store.add(self.bad_file, "corrupt")
+        store.add(os.path.join(self.tmp_dir, "gone.xls"), "missing")
+        self.assertTrue(store.remove(self.bad_file))
+        self.assertFalse(store.remove(self.bad_file))
+        self.assertEqual(len(SkipListStore(self.path)), 1)
+        store.clear()
+        self.assertEqual(len(SkipListStore(self.path)), 0)
+
+    def test_compaction(self):
+        """Test that the journal is compacted into the snapshot."""
+        with mock.patch.object(skip_list, "COMPACT_MIN_RECORDS", 3):
+            store = SkipListStore(self.path)
+            for i in range(3):
+                store.add(os.path.join(self.tmp_dir, f"{i}.xls"), "missing")
+        self.assertEqual(os.path.getsize(store.journal_path), 0)
+        with open(self.path) as f:
+            self.assertEqual(len(json.load(f)), 3)
+
+    def test_shared_files(self):
+        """Test that compacting keeps entries journaled by another store."""
+        first = SkipListStore(self.path)
+        second = SkipListStore(self.path)
+        other_file = os.path.join(self.tmp_dir, "other.xls")
+        first.add(self.bad_file, "corrupt")
+        second.add(other_file, "missing")
+        first.compact()
+        self.assertEqual(set(first.entries()), {self.bad_file, other_file})
+        second.compact()
+        self.assertEqual(
+            set(SkipListStore(self.path).entries()), {self.bad_file, other_file}
+        )
+        second.remove(other_file)
+        first.clear()
+        second.add(other_file, "missing")
+        second.compact()
+        self.assertEqual(list(SkipListStore(self.path).entries()), [other_file])
+
+    def test_snapshots(self):
+        """Test that snapshots are reused until the skip list changes."""
+        store = SkipListStore(self.path)
+        first = store.snapshot()
+        self.assertIs(store.snapshot(), first)
+        store.add(self.bad_file, "corrupt")
+        second = store.snapshot()
+        self.assertIsNot(second, first)
+        self.assertNotIn(self.bad_file, first)
+        self.assertIn(self.bad_file, second)
+        store.remove(self.bad_file)
+        self.assertNotIn(self.bad_file, store.snapshot())
+        with self.assertRaises(TypeError):
+            second.entries["other.xls"] = {}
+
+    def test_old_format(self):
+        """Test that the old list-of-paths format is still read."""
+        with open(self.path, "w") as f:
+            json.dump([self.bad_file], f)
+        store = SkipListStore(self.path)
+        self.assertEqual(store.get(self.bad_file)["reason"], "Unknown reason")
+
+
+if __name__ == "__main__":
+    unittest.main()
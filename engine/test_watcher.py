@@ -0,0 +1,115 @@
+"""Test module for the folder watcher."""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from engine.watcher import FolderWatcher
+
+
+class WatcherTestMixin:
+    use_inotify = True
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.tmp_dir, "sub"))
+        self.changed = []
+        self.resynced = []
+        self.event = threading.Event()
+        self.watcher = FolderWatcher(
+            self.on_change,
+            self.resynced.append,
+            debounce=0.2,
+            poll_interval=0.2,
+            use_inotify=self.use_inotify,
+        )
+        self.watcher.watch(self.tmp_dir)
+        self.watcher.start()
+        # Let the initial resync (and first poll) happen
+        time.sleep(0.5)
+
+    def tearDown(self):
+        self.watcher.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def on_change(self, path):
+        self.changed.append(path)
+        self.event.set()
+
+    def write(self, rel_path, data=b"x"):
+        path = os.path.join(self.tmp_dir, rel_path)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def wait_for_change(self):
+        self.assertTrue(self.event.wait(timeout=5))
+        # Give a wrongly undebounced second report time to show up
+        time.sleep(0.5)
+
+    def test_initial_resync(self):
+        """Test that a registered folder is resynced once."""
+        self.assertEqual(self.resynced, [self.tmp_dir])
+
+    def test_covers(self):
+        self.assertTrue(self.watcher.covers(self.tmp_dir))
+        self.assertTrue(self.watcher.covers(os.path.join(self.tmp_dir, "sub")))
+        self.assertFalse(self.watcher.covers(self.tmp_dir + "-other"))
+        self.assertFalse(self.watcher.covers(os.path.dirname(self.tmp_dir)))
+
+    def test_burst_is_debounced(self):
+        """Test that repeated saves of one workbook are reported once."""
+        for i in range(5):
+            path = self.write("sub/book.xls", b"x" * (i + 1))
+            time.sleep(0.02)
+        self.write("notes.txt")
+        self.wait_for_change()
+        self.assertEqual(self.changed, [path])
+
+    def test_removed_file(self):
+        """Test that deleting a workbook is reported."""
+        path = self.write("book.xls")
+        self.wait_for_change()
+        self.event.clear()
+        os.remove(path)
+        self.wait_for_change()
+        self.assertEqual(self.changed, [path, path])
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class TestInotifyWatcher(WatcherTestMixin, unittest.TestCase):
+    def test_backend(self):
+        """Test that inotify is used when available."""
+        self.assertEqual(self.watcher.backend, "inotify")
+
+
+class TestPollingWatcher(WatcherTestMixin, unittest.TestCase):
+    use_inotify = False
+
+
+class TestPendingLimit(unittest.TestCase):
+    def test_overflow_resyncs_folder(self):
+        """Test that a full queue turns into a folder resync."""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            watcher = FolderWatcher(
+                lambda path: None,
+                lambda folder: None,
+                max_pending=2,
+                use_inotify=False,
+            )
+            watcher._folders.append(tmp_dir)
+            for name in ("a.xls", "b.xls", "c.xls"):
+                watcher._enqueue(os.path.join(tmp_dir, name))
+            self.assertEqual(len(watcher._pending), 2)
+            self.assertEqual(watcher._resync, {tmp_dir})
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""Test module for the in-process workbook cache."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import xlwt
+
+from engine import scanner
+from engine.scanner import extract_cells, scan_workbook, scan_workbook_multi
+from engine.workbook_cache import WorkbookCache
+
+QUERIES = [
+    ("budget", "exact"),
+    ("BUDGET", "exact"),
+    ("1250", "exact"),
+    ("50.0", "exact"),
+    ("", "exact"),
+    ("i\u0307", "exact"),
+    ("# travel", "any"),
+    ("office 1", "any"),
+    ("budget approved", "all"),
+    ("budgetoffice", "exact"),
+    ("nothing here", "any"),
+]
+
+
+class TestWorkbookCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, "budget.xls")
+        self._write("Office budget")
+        self.cache = WorkbookCache(1024 * 1024)
+        patcher = mock.patch.object(scanner, "workbook_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, office_note):
+        workbook = xlwt.Workbook()
+        expenses = workbook.add_sheet("Expenses")
+        expenses.write(0, 0, "Travel Expenses")
+        expenses.write(1, 0, office_note)
+        expenses.write(1, 1, 1250)
+        expenses.write(1, 3, "budget")
+        expenses.write(2, 2, True)
+        notes = workbook.add_sheet("Notes")
+        # Lower-casing U+0130 adds a character, so lowered offsets shift
+        notes.write(0, 0, "İstanbul office")
+        notes.write(0, 2, "travel budget approved")
+        notes.write(4, 1, "#N/A budget")
+        workbook.add_sheet("Empty")
+        workbook.save(self.file_path)
+
+    def test_same_matches_as_scan(self):
+        """Test that cached scans give the same records as reading the file."""
+        with mock.patch.object(scanner, "workbook_cache", WorkbookCache(0)):
+            expected = scan_workbook_multi(self.file_path, QUERIES)
+            singles = [scan_workbook(self.file_path, *query) for query in QUERIES]
+
+        first = scan_workbook_multi(self.file_path, QUERIES, collect_stats=True)
+        stats = first.pop("stats")
+        self.assertIsNone(stats["cached"])
+        self.assertEqual(stats["bytes"], os.path.getsize(self.file_path))
+        self.assertEqual(first, expected)
+        second = scan_workbook_multi(self.file_path, QUERIES, collect_stats=True)
+        stats = second.pop("stats")
+        self.assertEqual(stats["cached"], "memory")
+        # Nothing was read from disk
+        self.assertEqual(stats["bytes"], 0)
+        self.assertEqual(second, expected)
+        for query, single in zip(QUERIES, singles):
+            with self.subTest(query=query):
+                self.assertEqual(scan_workbook(self.file_path, *query), single)
+        self.assertEqual(self.cache.stats()["hits"], 1 + len(QUERIES))
+
+    def test_changed_file_is_read_again(self):
+        scan_workbook(self.file_path, "budget")
+        stats = os.stat(self.file_path)
+        self._write("Office budget, revised")
+        os.utime(self.file_path, (stats.st_atime, stats.st_mtime + 10))
+        self.assertIn(
+            ("Expenses", 1, 0, "Office budget, revised"),
+            scan_workbook(self.file_path, "budget")["matches"],
+        )
+        self.assertEqual(self.cache.stats()["misses"], 2)
+        self.assertEqual(self.cache.stats()["entries"], 1)
+
+    def test_bounded_by_bytes(self):
+        """Test that least recently used workbooks are evicted to stay in budget."""
+        paths = []
+        for number in range(3):
+            path = os.path.join(self.tmp_dir, f"copy{number}.xls")
+            shutil.copy(self.file_path, path)
+            paths.append(path)
+        scan_workbook(paths[0], "budget")
+        size = self.cache.bytes
+        self.assertGreater(size, 0)
+
+        self.cache.max_bytes = 2 * size
+        scan_workbook(paths[1], "budget")
+        scan_workbook(paths[0], "budget")  # paths[1] is now least recent
+        scan_workbook(paths[2], "budget")
+        self.assertEqual(self.cache.bytes, 2 * size)
+        scan_workbook(paths[0], "budget")
+        scan_workbook(paths[1], "budget")
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 4))
+        self.assertAlmostEqual(stats["hit_rate"], 2 / 6)
+
+    def test_not_cached(self):
+        """Test that failed scans, delimited text and index builds are not kept."""
+        csv_path = os.path.join(self.tmp_dir, "people.csv")
+        with open(csv_path, "w") as f:
+            f.write("Name,Note\nJohn,budget\n")
+        bad_path = os.path.join(self.tmp_dir, "bad.xls")
+        with open(bad_path, "wb") as f:
+            f.write(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1 truncated")
+        for path in (csv_path, bad_path):
+            scan_workbook(path, "budget")
+        extract_cells(self.file_path)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_low_memory_not_recorded(self):
+        """Test that workbooks opened in low-memory mode leave no compact copy."""
+        shadow_dir = os.path.join(self.tmp_dir, "shadow")
+        scan_workbook(self.file_path, "budget", low_memory=True, shadow_dir=shadow_dir)
+        # Large enough to be opened in low-memory mode by default
+        with mock.patch.object(scanner, "LOW_MEMORY_THRESHOLD", 1):
+            scan_workbook(self.file_path, "budget", shadow_dir=shadow_dir)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        self.assertFalse(os.path.exists(shadow_dir) and os.listdir(shadow_dir))
+
+        scan_workbook(self.file_path, "budget", shadow_dir=shadow_dir)
+        self.assertEqual(self.cache.stats()["entries"], 1)
+        self.assertTrue(os.listdir(shadow_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,331 @@
+"""Background watcher that reports changed workbooks in registered folders."""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .manifest import FileManifest, crawl
+from .readers import workbook_suffixes
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# inotify event flags, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal ctypes binding to Linux inotify, watching directories."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._paths: Dict[int, str] = {}
+
+    def add_watch(self, dir_path: str):
+        """Watch one directory; raises OSError, e.g. when out of watches."""
+        wd = self._add_watch(self.fd, os.fsencode(dir_path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), dir_path)
+        self._paths[wd] = dir_path
+
+    def read(self, timeout: float) -> List[Tuple[Optional[str], str, int]]:
+        """
+        Wait up to timeout seconds for events.
+
+        Returns:
+            List of (watched directory, entry name, mask); the directory is
+            None for queue overflows and events of dropped watches
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_IGNORED:
+                # The kernel dropped the watch, e.g. the directory is gone
+                self._paths.pop(wd, None)
+                continue
+            events.append((self._paths.get(wd), os.fsdecode(name), mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Watches folders and reports changed files after they settle.
+
+    Uses inotify on Linux and falls back to polling elsewhere, or when the
+    inotify watch limit is reached. Changes are collected per path and only
+    reported once no further change arrived for debounce seconds, so a burst
+    of saves to one workbook leads to one callback.
+
+    At most max_pending changed paths are queued. Beyond that, the folder is
+    marked for a full resync instead of growing the queue.
+
+    Args:
+        on_change: Called with the path of a changed, added or removed file
+        on_resync: Called with a folder whose changes could not be tracked
+            individually and must be compared in full; also called once per
+            folder when it is registered
+        suffixes: File name suffixes to report, compared lower-cased; by
+            default those of every registered reader
+        debounce: Seconds a path must stay quiet before it is reported
+        max_pending: Maximum number of queued paths
+        poll_interval: Seconds between crawls of folders that are polled
+        use_inotify: Set False to always poll
+    """
+
+    def __init__(
+        self,
+        on_change: Callable[[str], None],
+        on_resync: Callable[[str], None],
+        suffixes: Optional[Iterable[str]] = None,
+        debounce: float = 2.0,
+        max_pending: int = 10000,
+        poll_interval: float = 30.0,
+        use_inotify: bool = True,
+    ):
+        self.on_change = on_change
+        self.on_resync = on_resync
+        if suffixes is None:
+            suffixes = workbook_suffixes()
+        self.suffixes = tuple(s.lower() for s in suffixes)
+        self.debounce = debounce
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+
+        self._inotify: Optional[Inotify] = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify unavailable, polling instead: {str(e)}")
+
+        self._folders: List[str] = []
+        self._polled: Dict[str, Optional[FileManifest]] = {}
+        self._pending: Dict[str, float] = {}
+        self._resync: Set[str] = set()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self._inotify is not None else "polling"
+
+    def watch(self, folder_path: str):
+        """Register a folder; it is resynced once the watcher runs."""
+        folder = os.path.abspath(folder_path)
+        with self._cond:
+            self._folders.append(folder)
+            self._resync.add(folder)
+            self._cond.notify()
+        if self._inotify is not None:
+            try:
+                self._watch_tree(folder)
+                return
+            except OSError as e:
+                logger.warning(f"Polling {folder}, could not watch it: {str(e)}")
+        self._polled[folder] = None
+
+    def covers(self, path: str) -> bool:
+        """Whether path is a watched folder or lies inside one."""
+        path = os.path.abspath(path)
+        with self._cond:
+            return any(
+                path == folder or path.startswith(os.path.join(folder, ""))
+                for folder in self._folders
+            )
+
+    def start(self):
+        """Start the watcher threads."""
+        self._threads = [
+            threading.Thread(target=self._dispatch, name="watch-dispatch", daemon=True),
+            threading.Thread(target=self._collect, name="watch-collect", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Watching {len(self._folders)} folders using {self.backend}")
+
+    def stop(self):
+        """Stop the watcher threads and release the inotify descriptor."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _watch_tree(self, folder: str):
+        self._inotify.add_watch(folder)
+        for root, dirs, _ in os.walk(folder):
+            for name in dirs:
+                self._inotify.add_watch(os.path.join(root, name))
+
+    def _folder_of(self, path: str) -> str:
+        for folder in self._folders:
+            if path == folder or path.startswith(os.path.join(folder, "")):
+                return folder
+        return path
+
+    def _enqueue(self, path: str):
+        if not path.lower().endswith(self.suffixes):
+            return
+        with self._cond:
+            if path not in self._pending and len(self._pending) >= self.max_pending:
+                self._resync.add(self._folder_of(path))
+            else:
+                self._pending[path] = time.monotonic() + self.debounce
+            self._cond.notify()
+
+    def _request_resync(self, folder: str):
+        with self._cond:
+            self._resync.add(folder)
+            self._cond.notify()
+
+    def _collect(self):
+        """Turn inotify events or poll results into queued paths."""
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stop.is_set():
+            timeout = max(0.0, next_poll - time.monotonic()) if self._polled else 1.0
+            if self._inotify is not None:
+                try:
+                    events = self._inotify.read(min(timeout, 1.0))
+                except OSError as e:
+                    if e.errno != errno.EINTR and not self._stop.is_set():
+                        logger.error(f"Error reading inotify events: {str(e)}")
+                    events = []
+                for dir_path, name, mask in events:
+                    self._handle_event(dir_path, name, mask)
+            else:
+                self._stop.wait(min(timeout, 1.0))
+
+            if self._polled and time.monotonic() >= next_poll:
+                for folder in list(self._polled):
+                    self._poll(folder)
+                next_poll = time.monotonic() + self.poll_interval
+
+    def _handle_event(self, dir_path: Optional[str], name: str, mask: int):
+        if mask & IN_Q_OVERFLOW:
+            logger.warning("inotify queue overflowed, resyncing watched folders")
+            for folder in self._folders:
+                self._request_resync(folder)
+            return
+        if dir_path is None:
+            # Late event for a watch that was already dropped
+            return
+
+        path = os.path.join(dir_path, name) if name else dir_path
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                # Watch the new directory; files may already be in it
+                try:
+                    self._watch_tree(path)
+                except OSError as e:
+                    logger.warning(f"Could not watch {path}: {str(e)}")
+                self._request_resync(self._folder_of(path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._request_resync(self._folder_of(path))
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            self._request_resync(self._folder_of(path))
+            return
+        self._enqueue(path)
+
+    def _poll(self, folder: str):
+        previous = self._polled.get(folder)
+        manifest = crawl(folder, self.suffixes, previous=previous)
+        self._polled[folder] = manifest
+        if previous is None:
+            return
+        for entry in manifest:
+            known = previous.get(entry.path)
+            if known is None or known.fingerprint != entry.fingerprint:
+                self._enqueue(entry.path)
+        for entry in previous:
+            if entry.path not in manifest:
+                self._enqueue(entry.path)
+
+    def _dispatch(self):
+        """Report resyncs and settled paths to the callbacks."""
+        while not self._stop.is_set():
+            with self._cond:
+                now = time.monotonic()
+                resync = set(self._resync)
+                self._resync.clear()
+                ready = []
+                for path, due in list(self._pending.items()):
+                    if self._folder_of(path) in resync:
+                        # Covered by the folder's resync
+                        del self._pending[path]
+                    elif due <= now:
+                        ready.append(path)
+                        del self._pending[path]
+                if not resync and not ready:
+                    due = min(self._pending.values(), default=now + 1.0)
+                    self._cond.wait(timeout=max(0.05, due - now))
+                    continue
+
+            for folder in resync:
+                try:
+                    self.on_resync(folder)
+                except Exception as e:
+                    logger.error(f"Error resyncing {folder}: {str(e)}")
+            for path in ready:
+                try:
+                    self.on_change(path)
+                except Exception as e:
+                    logger.error(f"Error handling change to {path}: {str(e)}")
@@ -0,0 +1,373 @@
+"""
+In-process LRU cache of recently scanned workbooks in a compact form.
+
+Each sheet keeps its non-empty cells as one concatenated text buffer, a
+lower-cased copy of it and arrays of cell offsets, rows, columns and types.
+Queries run as substring or regex searches over the lower-cased buffer, and
+only the cells a keyword lands in are looked at, so a repeated scan of the
+same workbook neither touches the file nor builds per-cell objects.
+
+Entries are keyed by path and checked against the file's size and mtime.
+The cache is filled as a side effect of a normal scan, without a second
+parse, and is bounded by the bytes its entries hold. Every worker process
+has its own cache.
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from xlrd import XL_CELL_EMPTY, XL_CELL_TEXT
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Bytes of compact workbooks kept per process; 0 turns the cache off
+WORKBOOK_CACHE_BYTES = (
+    int(os.environ.get("EXCELSEEKER_WORKBOOK_CACHE_MB", 128)) * 1024 * 1024
+)
+
+# Estimated bytes per cell besides its text: an offset, row, column and type
+_CELL_OVERHEAD = 13
+
+
+class BufferedSheet:
+    """
+    Cells of one sheet searched through a lower-cased text buffer.
+
+    Subclasses set index, name, the rows, cols and types arrays and
+    lowered_offsets (the start of each cell in the lower-cased text, plus its
+    end), and implement value, lowered_value and _lowered_buffer.
+    """
+
+    index: int
+    name: str
+    rows: Sequence[int]
+    cols: Sequence[int]
+    types: Sequence[int]
+    lowered_offsets: Sequence[int]
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def value(self, cell: int) -> str:
+        raise NotImplementedError
+
+    def lowered_value(self, cell: int) -> str:
+        raise NotImplementedError
+
+    def _lowered_buffer(self) -> Tuple[Any, int, Callable[[str], Any]]:
+        """
+        Return (buffer, base, encode): the buffer holding the lower-cased
+        text from position base on, and how to turn a keyword into the
+        buffer's type. Offsets are counted in the buffer's units.
+        """
+        raise NotImplementedError
+
+    def candidates(self, triggers: Optional[Sequence[str]]) -> Iterator[int]:
+        """
+        Cells whose lower-cased text contains one of the triggers.
+
+        A hit that runs over the end of a cell still names that cell, so
+        candidates must be checked with the matcher. None gives every cell.
+        """
+        if triggers is None:
+            yield from range(len(self))
+            return
+        if not triggers:
+            return
+        buffer, base, encode = self._lowered_buffer()
+        offsets = self.lowered_offsets
+        end = base + offsets[-1]
+        if len(triggers) == 1:
+            keyword = encode(triggers[0])
+            pos = buffer.find(keyword, base, end)
+            while pos != -1:
+                cell = bisect_right(offsets, pos - base) - 1
+                yield cell
+                pos = buffer.find(keyword, base + offsets[cell + 1], end)
+            return
+        keywords = sorted((encode(k) for k in triggers), key=len, reverse=True)
+        separator = b"|" if isinstance(keywords[0], bytes) else "|"
+        pattern = re.compile(separator.join(re.escape(k) for k in keywords))
+        match = pattern.search(buffer, base, end)
+        while match is not None:
+            cell = bisect_right(offsets, match.start() - base) - 1
+            yield cell
+            match = pattern.search(buffer, base + offsets[cell + 1], end)
+
+    def iter_rows(self) -> Iterator[Tuple[int, List[Any], List[int]]]:
+        """Rows as (row index, values, types), padded like the readers'."""
+        cell = 0
+        count = len(self)
+        while cell < count:
+            row_idx = self.rows[cell]
+            values: List[Any] = []
+            types: List[int] = []
+            while cell < count and self.rows[cell] == row_idx:
+                padding = self.cols[cell] - len(values)
+                values.extend([""] * padding)
+                types.extend([XL_CELL_EMPTY] * padding)
+                values.append(self.value(cell))
+                types.append(self.types[cell])
+                cell += 1
+            yield row_idx, values, types
+
+
+class CompactSheet(BufferedSheet):
+    """The non-empty cells of one sheet, in row-major order, held in memory."""
+
+    def __init__(
+        self,
+        index: int,
+        name: str,
+        values: Sequence[str],
+        rows: array,
+        cols: array,
+        types: array,
+    ):
+        self.index = index
+        self.name = name
+        self.text = "".join(values)
+        self.lowered = "".join(value.lower() for value in values)
+        if self.lowered == self.text:
+            self.lowered = self.text
+        self.offsets = array("I", [0])
+        for value in values:
+            self.offsets.append(self.offsets[-1] + len(value))
+        # Lower-casing never shortens text, so equal lengths mean every cell
+        # kept its length and the offsets can be shared
+        if len(self.lowered) == len(self.text):
+            self.lowered_offsets = self.offsets
+        else:
+            self.lowered_offsets = array("I", [0])
+            for value in values:
+                self.lowered_offsets.append(
+                    self.lowered_offsets[-1] + len(value.lower())
+                )
+        self.rows = rows
+        self.cols = cols
+        self.types = types
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.offsets, self.rows, self.cols, self.types]
+        if self.lowered_offsets is not self.offsets:
+            arrays.append(self.lowered_offsets)
+        return (
+            sys.getsizeof(self.text)
+            + (sys.getsizeof(self.lowered) if self.lowered is not self.text else 0)
+            + sum(a.itemsize * len(a) for a in arrays)
+        )
+
+    def value(self, cell: int) -> str:
+        return self.text[self.offsets[cell] : self.offsets[cell + 1]]
+
+    def lowered_value(self, cell: int) -> str:
+        offsets = self.lowered_offsets
+        return self.lowered[offsets[cell] : offsets[cell + 1]]
+
+    def _lowered_buffer(self) -> Tuple[Any, int, Callable[[str], Any]]:
+        return self.lowered, 0, str
+
+
+class CompactWorkbook:
+    """
+    A workbook from the cache or the shadow store; scanned without opening
+    the file.
+
+    nbytes is the memory its sheets take up, or the size of the shadow copy
+    they are mapped from.
+    """
+
+    def __init__(self, sheets: Sequence[BufferedSheet], nbytes: Optional[int] = None):
+        self.sheets = sheets
+        self.nbytes = (
+            sum(sheet.nbytes for sheet in sheets) if nbytes is None else nbytes
+        )
+
+    def iter_sheets(
+        self,
+        counts: Optional[Dict[str, int]] = None,
+        keywords: Optional[Sequence[str]] = None,
+    ):
+        """Yield (index, name, rows) per sheet, in the readers' form."""
+        for sheet in self.sheets:
+            if counts is not None:
+                counts["cells"] = counts.get("cells", 0) + len(sheet)
+            yield sheet.index, sheet.name, sheet.iter_rows()
+
+    def find(
+        self, matchers: Sequence, counts: Optional[Dict[str, int]] = None
+    ) -> List[List[Tuple[str, int, int, str]]]:
+        """
+        Run compiled matchers over every sheet.
+
+        Gives the same match records as scanner.match_cells_multi: number
+        and other non-text cells are only tested if some matcher is numeric.
+
+        Returns:
+            One list of match records per matcher
+        """
+        matches: List[List[Tuple[str, int, int, str]]] = [[] for _ in matchers]
+        text_only = not any(matcher.numeric for matcher in matchers)
+        triggers = [matcher.triggers for matcher in matchers]
+        keywords = (
+            None
+            if any(t is None for t in triggers)
+            else sorted({keyword for t in triggers for keyword in t})
+        )
+        tests = [
+            (matcher.matches, found.append) for matcher, found in zip(matchers, matches)
+        ]
+        for sheet in self.sheets:
+            if counts is not None:
+                counts["cells"] = counts.get("cells", 0) + len(sheet)
+            types = sheet.types
+            for cell in sheet.candidates(keywords):
+                if text_only and types[cell] != XL_CELL_TEXT:
+                    continue
+                lowered = sheet.lowered_value(cell)
+                record = None
+                for matches_cell, add_match in tests:
+                    if matches_cell(lowered):
+                        if record is None:
+                            record = (
+                                sheet.name,
+                                sheet.rows[cell],
+                                sheet.cols[cell],
+                                sheet.value(cell),
+                            )
+                        add_match(record)
+        return matches
+
+
+class RecordingWorkbook:
+    """
+    Wraps an open workbook and records every row read into compact form.
+
+    Scans run over it as usual. Once iter_sheets has been read to the end,
+    result() returns the CompactWorkbook, or None if it grew past max_bytes.
+    Rows are always read in full, whatever keywords are given.
+    """
+
+    def __init__(self, workbook, max_bytes: int):
+        self.workbook = workbook
+        self.max_bytes = max_bytes
+        self._sheets: List[Tuple[int, str, List[str], array, array, array]] = []
+        self._size = 0
+        self._complete = False
+
+    def iter_sheets(
+        self,
+        counts: Optional[Dict[str, int]] = None,
+        keywords: Optional[Sequence[str]] = None,
+    ):
+        for sheet_index, name, rows in self.workbook.iter_sheets(counts):
+            sheet = (sheet_index, name, [], array("I"), array("I"), array("B"))
+            self._sheets.append(sheet)
+            yield sheet_index, name, self._record(rows, sheet)
+        self._complete = True
+
+    def _record(self, rows, sheet):
+        _, _, values, row_array, col_array, type_array = sheet
+        for row in rows:
+            if self._size <= self.max_bytes:
+                row_idx, row_values, row_types = row
+                for col_idx, cell_value in enumerate(row_values):
+                    value = str(cell_value)
+                    if value:
+                        values.append(value)
+                        row_array.append(row_idx)
+                        col_array.append(col_idx)
+                        type_array.append(row_types[col_idx])
+                        self._size += 2 * len(value) + _CELL_OVERHEAD
+                if self._size > self.max_bytes:
+                    # Too large to cache; free what was recorded
+                    self._sheets.clear()
+                    values.clear()
+            yield row
+
+    def result(self) -> Optional[CompactWorkbook]:
+        if not self._complete or self._size > self.max_bytes:
+            return None
+        return CompactWorkbook([CompactSheet(*sheet) for sheet in self._sheets])
+
+
+class WorkbookCache:
+    """
+    Memory-bounded LRU of CompactWorkbooks, keyed by path.
+
+    Safe to share between threads. A single workbook may take up at most a
+    quarter of max_bytes, so one large file cannot flush the cache.
+    """
+
+    def __init__(self, max_bytes: int = WORKBOOK_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_bytes // 4
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, file_path: str, fingerprint: Tuple[int, float]
+    ) -> Optional[CompactWorkbook]:
+        """Return the cached workbook if the file is unchanged, else None."""
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(file_path)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                # The file changed; drop the stale copy
+                del self._entries[file_path]
+                self.bytes -= entry[1].nbytes
+            self.misses += 1
+            return None
+
+    def put(
+        self, file_path: str, fingerprint: Tuple[int, float], workbook: CompactWorkbook
+    ):
+        """Add a workbook, evicting the least recently used ones to make room."""
+        if workbook.nbytes > self.max_entry_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(file_path, None)
+            if old is not None:
+                self.bytes -= old[1].nbytes
+            self._entries[file_path] = (fingerprint, workbook)
+            self.bytes += workbook.nbytes
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits, misses, hit rate, entries and bytes held."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Shared by every scan in this process
+workbook_cache = WorkbookCache()
@@ -33,11 +33,17 @@ export class APIService {
     searchMode,
     onProgress,
     onComplete,
-    onError
+    onError,
+    onResults
   ) {
+    // With a results handler the server streams matches in batches and only
+    // sends a summary on completion
+    const streamParam = onResults ? "&stream=true" : "";
     const searchUrl = `/search_folder?folder_path=${encodeURIComponent(
       folderPath
-    )}&search_text=${encodeURIComponent(searchText)}&search_mode=${searchMode}`;
+    )}&search_text=${encodeURIComponent(
+      searchText
+    )}&search_mode=${searchMode}${streamParam}`;
 
     if (this.activeEventSource) {
       this.activeEventSource.close();
@@ -64,6 +70,11 @@ export class APIService {
         case "progress":
           onProgress(data);
           break;
+        case "results":
+          if (onResults) {
+            onResults(data);
+          }
+          break;
         case "complete":
           eventSource.close();
           this.activeEventSource = null;
@@ -87,6 +98,32 @@ export class APIService {
     return eventSource;
   }
 
+  /**
+   * Fetch one sorted/filtered page of a finished search's results
+   */
+  async fetchResultsPage(resultHandle, options = {}) {
+    const params = new URLSearchParams({
+      page: options.page || 1,
+      page_size: options.pageSize || 100,
+      direction: options.direction || "asc",
+      filter: options.filter || "",
+      filter_column: options.filterColumn || "all",
+    });
+    if (options.sort) {
+      params.set("sort", options.sort);
+    }
+
+    const response = await fetch(
+      `/results/${encodeURIComponent(resultHandle)}?${params.toString()}`
+    );
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.error || "Failed to load results");
+    }
+
+    return data;
+  }
+
   /**
    * Cancel ongoing search
    */
@@ -4,8 +4,12 @@ import {
   createElement,
   addEventListenerWithCleanup,
   debounce,
+  showError,
 } from "../utils/dom.js";
 
+// Result columns in table order, as understood by the /results endpoint
+const RESULT_COLUMNS = ["filename", "sheet", "cell", "value"];
+
 /**
  * Results Manager - Handles display and manipulation of search results
  */
@@ -14,6 +18,12 @@ export class ResultsManager {
     this.api = api;
     this.currentSort = { column: -1, direction: 1 };
     this.currentFilter = { text: "", column: "all" };
+    // Finished folder searches are paged on the server; the table only ever
+    // holds one page of rows
+    this.resultHandle = null;
+    this.pageSize = 100;
+    this.currentPage = 1;
+    this.pageRequest = 0;
     this.setupElements();
     this.setupEventListeners();
   }
@@ -29,6 +39,10 @@ export class ResultsManager {
       filterColumn: getElement("filterColumn"),
       sortHeaders: document.querySelectorAll(".sortable"),
       skippedFilesList: getElement("skippedFilesList"),
+      pagination: getElement("resultsPagination"),
+      prevPage: getElement("prevPage"),
+      nextPage: getElement("nextPage"),
+      pageInfo: getElement("pageInfo"),
     };
   }
 
@@ -50,6 +64,107 @@ export class ResultsManager {
     window.addEventListener("searchComplete", (event) => {
       this.displayResults(event.detail);
     });
+
+    // Listen for streamed results
+    window.addEventListener("searchStarted", () => this.resetResults());
+    window.addEventListener("searchResults", (event) => {
+      this.appendResults(event.detail);
+    });
+
+    // Page through finished result sets on the server
+    window.addEventListener("searchFinished", (event) => {
+      this.resultHandle = event.detail.resultHandle;
+      this.loadPage(1);
+    });
+    this.elements.prevPage.addEventListener("click", () =>
+      this.loadPage(this.currentPage - 1)
+    );
+    this.elements.nextPage.addEventListener("click", () =>
+      this.loadPage(this.currentPage + 1)
+    );
+  }
+
+  /**
+   * Clear results before a streamed search starts
+   */
+  resetResults() {
+    this.elements.resultsBody.innerHTML = "";
+    this.currentResults = [];
+    this.streamGroups = new Map();
+    this.resultHandle = null;
+    this.elements.pagination.classList.add("hidden");
+    const noResults = this.elements.resultsSection.querySelector(".no-results");
+    if (noResults) {
+      noResults.remove();
+    }
+  }
+
+  /**
+   * Append a batch of streamed results, extending existing file groups.
+   * Only the first page is rendered while the search runs; the rest is
+   * fetched from the server once it finishes.
+   */
+  appendResults(results) {
+    if (!this.streamGroups) {
+      this.resetResults();
+    }
+    this.elements.resultsSection.classList.remove("hidden");
+
+    const remaining = this.pageSize - this.currentResults.length;
+    if (remaining <= 0) {
+      return;
+    }
+    results = results.slice(0, remaining);
+
+    const batchGroups = results.reduce((groups, result) => {
+      if (!groups.has(result.filepath)) {
+        groups.set(result.filepath, []);
+      }
+      groups.get(result.filepath).push(result);
+      return groups;
+    }, new Map());
+
+    batchGroups.forEach((fileResults, filepath) => {
+      let group = this.streamGroups.get(filepath);
+      if (!group) {
+        // Add separator between groups, then the new group header
+        if (this.streamGroups.size > 0) {
+          const separatorRow = createElement("tr", {
+            class: "group-separator",
+          });
+          separatorRow.innerHTML = '<td colspan="4"></td>';
+          this.elements.resultsBody.appendChild(separatorRow);
+        }
+        const headerRow = createElement("tr", { class: "group-header" });
+        this.elements.resultsBody.appendChild(headerRow);
+        group = { headerRow, lastRow: headerRow, results: [] };
+        this.streamGroups.set(filepath, group);
+      }
+
+      const fragment = document.createDocumentFragment();
+      let lastRow = group.lastRow;
+      fileResults.forEach((result) => {
+        const row = createElement("tr", { class: "group-item" });
+        row.innerHTML = this.createResultRowHTML(result);
+        fragment.appendChild(row);
+        lastRow = row;
+      });
+      group.lastRow.after(fragment);
+      group.lastRow = lastRow;
+
+      group.results.push(...fileResults);
+      group.headerRow.innerHTML = this.createGroupHeaderHTML(
+        fileResults[0].filename,
+        group.results
+      );
+    });
+
+    this.currentResults.push(...results);
+
+    // Keep an active filter applied to the new rows
+    if (this.currentFilter.text) {
+      this.filterResults();
+    }
   }
 
   /**
@@ -57,6 +172,8 @@ export class ResultsManager {
    */
   displayResults(results) {
     this.elements.resultsBody.innerHTML = "";
+    this.resultHandle = null;
+    this.elements.pagination.classList.add("hidden");
 
     if (!results || results.length === 0) {
       this.elements.resultsSection.classList.add("hidden");
@@ -73,6 +190,89 @@ export class ResultsManager {
     this.currentResults = results;
   }
 
+  /**
+   * Load one page of the current result set from the server
+   */
+  async loadPage(page) {
+    if (!this.resultHandle) {
+      return;
+    }
+
+    // Ignore responses that arrive after a newer page request
+    const request = ++this.pageRequest;
+    try {
+      const data = await this.api.fetchResultsPage(this.resultHandle, {
+        page,
+        pageSize: this.pageSize,
+        sort:
+          this.currentSort.column >= 0
+            ? RESULT_COLUMNS[this.currentSort.column]
+            : null,
+        direction: this.currentSort.direction === 1 ? "asc" : "desc",
+        filter: this.currentFilter.text,
+        filterColumn: this.currentFilter.column,
+      });
+      if (request === this.pageRequest) {
+        this.renderPage(data);
+      }
+    } catch (error) {
+      console.error("Error loading results page:", error);
+      showError(error.message || "Failed to load results");
+    }
+  }
+
+  /**
+   * Render a page of results, grouping consecutive rows from the same file
+   */
+  renderPage(data) {
+    this.currentPage = data.page;
+    this.currentResults = data.results;
+    this.elements.resultsBody.innerHTML = "";
+
+    const runs = [];
+    data.results.forEach((result) => {
+      const lastRun = runs[runs.length - 1];
+      if (lastRun && lastRun.filepath === result.filepath) {
+        lastRun.results.push(result);
+      } else {
+        runs.push({ filepath: result.filepath, results: [result] });
+      }
+    });
+
+    const fragment = document.createDocumentFragment();
+    runs.forEach((run, runIndex) => {
+      if (runIndex > 0) {
+        const separatorRow = createElement("tr", { class: "group-separator" });
+        separatorRow.innerHTML = '<td colspan="4"></td>';
+        fragment.appendChild(separatorRow);
+      }
+      const headerRow = createElement("tr", { class: "group-header" });
+      headerRow.innerHTML = this.createGroupHeaderHTML(
+        run.results[0].filename,
+        run.results
+      );
+      fragment.appendChild(headerRow);
+      run.results.forEach((result) => {
+        const row = createElement("tr", { class: "group-item" });
+        row.innerHTML = this.createResultRowHTML(result);
+        fragment.appendChild(row);
+      });
+    });
+    this.elements.resultsBody.appendChild(fragment);
+
+    // Update pagination controls
+    this.elements.pagination.classList.remove("hidden");
+    this.elements.pageInfo.textContent = `Page ${data.page} of ${
+      data.total_pages
+    } (${data.total_results} result${data.total_results === 1 ? "" : "s"})`;
+    this.elements.prevPage.disabled = data.page <= 1;
+    this.elements.nextPage.disabled = data.page >= data.total_pages;
+
+    this.updateNoResultsMessage(
+      Array.from(this.elements.resultsBody.getElementsByTagName("tr"))
+    );
+  }
+
   /**
    * Group results by filename
    */
@@ -178,6 +378,12 @@ export class ResultsManager {
     // Update sort icons
     this.updateSortIcons(columnIndex);
 
+    // Server-side result sets are sorted by the server
+    if (this.resultHandle) {
+      this.loadPage(1);
+      return;
+    }
+
     // Sort rows
     rows.sort((a, b) => {
       // Skip group headers and separators
@@ -230,6 +436,12 @@ export class ResultsManager {
     this.currentFilter.text = filterText;
     this.currentFilter.column = filterColumn;
 
+    // Server-side result sets are filtered by the server
+    if (this.resultHandle) {
+      this.loadPage(1);
+      return;
+    }
+
     // Show all rows if filter is empty
     if (!filterText) {
       rows.forEach((row) => (row.style.display = ""));
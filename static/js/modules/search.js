@@ -195,13 +195,17 @@ export class SearchManager {
       this.elements.progressBar.textContent = "Starting search...";
     }
 
+    // Clear previous results; new rows are appended as they stream in
+    window.dispatchEvent(new CustomEvent("searchStarted"));
+
     this.api.initFolderSearch(
       folderPath,
       searchText,
       finalSearchMode,
       this.handleSearchProgress.bind(this),
       this.handleSearchComplete.bind(this),
-      this.handleSearchError.bind(this)
+      this.handleSearchError.bind(this),
+      this.handleSearchResults.bind(this)
     );
   }
 
@@ -249,6 +253,18 @@ export class SearchManager {
     }
   }
 
+  /**
+   * Handle a batch of streamed search results
+   */
+  handleSearchResults(data) {
+    if (data.results && data.results.length > 0) {
+      window.dispatchEvent(
+        new CustomEvent("searchResults", { detail: data.results })
+      );
+      toggleVisibility(this.elements.resultsSection, true);
+    }
+  }
+
   /**
    * Handle search completion
    */
@@ -261,7 +277,23 @@ export class SearchManager {
       showMessage("Search cancelled. Showing partial results.");
     }
 
-    if (data.results && data.results.length > 0) {
+    if (data.streamed) {
+      // Rows were already rendered as they arrived
+      if (data.total_results > 0) {
+        toggleVisibility(this.elements.resultsSection, true);
+        // Switch to server-side pages of the finished result set
+        if (data.result_handle) {
+          window.dispatchEvent(
+            new CustomEvent("searchFinished", {
+              detail: { resultHandle: data.result_handle },
+            })
+          );
+        }
+      } else {
+        showMessage("No results found.");
+        toggleVisibility(this.elements.resultsSection, false);
+      }
+    } else if (data.results && data.results.length > 0) {
       // Emit event for results display
       window.dispatchEvent(
         new CustomEvent("searchComplete", { detail: data.results })
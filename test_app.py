@@ -0,0 +1,166 @@
+"""Test module for the request validation of the Flask routes."""
+
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import xlwt
+
+app_module = None
+data_dir = None
+
+
+def setUpModule():
+    global app_module, data_dir
+    # Keep the app's caches and index out of the source tree
+    data_dir = tempfile.mkdtemp()
+    os.environ["EXCELSEEKER_DATA_DIR"] = data_dir
+    app_module = importlib.import_module("app")
+
+
+def tearDownModule():
+    app_module.scan_executor.shutdown()
+    del os.environ["EXCELSEEKER_DATA_DIR"]
+    shutil.rmtree(data_dir)
+
+
+class TestResultsRoute(unittest.TestCase):
+    def setUp(self):
+        self.client = app_module.app.test_client()
+        results = [
+            {
+                "filename": f"{number}.xls",
+                "filepath": f"/data/{number}.xls",
+                "sheet": "Sheet1",
+                "cell": f"A{number + 1}",
+                "value": f"budget {number}",
+            }
+            for number in range(5)
+        ]
+        app_module.result_store.put("search", results, {"total_processed": 5})
+        self.addCleanup(app_module.result_store.discard, "search")
+
+    def test_page(self):
+        response = self.client.get(
+            "/results/search?page=2&page_size=2&sort=value&direction=desc"
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(
+            [r["value"] for r in data["results"]], ["budget 2", "budget 1"]
+        )
+        self.assertEqual((data["page"], data["total_pages"]), (2, 3))
+
+    def test_invalid_parameters(self):
+        """Test that bad paging, sort and filter parameters are rejected."""
+        for query in (
+            "page=two",
+            "page_size=0",
+            "page_size=-5",
+            "page_size=many",
+            "sort=filepath",
+            "filter_column=filepath",
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(f"/results/search?{query}")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.get_json())
+
+    def test_page_size_capped(self):
+        response = self.client.get("/results/search?page_size=100000")
+        self.assertEqual(
+            response.get_json()["page_size"], app_module.RESULT_PAGE_MAX_SIZE
+        )
+
+    def test_unknown_or_released(self):
+        self.assertEqual(self.client.get("/results/missing").status_code, 404)
+        self.assertEqual(self.client.delete("/results/search").status_code, 200)
+        self.assertEqual(self.client.delete("/results/search").status_code, 404)
+        self.assertEqual(self.client.get("/results/search").status_code, 404)
+
+
+class TestSearchFolderRoute(unittest.TestCase):
+    def setUp(self):
+        self.client = app_module.app.test_client()
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        workbook = xlwt.Workbook()
+        sheet = workbook.add_sheet("Sheet1")
+        sheet.write(0, 0, "Travel budget")
+        sheet.write(1, 0, "Office")
+        workbook.save(os.path.join(self.folder, "a.xls"))
+
+    def search(self, **params):
+        response = self.client.get(
+            "/search_folder", query_string={"folder_path": self.folder, **params}
+        )
+        return response, [
+            json.loads(line[len("data: ") :])
+            for line in response.get_data(as_text=True).splitlines()
+            if line.startswith("data: ")
+        ]
+
+    def test_nlp_mode(self):
+        """Test that "nlp" searches use the mode inferred from the query."""
+        for mode in ("exact", "nlp"):
+            with self.subTest(mode=mode):
+                response, events = self.search(search_text="budget", search_mode=mode)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(events[-1]["type"], "complete")
+                self.assertEqual(
+                    [r["value"] for r in events[-1]["results"]], ["Travel budget"]
+                )
+
+    def test_invalid_mode(self):
+        response, _ = self.search(search_text="budget", search_mode="fuzzy")
+        self.assertEqual(response.status_code, 400)
+
+
+class TestSearchBatchRoute(unittest.TestCase):
+    def setUp(self):
+        self.client = app_module.app.test_client()
+
+    def post(self, queries, **data):
+        return self.client.post(
+            "/search_batch",
+            json={"folder_path": data_dir, "queries": queries, **data},
+        )
+
+    def test_invalid_requests(self):
+        """Test that malformed batches are rejected before any search runs."""
+        too_many = [f"query {n}" for n in range(app_module.BATCH_MAX_QUERIES + 1)]
+        cases = {
+            "no queries": ([], {}),
+            "no folder": (["budget"], {"folder_path": ""}),
+            "queries not a list": ("budget", {}),
+            "too many queries": (too_many, {}),
+            "missing text": ([{"id": "a"}], {}),
+            "blank text": ([{"id": "a", "text": "  "}], {}),
+            "not an object": ([["budget"]], {}),
+            "bad mode": ([{"text": "budget", "mode": "filename"}], {}),
+            "bad filters": ([{"text": "budget", "filters": ["x"]}], {}),
+            "bad executor": (["budget"], {"executor": "gpu"}),
+            "duplicate ids": (
+                [{"id": "a", "text": "budget"}, {"id": "a", "text": "travel"}],
+                {},
+            ),
+            "duplicate default ids": ([{"id": "2", "text": "budget"}, "travel"], {}),
+        }
+        for name, (queries, data) in cases.items():
+            with self.subTest(name):
+                response = self.post(queries, **data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.get_json())
+
+    def test_valid_request_streams(self):
+        response = self.post(["budget", {"id": "t", "text": "travel", "mode": "any"}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.assertIn(b"search_id", response.get_data())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Test module for reading the queries of the batch search command line."""
+
+import argparse
+import os
+import shutil
+import tempfile
+import unittest
+
+from cli import load_queries
+
+
+class TestLoadQueries(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def load(self, *lines, query=None):
+        path = os.path.join(self.tmp_dir, "queries.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        args = argparse.Namespace(query=query, queries_file=path, mode="exact")
+        return load_queries(args)
+
+    def test_text_and_json_lines(self):
+        self.assertEqual(
+            self.load(
+                "# budgets",
+                "budget",
+                "",
+                "[Draft] budget",
+                '{"id": "t", "text": "travel", "mode": "any"}',
+                query=["office"],
+            ),
+            [
+                {"text": "office", "mode": "exact", "id": "1"},
+                {"text": "budget", "mode": "exact", "id": "2"},
+                {"text": "[Draft] budget", "mode": "exact", "id": "3"},
+                {"id": "t", "text": "travel", "mode": "any"},
+            ],
+        )
+
+    def test_invalid_lines(self):
+        """Test that malformed queries raise ValueError instead of crashing."""
+        for line in (
+            '["budget"]',
+            '{"id": "t"}',
+            '{"text": "  "}',
+            '{"text": 5}',
+            '{"text": "budget", "mode": "filename"}',
+            '{"text": "budget"',
+        ):
+            with self.subTest(line=line):
+                with self.assertRaises(ValueError):
+                    self.load(line)
+
+    def test_duplicate_ids(self):
+        """Test that a JSON id may not repeat an id, given or by line number."""
+        for lines in (
+            ('{"id": "a", "text": "budget"}', '{"id": "a", "text": "travel"}'),
+            ('{"id": 2, "text": "budget"}', "travel"),
+        ):
+            with self.subTest(lines=lines):
+                with self.assertRaises(ValueError):
+                    self.load(*lines)
+
+
+if __name__ == "__main__":
+    unittest.main()